@@ -0,0 +1,99 @@
+"""
+Emotion Detection Benchmark - Compiled matcher vs per-keyword regex scans
+The legacy implementation (one re.findall per keyword, pattern rebuilt on every
+call) is reproduced here as the baseline
+Usage: python benchmarks/bench_emotion.py [--words 2000] [--repeat 50]
+"""
+
+import argparse
+import random
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.emotion_detector import EMOTION_KEYWORDS, detect_emotion, detect_emotion_with_confidence
+from services.emotion_scorer import get_scorer
+
+FILLER = {
+    'en': ['today', 'my', 'friend', 'said', 'that', 'the', 'exam', 'was', 'really', 'long', 'and', 'I'],
+    'hi': ['आज', 'मेरा', 'दोस्त', 'बोला', 'कि', 'परीक्षा', 'बहुत', 'लंबी', 'थी', 'और', 'मैं'],
+    'te': ['ఈరోజు', 'నా', 'స్నేహితుడు', 'చెప్పాడు', 'పరీక్ష', 'చాలా', 'పొడవుగా', 'ఉంది', 'మరియు']
+}
+
+
+def legacy_detect_emotion(text: str, language: str = 'en') -> str:
+    """Previous implementation: one regex scan per keyword"""
+    if not text:
+        return 'neutral'
+    text_lower = text.lower()
+    emotion_scores = {}
+    for emotion, keywords_by_lang in EMOTION_KEYWORDS.items():
+        score = 0
+        keywords = keywords_by_lang.get(language, []) + keywords_by_lang.get('en', [])
+        for keyword in keywords:
+            pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
+            score += len(re.findall(pattern, text_lower))
+        if score > 0:
+            emotion_scores[emotion] = score
+    if emotion_scores:
+        return max(emotion_scores, key=emotion_scores.get)
+    return 'neutral'
+
+
+def make_message(language: str, words: int, rng: random.Random) -> str:
+    """Long message of filler words with ~5% emotion keywords"""
+    keywords = [
+        keyword
+        for keywords_by_lang in EMOTION_KEYWORDS.values()
+        for keyword in keywords_by_lang.get(language, [])
+    ]
+    return ' '.join(
+        rng.choice(keywords) if rng.random() < 0.05 else rng.choice(FILLER[language])
+        for _ in range(words)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark emotion detection')
+    parser.add_argument('--words', type=int, default=2000, help='Words per message')
+    parser.add_argument('--repeat', type=int, default=50, help='Calls per measurement')
+    parser.add_argument('--batch', type=int, default=20000, help='Short messages in the batch scoring run')
+    args = parser.parse_args()
+    
+    rng = random.Random(42)
+    print(f"Messages of {args.words} words, {args.repeat} calls each (ms per call)")
+    print(f"  {'lang':<5} {'legacy':>9} {'matcher':>9} {'speedup':>8}  result (legacy → matcher)")
+    for language in ('en', 'hi', 'te'):
+        text = make_message(language, args.words, rng)
+        legacy = min(timeit.repeat(lambda: legacy_detect_emotion(text, language), number=args.repeat, repeat=3))
+        matcher = min(timeit.repeat(lambda: detect_emotion(text, language), number=args.repeat, repeat=3))
+        legacy_ms = legacy / args.repeat * 1000
+        matcher_ms = matcher / args.repeat * 1000
+        print(
+            f"  {language:<5} {legacy_ms:9.3f} {matcher_ms:9.3f} {legacy_ms / matcher_ms:7.1f}x  "
+            f"{legacy_detect_emotion(text, language)} → {detect_emotion(text, language)}"
+        )
+    
+    print(f"\nBatch of {args.batch} 30-word messages (ms per batch)")
+    print(f"  {'lang':<5} {'per-msg':>9} {'scorer':>9} {'speedup':>8} {'re-score':>9}")
+    for language in ('en', 'hi', 'te'):
+        messages = [make_message(language, 30, rng) for _ in range(args.batch)]
+        scorer = get_scorer(language)
+        per_message = min(timeit.repeat(
+            lambda: [detect_emotion_with_confidence(m, language) for m in messages], number=1, repeat=3
+        ))
+        vectorized = min(timeit.repeat(lambda: scorer.score(messages), number=1, repeat=3))
+        # Weight tuning: hits are computed once and re-scored per candidate weight set
+        hits = scorer.hit_matrix(messages)
+        rescore = min(timeit.repeat(lambda: scorer.score_hits(hits), number=1, repeat=3))
+        print(
+            f"  {language:<5} {per_message * 1000:9.1f} {vectorized * 1000:9.1f} "
+            f"{per_message / vectorized:7.1f}x {rescore * 1000:9.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
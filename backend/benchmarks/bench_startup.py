@@ -0,0 +1,79 @@
+"""
+Startup Benchmark - Cold-start time of the memory service
+Each run starts a fresh interpreter and reports:
+  import: importing main (the server can bind once this returns)
+  health: first /health response
+  ready:  warm-up finished (clients built, /health?ready=true answers 200)
+Usage: python benchmarks/bench_startup.py [--runs 5] [--local]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Runs inside the child interpreter; prints one JSON line of timings
+CHILD_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.app.test_client().get('/health')
+health = time.perf_counter()
+ready_ok = main.warmup.wait(timeout=TIMEOUT)
+ready = time.perf_counter()
+print('BENCH ' + json.dumps({
+    'import': imported - started,
+    'health': health - started,
+    'ready': ready - started if ready_ok else None,
+    'status': main.warmup.get_state()['status']
+}))
+"""
+
+
+def run_once(env: dict, timeout: float) -> dict:
+    """Start one interpreter and return its timings"""
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT.replace('TIMEOUT', repr(timeout))],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=timeout + 30
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith('BENCH '):
+            return json.loads(line[len('BENCH '):])
+    raise RuntimeError(f"Benchmark run failed:\n{result.stderr[-2000:]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure memory service cold start')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to start')
+    parser.add_argument('--local', action='store_true', help='Use VECTOR_STORE_BACKEND=local (no network)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Seconds to wait for warm-up')
+    args = parser.parse_args()
+    
+    env = dict(os.environ, PYTHONPATH=str(BACKEND_DIR), PYTHONWARNINGS='ignore')
+    env.pop('MEMORY_SERVICE_DEFER_INIT', None)
+    if args.local:
+        env['VECTOR_STORE_BACKEND'] = 'local'
+    
+    runs = [run_once(env, args.timeout) for _ in range(args.runs)]
+    
+    print(f"Cold start over {args.runs} runs (median / max, seconds)")
+    for key in ('import', 'health', 'ready'):
+        values = [r[key] for r in runs if r[key] is not None]
+        if values:
+            print(f"  {key:<7} {statistics.median(values):8.3f} / {max(values):8.3f}")
+        else:
+            print(f"  {key:<7} never (warm-up status: {runs[-1]['status']})")
+
+
+if __name__ == '__main__':
+    main()
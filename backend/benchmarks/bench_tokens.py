@@ -0,0 +1,97 @@
+"""
+Token Counting Benchmark - Budgeting a ~900k-token history
+Compares the legacy len(text) // 4 estimate over the formatted history with
+the per-script counter (cold and memoized) and the history cache's steady
+state, where a new turn renders and counts only itself. Token totals are
+only checked against a real tokenizer with --model (the per-script counts
+are themselves estimates; see calibrate_tokens.py)
+Usage: python benchmarks/bench_tokens.py [--tokens 900000] [--model tokenizer.model]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.history_cache import HEADER_TOKENS, HistoryCache, history_parts, render_conversation
+from services.token_counter import CachedTokenCounter, ScriptTokenCounter, SentencePieceCounter
+
+WORDS = {
+    'en': ['today', 'my', 'friend', 'said', 'that', 'the', 'exam', 'was', 'really', 'long', 'and', 'I', 'felt', 'lonely'],
+    'hi': ['आज', 'मेरा', 'दोस्त', 'बोला', 'कि', 'परीक्षा', 'बहुत', 'लंबी', 'थी', 'और', 'मैं', 'अकेला'],
+    'te': ['ఈరోజు', 'నా', 'స్నేహితుడు', 'చెప్పాడు', 'పరీక్ష', 'చాలా', 'పొడవుగా', 'ఉంది', 'మరియు', 'బాధ']
+}
+
+
+def make_history(language: str, tokens: int, counter: ScriptTokenCounter, rng: random.Random) -> list:
+    """Turns (newest first) until the history reaches about `tokens` tokens"""
+    history = []
+    total = 0
+    while total < tokens:
+        i = len(history)
+        conv = {
+            'id': f"bench_{i}",
+            'user_message': ' '.join(rng.choice(WORDS[language]) for _ in range(40)),
+            'yudi_response': ' '.join(rng.choice(WORDS[language]) for _ in range(60)),
+            'emotion': 'sad',
+            'timestamp': 1700000000 + i * 60
+        }
+        history.append(conv)
+        total += counter.count(render_conversation(conv)) + HEADER_TOKENS
+    history.reverse()
+    return history
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - started) * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark prompt token counting')
+    parser.add_argument('--tokens', type=int, default=900000, help='History size in (estimated) tokens')
+    parser.add_argument('--model', help='SentencePiece model for exact reference counts')
+    args = parser.parse_args()
+    
+    rng = random.Random(42)
+    script_counter = ScriptTokenCounter()
+    reference = SentencePieceCounter(args.model) if args.model else None
+    
+    print(f"History of ~{args.tokens} tokens (ms)")
+    print(f"  {'lang':<5} {'turns':>6} {'legacy':>8} {'script':>8} {'memo':>8} {'append':>8}  tokens legacy / script"
+          + (" / exact" if reference else ""))
+    for language in ('en', 'hi', 'te'):
+        history = make_history(language, args.tokens, script_counter, rng)
+        
+        # Legacy: format everything, then len // 4
+        legacy_ms, legacy_tokens = timed(
+            lambda: len(''.join(history_parts([render_conversation(c) for c in history]))) // 4
+        )
+        
+        # Per-script counter over rendered blocks, cold then memoized
+        blocks = [render_conversation(c) for c in history]
+        memo = CachedTokenCounter(script_counter, max_entries=len(blocks) + 1)
+        script_ms, script_tokens = timed(lambda: sum(memo.count(b) for b in blocks))
+        memo_ms, _ = timed(lambda: sum(memo.count(b) for b in blocks))
+        
+        # History cache steady state: previous turns cached, one new turn arrives
+        cache = HistoryCache(memo.count)
+        cache.get_blocks('bench', history[1:], args.tokens * 2)
+        append_ms, _ = timed(lambda: cache.get_blocks('bench', history, args.tokens * 2))
+        
+        line = (
+            f"  {language:<5} {len(history):>6} {legacy_ms:8.1f} {script_ms:8.1f} {memo_ms:8.1f} {append_ms:8.2f}"
+            f"  {legacy_tokens} / {script_tokens}"
+        )
+        if reference:
+            _, exact = timed(lambda: sum(reference.count(b) for b in blocks))
+            line += f" / {exact}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Token Ratio Calibration - Fit ScriptTokenCounter's chars-per-token ratios
+Counts sample texts with a SentencePiece model (e.g. Gemma's tokenizer.model),
+fits one ratio per script and reports the estimate's error before and after.
+Samples are UTF-8 text files with one message per line; use real chat text
+in each language (English, Hindi, Telugu) for ratios that match production
+Usage: python benchmarks/calibrate_tokens.py --model tokenizer.model samples_en.txt samples_hi.txt ...
+Then set TOKEN_CHARS_PER_TOKEN to the printed JSON
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.token_counter import ScriptTokenCounter, SentencePieceCounter
+
+
+def read_samples(paths: list) -> list:
+    """Non-empty lines of the sample files"""
+    samples = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            samples.extend(line.strip() for line in f if line.strip())
+    return samples
+
+
+def error_pct(counter: ScriptTokenCounter, reference: SentencePieceCounter, samples: list) -> float:
+    """Total estimate error against the reference, in percent"""
+    estimated = sum(counter.count(text) for text in samples)
+    exact = sum(reference.count(text) for text in samples)
+    return (estimated - exact) / exact * 100 if exact else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Fit per-script token ratios to a SentencePiece model')
+    parser.add_argument('--model', required=True, help='SentencePiece model file')
+    parser.add_argument('samples', nargs='+', help='Sample files (one message per line)')
+    args = parser.parse_args()
+    
+    reference = SentencePieceCounter(args.model)
+    samples = read_samples(args.samples)
+    if not samples:
+        parser.error('no sample text found')
+    
+    default = ScriptTokenCounter()
+    fitted = ScriptTokenCounter.calibrate(reference, samples)
+    
+    print(f"{len(samples)} samples from {len(args.samples)} file(s)")
+    print(f"  {'script':<11} {'default':>8} {'fitted':>8}")
+    for script, ratio in fitted.chars_per_token.items():
+        print(f"  {script:<11} {default.chars_per_token[script]:8.2f} {ratio:8.2f}")
+    print(f"Total error: default {error_pct(default, reference, samples):+.1f}%, "
+          f"fitted {error_pct(fitted, reference, samples):+.1f}%")
+    print()
+    print(f"TOKEN_CHARS_PER_TOKEN='{json.dumps({s: round(r, 3) for s, r in fitted.chars_per_token.items()})}'")
+
+
+if __name__ == '__main__':
+    main()
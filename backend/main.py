@@ -4,10 +4,13 @@ Provides REST API for storing and retrieving conversation memories in Pinecone
 Note: Voice calls use Gemini Live API (frontend-only), no backend needed
 """
 
+import atexit
+import json
 import os
+import time
 import traceback
 from pathlib import Path
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 
 # Load environment variables from .env file in project root
@@ -24,51 +27,207 @@ except ImportError:
 except Exception as e:
     print(f"⚠️  Warning: Failed to load .env file: {e}")
 
-# Import Pinecone Memory Service (ONLY service needed - used by text chat)
-try:
-    from services.vector_db import PineconeMemory
-    VECTOR_DB_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️  Warning: Could not import vector_db: {e}")
-    VECTOR_DB_AVAILABLE = False
-    PineconeMemory = None
+# Light imports only: vector_db (Pinecone + genai) is imported during warm-up
+from services.memory_queue import QueueFullError, create_write_queue_from_env
+from services.deletion_jobs import DeletionJobManager
+from services.service_warmup import ServiceWarmup
+from services.emotion_detector import SUPPORTED_LANGUAGES, detect_emotions_batch
+from services.emotion_scorer import score_emotions_batch
+from services.emotion_session import create_emotion_tracker_from_env
+from services.gemini_client import get_background_gemini_client, get_gemini_client
+from services.gemini_chat import generate_digest, history_cache, stream_response_with_history
+from services.memory_digest import create_digest_manager_from_env
+from services.token_counter import get_token_counter
+from services.prompt_cache import get_context_cache
+
+# Upper bound on memories accepted by /api/memories/store_batch
+MAX_BATCH_MEMORIES = int(os.environ.get('MAX_BATCH_MEMORIES', 1000))
+
+# Upper bound on texts accepted by /api/emotion/batch
+MAX_EMOTION_BATCH = int(os.environ.get('MAX_EMOTION_BATCH', 10000))
+
+# Past memories sent as history with each streamed chat turn
+CHAT_HISTORY_LIMIT = int(os.environ.get('CHAT_HISTORY_LIMIT', 100))
+
+# Chat context: 'full' = the last CHAT_HISTORY_LIMIT turns verbatim, 'compact'
+# (opt-in) = recent turns + digests + retrieved memories within PROMPT_CONTEXT_TOKENS
+CHAT_CONTEXT_MODE = os.environ.get('CHAT_CONTEXT_MODE', 'full').lower()
+
+# Memories from semantic search added to the compact context (0 = none)
+CHAT_RETRIEVE_TOP_K = int(os.environ.get('CHAT_RETRIEVE_TOP_K', 5))
+
+# Background compaction of older turns into hierarchical digests (opt-in: each
+# digest is an extra Gemini call)
+MEMORY_DIGESTS = os.environ.get('MEMORY_DIGESTS', 'False').lower() == 'true'
+
+# Write-behind by default: /api/memories/store and chat turns queue the memory
+# (store returns 202); per request, /api/memories/store?async=true|false overrides it
+MEMORY_WRITE_BEHIND = os.environ.get('MEMORY_WRITE_BEHIND', 'False').lower() == 'true'
+
+# Async memory path: context lookups fan out on one event loop (needs httpx)
+MEMORY_ASYNC = os.environ.get('MEMORY_ASYNC', 'True').lower() == 'true'
+
+# Warm-up: build clients in the background at startup (False = on first request)
+MEMORY_WARMUP = os.environ.get('MEMORY_WARMUP', 'True').lower() == 'true'
+
+# Seconds a request waits for warm-up before answering 503
+MEMORY_INIT_WAIT = float(os.environ.get('MEMORY_INIT_WAIT', 5))
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for Next.js frontend
 
-# Initialize Pinecone Memory (used for text chat memory storage/retrieval)
-print("Initializing Pinecone Memory Service...")
-try:
-    if VECTOR_DB_AVAILABLE and PineconeMemory:
-        memory_db = PineconeMemory()
-        print("✅ Pinecone Memory Service ready!")
-    else:
-        memory_db = None
-        print("⚠️  Pinecone Memory not available (VECTOR_DB_AVAILABLE=False)")
-except Exception as e:
-    print(f"❌ Pinecone Memory initialization failed: {e}")
-    memory_db = None
+# Rolling per-user mood, updated on every stored turn (in-process, no network)
+emotion_tracker = create_emotion_tracker_from_env()
+
+# Service clients (published by the warm-up thread: memory_db is set last, so
+# the others are ready whenever memory_db is not None)
+memory_db = None
+write_queue = None
+deletion_jobs = None
+digest_manager = None
+async_memory = None
+async_runner = None
+warmup = None
+
+
+def _create_services(resume_deletion_jobs: bool) -> None:
+    """Create the Pinecone/genai clients and background workers (raises on failure)"""
+    global memory_db, write_queue, deletion_jobs, digest_manager, async_memory, async_runner
+    
+    # Import Pinecone Memory Service (ONLY service needed - used by text chat)
+    from services.vector_db import PineconeMemory
+    
+    # Initialize Pinecone Memory (used for text chat memory storage/retrieval)
+    print("Initializing Pinecone Memory Service...")
+    memory = PineconeMemory()
+    
+    # Background writer for write-behind stores (drained on shutdown); always
+    # running so ?async=true works even when write-behind is not the default
+    queue = create_write_queue_from_env(memory)
+    queue.start()
+    print(f"✅ Memory write-behind queue started (default: {'on' if MEMORY_WRITE_BEHIND else 'off'})")
+    
+    # Background user deletions (state persisted when MEMORY_DELETE_JOBS_PATH is set)
+    jobs = DeletionJobManager(memory, state_path=os.environ.get('MEMORY_DELETE_JOBS_PATH'))
+    if resume_deletion_jobs:
+        jobs.resume_incomplete()
+    
+    # Digests of older turns, refreshed in the background after new turns
+    digests = None
+    if MEMORY_DIGESTS:
+        digests = create_digest_manager_from_env(memory, generate_digest)
+        digests.start()
+        print("✅ Memory digest worker started")
+    
+    # Event loop shared by all request threads for concurrent memory I/O
+    if MEMORY_ASYNC:
+        try:
+            from services.async_vector_db import AsyncLoopRunner, AsyncPineconeMemory
+            async_memory = AsyncPineconeMemory(memory)
+            async_runner = AsyncLoopRunner()
+            print("✅ Async memory service ready")
+        except Exception as e:
+            print(f"⚠️  Async memory service unavailable: {e}")
+            async_memory = None
+    
+    write_queue = queue
+    deletion_jobs = jobs
+    digest_manager = digests
+    memory_db = memory
+    print("✅ Pinecone Memory Service ready!")
+
+
+def init_services(resume_deletion_jobs: bool = True, wait: bool = False) -> None:
+    """
+    Start building the service clients for this process
+    
+    Returns immediately (the port can bind while Pinecone/genai initialize);
+    transient failures are retried in the background with backoff.
+    
+    Args:
+        resume_deletion_jobs: Resume persisted deletion jobs whose worker has exited
+        wait: Block until initialization finishes
+    """
+    global warmup
+    
+    if warmup is None:
+        warmup = ServiceWarmup(lambda: _create_services(resume_deletion_jobs))
+    if MEMORY_WARMUP or wait:
+        warmup.start()
+    if wait:
+        warmup.wait()
+
+
+def _service_unavailable():
+    """503 response while the memory service is not ready (None once it is)"""
+    if memory_db is not None:
+        return None
+    
+    # Lazy mode starts warm-up on first use; give it a moment before failing
+    if warmup is not None:
+        warmup.wait(MEMORY_INIT_WAIT)
+        if memory_db is not None:
+            return None
+        state = warmup.get_state()
+        if state['status'] in ('pending', 'initializing'):
+            return jsonify({
+                'success': False,
+                'error': 'Pinecone Memory is warming up, retry shortly.',
+                'warmup': state
+            }), 503
+    
+    return jsonify({
+        'success': False,
+        'error': 'Pinecone Memory not available. Set PINECONE_API_KEY (or VECTOR_STORE_BACKEND=local).'
+    }), 503
+
+
+def shutdown_services(timeout: float = 30.0) -> None:
+    """Drain queued memory writes and stop background workers"""
+    if write_queue is not None:
+        write_queue.shutdown(timeout=timeout)
+    if deletion_jobs is not None:
+        deletion_jobs.shutdown()
+    if digest_manager is not None:
+        digest_manager.shutdown()
+    if async_runner is not None:
+        async_runner.shutdown(async_memory.aclose())
+    if memory_db is not None:
+        memory_db.embedding_cache.flush()
+
+
+# serve.py sets this so clients are created in each worker, not in the master
+if os.environ.get('MEMORY_SERVICE_DEFER_INIT', 'False').lower() != 'true':
+    init_services()
+    atexit.register(shutdown_services)
 
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (?ready=true answers 503 until warm-up finishes)"""
+    state = warmup.get_state() if warmup is not None else {'status': 'pending'}
+    ready = memory_db is not None
+    status_code = 503 if request.args.get('ready', 'false').lower() == 'true' and not ready else 200
     return jsonify({
         'status': 'healthy',
         'service': 'pinecone-memory',
-        'pinecone_available': memory_db is not None
-    }), 200
+        'pinecone_available': ready,
+        'warmup': state
+    }), status_code
 
 
 @app.route('/api/memories/store', methods=['POST'])
 def store_memory():
-    """Store a conversation memory in Pinecone"""
-    if memory_db is None:
-        return jsonify({
-            'success': False,
-            'error': 'Pinecone Memory not available. Set PINECONE_API_KEY environment variable.'
-        }), 503
+    """
+    Store a conversation memory in Pinecone
+    
+    ?async=true queues it and answers 202 with the pre-assigned memory_id,
+    ?async=false stores it before answering (default: MEMORY_WRITE_BEHIND)
+    """
+    unavailable = _service_unavailable()
+    if unavailable:
+        return unavailable
     
     try:
         data = request.get_json()
@@ -76,13 +235,40 @@ def store_memory():
             return jsonify({'success': False, 'error': 'Request body must be JSON'}), 400
         
         user_id = data.get('user_id')
-        user_message = data.get('user_message', '').strip()
-        yudi_response = data.get('yudi_response', '').strip()
+        user_message = data.get('user_message', '')
+        yudi_response = data.get('yudi_response', '')
         
-        if not user_id:
-            return jsonify({'success': False, 'error': 'user_id is required'}), 400
-        if not user_message or not yudi_response:
-            return jsonify({'success': False, 'error': 'user_message and yudi_response are required'}), 400
+        # Same checks as the synchronous store: a queued memory must not fail later for bad input
+        try:
+            memory_db.validate_memory(user_id, user_message, yudi_response, data.get('emotion'), data.get('metadata'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        user_message = user_message.strip()
+        yudi_response = yudi_response.strip()
+        
+        # Write-behind: queue and return the pre-assigned ID (?async= overrides the default)
+        use_queue = request.args.get('async', str(MEMORY_WRITE_BEHIND)).lower() == 'true'
+        if write_queue is not None and use_queue:
+            try:
+                memory_id = write_queue.enqueue(
+                    user_id=user_id,
+                    user_message=user_message,
+                    yudi_response=yudi_response,
+                    emotion=data.get('emotion'),
+                    metadata=data.get('metadata', {})
+                )
+                _note_turn(user_id)
+                session_mood = _track_mood(user_id, user_message, data)
+                return jsonify({
+                    'success': True,
+                    'memory_id': memory_id,
+                    'queued': True,
+                    'session_mood': session_mood,
+                    'message': 'Memory queued for storage'
+                }), 202
+            except QueueFullError:
+                # Backpressure: queue is saturated, store synchronously instead
+                pass
         
         memory_id = memory_db.store_conversation(
             user_id=user_id,
@@ -91,10 +277,13 @@ def store_memory():
             emotion=data.get('emotion'),
             metadata=data.get('metadata', {})
         )
+        _note_turn(user_id)
+        session_mood = _track_mood(user_id, user_message, data)
         
         return jsonify({
             'success': True,
             'memory_id': memory_id,
+            'session_mood': session_mood,
             'message': 'Memory stored successfully'
         }), 200
     except Exception as e:
@@ -103,14 +292,50 @@ def store_memory():
         return jsonify({'success': False, 'error': f'Failed to store memory: {str(e)}'}), 500
 
 
+@app.route('/api/memories/store_batch', methods=['POST'])
+def store_memory_batch():
+    """Store many conversation memories with batched embeddings and upserts"""
+    unavailable = _service_unavailable()
+    if unavailable:
+        return unavailable
+    
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'error': 'Request body must be JSON'}), 400
+    
+        memories = data.get('memories')
+        if not isinstance(memories, list) or not memories:
+            return jsonify({'success': False, 'error': 'memories must be a non-empty list'}), 400
+        if len(memories) > MAX_BATCH_MEMORIES:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_BATCH_MEMORIES} memories per request'
+            }), 400
+    
+        result = memory_db.store_conversations_bulk(memories)
+        for user_id in {memories[item['index']].get('user_id') for item in result['succeeded']}:
+            _note_turn(user_id)
+    
+        return jsonify({
+            'success': not result['failed'],
+            'stored_count': len(result['succeeded']),
+            'failed_count': len(result['failed']),
+            'succeeded': result['succeeded'],
+            'failed': result['failed']
+        }), 200
+    except Exception as e:
+        print(f"Memory batch store error: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({'success': False, 'error': f'Failed to store memories: {str(e)}'}), 500
+
+
 @app.route('/api/memories/<user_id>', methods=['GET'])
 def retrieve_memories(user_id: str):
     """Retrieve similar memories for a user"""
-    if memory_db is None:
-        return jsonify({
-            'success': False,
-            'error': 'Pinecone Memory not available. Set PINECONE_API_KEY environment variable.'
-        }), 503
+    unavailable = _service_unavailable()
+    if unavailable:
+        return unavailable
     
     try:
         query_text = request.args.get('query', '').strip()
@@ -123,57 +348,357 @@ def retrieve_memories(user_id: str):
                 user_id=user_id, query_text=query_text, top_k=top_k,
                 emotion_filter=emotion_filter, min_score=min_score
             )
-        else:
-            memories = memory_db.get_user_memories(user_id, limit=top_k)
-            memories = [{
-                'id': m.get('id'), 'score': None,
-                'user_message': m.get('user_message'),
-                'yudi_response': m.get('yudi_response'),
-                'emotion': m.get('emotion'),
-                'timestamp': m.get('timestamp'),
-                'datetime': m.get('datetime')
-            } for m in memories]
-        
-        return jsonify({'success': True, 'memories': memories, 'count': len(memories)}), 200
+            return jsonify({'success': True, 'memories': memories, 'count': len(memories)}), 200
+        
+        # No query: newest-first listing, paged with ?before=<next_before>&limit=
+        limit = min(int(request.args.get('limit', top_k)), 100)
+        page = memory_db.list_user_memories(user_id, before=request.args.get('before'), limit=limit)
+        memories = [dict(m, score=None) for m in page['memories']]
+        
+        return jsonify({
+            'success': True,
+            'memories': memories,
+            'count': len(memories),
+            'next_before': page['next_before']
+        }), 200
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         print(f"Memory retrieval error: {str(e)}")
         print(traceback.format_exc())
         return jsonify({'success': False, 'error': f'Failed to retrieve memories: {str(e)}'}), 500
 
 
+@app.route('/api/memories/<user_id>/context', methods=['GET'])
+def memory_context(user_id: str):
+    """Relevant (semantic) and recent memories for a chat turn, fetched concurrently"""
+    unavailable = _service_unavailable()
+    if unavailable:
+        return unavailable
+    
+    try:
+        query_text = request.args.get('query', '').strip() or None
+        top_k = min(int(request.args.get('top_k', 5)), 100)
+        recent_limit = min(int(request.args.get('recent', 10)), 100)
+        min_score = float(request.args.get('min_score', 0.0))
+        
+        if async_memory is not None:
+            context = async_runner.run(
+                async_memory.get_context(user_id, query_text, top_k, recent_limit, min_score),
+                timeout=60
+            )
+        else:
+            context = {
+                'relevant': memory_db.retrieve_memories(
+                    user_id=user_id, query_text=query_text, top_k=top_k, min_score=min_score
+                ) if query_text else [],
+                'recent': memory_db.list_user_memories(user_id, limit=recent_limit)['memories']
+            }
+        
+        return jsonify({'success': True, **context}), 200
+    except Exception as e:
+        print(f"Memory context error: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({'success': False, 'error': f'Failed to get memory context: {str(e)}'}), 500
+
+
 @app.route('/api/memories/<user_id>/delete', methods=['DELETE'])
 def delete_user_memories(user_id: str):
-    """Delete all memories for a user"""
-    if memory_db is None:
-        return jsonify({
-            'success': False,
-            'error': 'Pinecone Memory not available. Set PINECONE_API_KEY environment variable.'
-        }), 503
+    """Delete all memories for a user (background job; ?wait=true deletes inline)"""
+    unavailable = _service_unavailable()
+    if unavailable:
+        return unavailable
     
     try:
-        deleted_count = memory_db.delete_user_memories(user_id)
+        # Queued writes would otherwise land after the deletion has listed the user's IDs
+        if write_queue is not None:
+            write_queue.cancel_user(user_id)
+        emotion_tracker.reset(user_id)
+        history_cache.invalidate(user_id)
+        context_cache = get_context_cache()
+        if context_cache is not None:
+            context_cache.invalidate(user_id)
+        if digest_manager is not None:
+            digest_manager.delete_user_digests(user_id)
+        if request.args.get('wait', 'false').lower() == 'true':
+            deleted_count = memory_db.delete_user_memories(user_id)
+            return jsonify({
+                'success': True,
+                'deleted_count': deleted_count,
+                'message': f'Deleted {deleted_count} memories for user {user_id}'
+            }), 200
+        
+        job = deletion_jobs.start(user_id)
         return jsonify({
             'success': True,
-            'deleted_count': deleted_count,
-            'message': f'Deleted {deleted_count} memories for user {user_id}'
-        }), 200
+            'job': job,
+            'status_url': f"/api/memories/delete_jobs/{job['job_id']}",
+            'message': f'Deletion of memories for user {user_id} started'
+        }), 202
     except Exception as e:
         print(f"Memory deletion error: {str(e)}")
         print(traceback.format_exc())
         return jsonify({'success': False, 'error': f'Failed to delete memories: {str(e)}'}), 500
 
 
+@app.route('/api/memories/<user_id>/digests', methods=['GET'])
+def user_digests(user_id: str):
+    """A user's memory digests (?compact=true compacts new turns first)"""
+    unavailable = _service_unavailable()
+    if unavailable:
+        return unavailable
+    if digest_manager is None:
+        return jsonify({'success': False, 'error': 'Memory digests are disabled (MEMORY_DIGESTS=false)'}), 404
+    
+    try:
+        created = 0
+        if request.args.get('compact', 'false').lower() == 'true':
+            created = digest_manager.compact(user_id)
+        return jsonify({
+            'success': True,
+            'digests': digest_manager.get_digests(user_id),
+            'covered_until': digest_manager.covered_until(user_id),
+            'created': created
+        }), 200
+    except Exception as e:
+        print(f"Memory digest error: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({'success': False, 'error': f'Failed to get digests: {str(e)}'}), 500
+
+
+@app.route('/api/memories/delete_jobs/<job_id>', methods=['GET'])
+def delete_job_status(job_id: str):
+    """Get progress of a memory deletion job"""
+    unavailable = _service_unavailable()
+    if unavailable:
+        return unavailable
+    
+    job = deletion_jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Deletion job not found'}), 404
+    return jsonify({'success': True, 'job': job}), 200
+
+
+@app.route('/api/memories/delete_jobs/<job_id>/resume', methods=['POST'])
+def resume_delete_job(job_id: str):
+    """Resume a failed memory deletion job"""
+    unavailable = _service_unavailable()
+    if unavailable:
+        return unavailable
+    
+    job = deletion_jobs.resume(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Deletion job not found'}), 404
+    return jsonify({'success': True, 'job': job}), 202
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _note_turn(user_id: str) -> None:
+    """Let the digest worker know a user has a new stored turn"""
+    if digest_manager is not None and user_id:
+        digest_manager.note_turn(user_id)
+
+
+def _track_mood(user_id: str, user_message: str, data: dict) -> dict:
+    """Add a stored (or queued) turn to the user's session mood"""
+    return emotion_tracker.update(
+        user_id, user_message, language=data.get('language', 'en'), emotion=data.get('emotion')
+    )
+
+
+def _store_turn(user_id: str, user_message: str, yudi_response: str, emotion: str):
+    """Store a finished chat turn (write-behind when enabled); returns the memory ID or None"""
+    if memory_db is None:
+        return None
+    try:
+        memory_id = None
+        if write_queue is not None and MEMORY_WRITE_BEHIND:
+            try:
+                memory_id = write_queue.enqueue(
+                    user_id=user_id, user_message=user_message, yudi_response=yudi_response, emotion=emotion
+                )
+            except QueueFullError:
+                pass
+        if memory_id is None:
+            memory_id = memory_db.store_conversation(
+                user_id=user_id, user_message=user_message, yudi_response=yudi_response, emotion=emotion
+            )
+        _note_turn(user_id)
+        return memory_id
+    except Exception as e:
+        print(f"Chat turn store error: {str(e)}")
+        return None
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Stream Yudi's reply as Server-Sent Events
+    
+    Events: 'chunk' {text} as tokens arrive, then 'done' {text, memory_id,
+    emotion, ttft_ms, total_ms} after the full reply is stored, or 'error' {error}
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'success': False, 'error': 'Request body must be JSON'}), 400
+    
+    user_id = data.get('user_id')
+    user_message = (data.get('user_message') or '').strip()
+    language = data.get('language', 'en')
+    if not user_id or not user_message:
+        return jsonify({'success': False, 'error': 'user_id and user_message are required'}), 400
+    
+    # Session mood steers the prompt unless the caller supplies an emotion; the
+    # message only counts towards it once the turn is stored
+    mood = emotion_tracker.preview(user_id, user_message, language=language, emotion=data.get('emotion'))
+    emotion = data.get('emotion') or mood['emotion']
+    
+    # History is best effort: a cold or unavailable memory service must not block the reply
+    history = []
+    digests = None
+    retrieved = None
+    if memory_db is not None:
+        try:
+            if CHAT_CONTEXT_MODE == 'compact':
+                if digest_manager is not None:
+                    context = digest_manager.get_prompt_context(user_id)
+                    history, digests = context['recent'], context['digests']
+                else:
+                    history, digests = memory_db.get_user_memories(user_id, limit=CHAT_HISTORY_LIMIT), []
+                retrieved = []
+                if CHAT_RETRIEVE_TOP_K > 0:
+                    retrieved = memory_db.retrieve_memories(user_id, user_message, top_k=CHAT_RETRIEVE_TOP_K)
+            else:
+                history = memory_db.get_user_memories(user_id, limit=CHAT_HISTORY_LIMIT)
+        except Exception as e:
+            print(f"Chat history error: {str(e)}")
+    
+    def generate():
+        started = time.monotonic()
+        first_token_at = None
+        chunks = []
+        try:
+            for text in stream_response_with_history(
+                user_message, history, language, emotion,
+                user_id=user_id, digests=digests, retrieved=retrieved
+            ):
+                if first_token_at is None:
+                    first_token_at = time.monotonic()
+                chunks.append(text)
+                yield _sse('chunk', {'text': text})
+        except Exception as e:
+            print(f"Chat stream error: {str(e)}")
+            yield _sse('error', {'error': str(e)})
+            return
+        
+        reply = ''.join(chunks).strip()
+        memory_id = _store_turn(user_id, user_message, reply, emotion)
+        if memory_id is not None:
+            _track_mood(user_id, user_message, data)
+        yield _sse('done', {
+            'text': reply,
+            'memory_id': memory_id,
+            'emotion': emotion,
+            'ttft_ms': round((first_token_at - started) * 1000, 1),
+            'total_ms': round((time.monotonic() - started) * 1000, 1)
+        })
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/emotion/batch', methods=['POST'])
+def emotion_batch():
+    """Detect emotions for many texts (analytics, emotion backfills)"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'error': 'Request body must be JSON'}), 400
+        
+        texts = data.get('texts')
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            return jsonify({'success': False, 'error': 'texts must be a list of strings'}), 400
+        if len(texts) > MAX_EMOTION_BATCH:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_EMOTION_BATCH} texts per request'
+            }), 400
+        
+        languages = data.get('languages', data.get('language', 'en'))
+        codes = [languages] if isinstance(languages, str) else languages
+        if not isinstance(codes, list) or not all(isinstance(c, str) and c in SUPPORTED_LANGUAGES for c in codes):
+            return jsonify({
+                'success': False,
+                'error': f'languages must be one of {list(SUPPORTED_LANGUAGES)} or a list of them'
+            }), 400
+        
+        # vectorized: NumPy scorer with negation handling (always returns confidence)
+        if data.get('vectorized', False):
+            results = score_emotions_batch(texts, languages)
+        else:
+            results = detect_emotions_batch(
+                texts,
+                languages=languages,
+                with_confidence=bool(data.get('with_confidence', False))
+            )
+        
+        return jsonify({'success': True, 'results': results, 'count': len(results)}), 200
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        print(f"Emotion batch error: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({'success': False, 'error': f'Failed to detect emotions: {str(e)}'}), 500
+
+
+@app.route('/api/emotion/<user_id>/mood', methods=['GET'])
+def session_mood(user_id: str):
+    """Rolling session mood of a user (decayed over recent turns)"""
+    mood = emotion_tracker.get_mood(user_id)
+    if mood is None:
+        return jsonify({
+            'success': True,
+            'mood': {'emotion': 'neutral', 'confidence': 0.3, 'scores': {}, 'turns': 0},
+            'active': False
+        }), 200
+    return jsonify({'success': True, 'mood': mood, 'active': True}), 200
+
+
+@app.route('/api/gemini/stats', methods=['GET'])
+def gemini_stats():
+    """Gemini HTTP client, prompt history cache and context cache statistics"""
+    context_cache = get_context_cache()
+    return jsonify({
+        'success': True,
+        'stats': get_gemini_client().get_stats(),
+        'background_stats': get_background_gemini_client().get_stats() if MEMORY_DIGESTS else None,
+        'history_cache': history_cache.get_stats(),
+        'token_counter': get_token_counter().get_stats(),
+        'context_cache': context_cache.get_stats() if context_cache is not None else None
+    }), 200
+
+
 @app.route('/api/memories/stats', methods=['GET'])
 def memory_stats():
     """Get Pinecone index statistics"""
-    if memory_db is None:
-        return jsonify({
-            'success': False,
-            'error': 'Pinecone Memory not available. Set PINECONE_API_KEY environment variable.'
-        }), 503
+    unavailable = _service_unavailable()
+    if unavailable:
+        return unavailable
     
     try:
         stats = memory_db.get_stats()
+        if write_queue is not None:
+            stats['write_queue'] = write_queue.get_stats()
+        stats['emotion_sessions'] = emotion_tracker.get_stats()
+        if digest_manager is not None:
+            stats['digests'] = digest_manager.get_stats()
         return jsonify({'success': True, 'stats': stats}), 200
     except Exception as e:
         return jsonify({'success': False, 'error': f'Failed to get stats: {str(e)}'}), 500
@@ -207,12 +732,21 @@ if __name__ == '__main__':
     print(f"   Health check: http://localhost:{port}/health")
     print(f"   Pinecone Memory endpoints:")
     print(f"     - POST /api/memories/store")
+    print(f"     - POST /api/memories/store_batch")
     print(f"     - GET /api/memories/<user_id>?query=text&top_k=5")
+    print(f"     - GET /api/memories/<user_id>?before=<cursor>&limit=20")
+    print(f"     - GET /api/memories/<user_id>/context?query=text&top_k=5&recent=10")
+    print(f"     - GET /api/memories/<user_id>/digests?compact=false")
     print(f"     - DELETE /api/memories/<user_id>/delete")
+    print(f"     - GET /api/memories/delete_jobs/<job_id>")
     print(f"     - GET /api/memories/stats")
-    if not memory_db:
-        print(f"     (Note: Endpoints will return 503 until PINECONE_API_KEY is set)")
+    print(f"     - POST /api/chat/stream (Server-Sent Events)")
+    print(f"     - POST /api/emotion/batch")
+    print(f"     - GET /api/emotion/<user_id>/mood")
+    print(f"     - GET /api/gemini/stats")
+    print(f"     (Note: Endpoints return 503 until warm-up finishes; see /health)")
     print(f"")
     print(f"✅ Voice calls use Gemini Live API (frontend-only, no backend needed)")
-
+    print(f"   (Development server - use `python serve.py` in production)")
+    
     app.run(host='0.0.0.0', port=port, debug=debug)
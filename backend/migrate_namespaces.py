@@ -0,0 +1,36 @@
+"""
+Namespace Migration - Move existing memories into the configured namespace layout
+Usage: MEMORY_NAMESPACE_LAYOUT=user python migrate_namespaces.py --from flat
+"""
+
+import argparse
+from pathlib import Path
+
+try:
+    from dotenv import load_dotenv
+    env_path = Path(__file__).parent.parent / '.env'
+    if env_path.exists():
+        load_dotenv(dotenv_path=env_path)
+except ImportError:
+    pass
+
+from services.vector_db import NAMESPACE_LAYOUTS, PineconeMemory
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Move memories between namespace layouts')
+    parser.add_argument('--from', dest='source_layout', default='flat', choices=NAMESPACE_LAYOUTS,
+                        help='Layout the existing vectors were written with (default: flat)')
+    parser.add_argument('--to', dest='target_layout', default=None, choices=NAMESPACE_LAYOUTS,
+                        help='Target layout (default: MEMORY_NAMESPACE_LAYOUT)')
+    parser.add_argument('--page-size', type=int, default=100, help='Vectors moved per round-trip')
+    args = parser.parse_args()
+
+    memory_db = PineconeMemory(namespace_layout=args.target_layout)
+    print(f"Migrating memories: {args.source_layout} → {memory_db.namespace_layout}")
+    counts = memory_db.migrate_namespaces(args.source_layout, page_size=args.page_size)
+    print(f"Moved {counts['moved']}, skipped {counts['skipped']}, failed {counts['failed']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Production Server - Runs the memory service under gunicorn
+Pinecone/genai clients and background workers are created in each worker after
+fork; on worker exit queued write-behind memories are drained before shutdown
+Usage: python serve.py  (falls back to a threaded Werkzeug server without gunicorn)
+
+SERVE_WORKERS: worker processes (default WEB_CONCURRENCY or 2 x CPUs + 1;
+    always 1 with VECTOR_STORE_BACKEND=local)
+SERVE_THREADS: threads per worker (default 4; > 1 uses the gthread worker)
+SERVE_TIMEOUT: seconds before a silent worker is restarted (default 120)
+SERVE_GRACEFUL_TIMEOUT: seconds workers get to drain on shutdown (default 30)
+
+Per-process state with more than one worker:
+- VECTOR_STORE_BACKEND=local: the index lives in the worker's memory, so
+  each worker would serve its own copy (forced to a single worker)
+- Deletion jobs: shared through MEMORY_DELETE_JOBS_PATH; without it a job
+  can only be polled or resumed on the worker that started it
+- Session mood (EMOTION_SESSION_*): each worker tracks the messages it
+  served, so a user's mood is split across workers (use sticky sessions,
+  or a single worker, where the mood must see every message)
+- Memory digests: each worker caches digests for DIGEST_CACHE_TTL seconds
+  and re-reads them from the vector store after that
+"""
+
+import multiprocessing
+import os
+
+# Must be set before main is imported: clients are created per worker in post_fork
+os.environ['MEMORY_SERVICE_DEFER_INIT'] = 'true'
+
+import main
+
+try:
+    from gunicorn.app.base import BaseApplication
+    GUNICORN_AVAILABLE = True
+except ImportError:
+    BaseApplication = object
+    GUNICORN_AVAILABLE = False
+
+
+def post_fork(server, worker) -> None:
+    """Create service clients in the new worker (it also takes over deletion jobs of exited workers)"""
+    main.init_services()
+
+
+def worker_exit(server, worker) -> None:
+    """Drain queued memory writes before the worker exits"""
+    main.shutdown_services(timeout=max(server.cfg.graceful_timeout - 5, 1))
+
+
+class MemoryServiceApplication(BaseApplication):
+    """Gunicorn application serving main.app with settings from a dict"""
+    
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+    
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+    
+    def load(self):
+        return main.app
+
+
+def get_options() -> dict:
+    """Build gunicorn settings from environment variables"""
+    workers = int(os.getenv('SERVE_WORKERS', os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)))
+    threads = int(os.getenv('SERVE_THREADS', '4'))
+    if os.getenv('VECTOR_STORE_BACKEND', 'pinecone').lower() == 'local' and workers > 1:
+        # Each worker would load (and write) its own copy of the local index
+        print(f"⚠️  VECTOR_STORE_BACKEND=local keeps the index in process memory; using 1 worker instead of {workers}")
+        workers = 1
+    elif workers > 1 and not os.getenv('MEMORY_DELETE_JOBS_PATH'):
+        print("⚠️  MEMORY_DELETE_JOBS_PATH not set: deletion jobs can only be polled on the worker that started them")
+    return {
+        'bind': f"0.0.0.0:{os.getenv('PORT', '5002')}",
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread' if threads > 1 else 'sync',
+        'timeout': int(os.getenv('SERVE_TIMEOUT', '120')),
+        'graceful_timeout': int(os.getenv('SERVE_GRACEFUL_TIMEOUT', '30')),
+        'preload_app': True,
+        'post_fork': post_fork,
+        'worker_exit': worker_exit
+    }
+
+
+if __name__ == '__main__':
+    options = get_options()
+    
+    if GUNICORN_AVAILABLE:
+        print(f"🚀 Starting Pinecone Memory Service with gunicorn on {options['bind']}")
+        print(f"   Workers: {options['workers']} x {options['threads']} threads ({options['worker_class']})")
+        MemoryServiceApplication(options).run()
+    else:
+        from werkzeug.serving import run_simple
+        
+        print("⚠️  gunicorn not installed (pip install gunicorn); using threaded Werkzeug server")
+        main.init_services()
+        try:
+            run_simple('0.0.0.0', int(os.getenv('PORT', '5002')), main.app, threaded=True)
+        finally:
+            main.shutdown_services()
@@ -0,0 +1,357 @@
+"""
+Async Pinecone Memory - asyncio-native memory operations over pooled HTTP
+Embedding and vector calls go through one httpx.AsyncClient on a single event
+loop, so hundreds of in-flight calls share a connection pool instead of each
+holding a thread; independent steps (query embedding, recent-history fetch)
+run concurrently with asyncio.gather
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Coroutine, Dict, List, Optional
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+    httpx = None
+
+from .vector_db import PineconeMemory
+from .vector_store import PineconeVectorStore
+
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+PINECONE_API_VERSION = "2024-07"
+
+
+class AsyncPineconeMemory:
+    """
+    Async counterpart of PineconeMemory's store/retrieve/list operations
+    Namespaces, vector IDs, metadata, the embedding cache and the recency index
+    are shared with the wrapped PineconeMemory, so both can serve the same data
+    """
+    
+    def __init__(
+        self,
+        memory: Optional[PineconeMemory] = None,
+        max_connections: int = 100,
+        timeout: float = 30.0
+    ):
+        """
+        Initialize Async Pinecone Memory
+        
+        Args:
+            memory: PineconeMemory providing configuration and shared state (default: new instance)
+            max_connections: HTTP connection pool size (caps in-flight requests)
+            timeout: Per-request timeout in seconds
+        """
+        if not HTTPX_AVAILABLE:
+            raise ImportError("httpx not installed. Install with: pip install httpx")
+        
+        self.memory = memory or PineconeMemory()
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.gemini_api_key = os.getenv('GEMINI_API_KEY')
+        
+        # Pinecone data plane is called over REST; other stores run in worker threads
+        self.pinecone_host = None
+        self.pinecone_api_key = None
+        if isinstance(self.memory.store, PineconeVectorStore) and self.memory.pc is not None:
+            self.pinecone_host = self.memory.index_host or self.memory.pc.describe_index(self.memory.index_name).host
+            self.pinecone_api_key = os.getenv('PINECONE_API_KEY')
+        
+        # Created on first use so the client binds to the loop that runs it
+        self._client = None
+    
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._client
+    
+    async def aclose(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _get_embedding(self, text: str, task_type: str = "retrieval_document") -> List[float]:
+        """
+        Generate embedding for text using the Gemini Embeddings REST API
+        
+        Args:
+            text: Text to generate embedding for
+            task_type: "retrieval_document" (for storing) or "retrieval_query" (for searching)
+        
+        Returns:
+            List of floats representing the embedding vector
+        """
+        model = self.memory.embedding_model
+        if not model or not self.gemini_api_key:
+            raise RuntimeError("Embedding model not configured. Set GEMINI_API_KEY.")
+        
+        cached = self.memory.embedding_cache.get(text, model, task_type)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self.client.post(
+                f"{GEMINI_API_BASE}/{model}:embedContent",
+                params={'key': self.gemini_api_key},
+                json={
+                    'model': model,
+                    'content': {'parts': [{'text': text}]},
+                    'taskType': task_type.upper()
+                }
+            )
+            response.raise_for_status()
+            embedding = response.json().get('embedding', {}).get('values', [])
+        except Exception as e:
+            raise RuntimeError(f"Failed to generate embedding: {str(e)}")
+        
+        if embedding:
+            self.memory.embedding_cache.set(text, model, task_type, embedding)
+        return embedding
+    
+    async def _pinecone(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        """Call the Pinecone data plane REST API"""
+        response = await self.client.request(
+            method,
+            f"https://{self.pinecone_host}{path}",
+            headers={
+                'Api-Key': self.pinecone_api_key,
+                'X-Pinecone-API-Version': PINECONE_API_VERSION
+            },
+            **kwargs
+        )
+        response.raise_for_status()
+        return response.json() if response.content else {}
+    
+    async def _upsert(self, vectors: List[Dict[str, Any]], namespace: str) -> None:
+        if self.pinecone_host is None:
+            await asyncio.to_thread(self.memory.store.upsert, vectors, namespace)
+            return
+        await self._pinecone('POST', '/vectors/upsert', json={'vectors': vectors, 'namespace': namespace})
+    
+    async def _query(
+        self,
+        vector: List[float],
+        top_k: int,
+        filter: Optional[Dict[str, Any]],
+        namespace: str
+    ) -> List[Dict[str, Any]]:
+        if self.pinecone_host is None:
+            matches = await asyncio.to_thread(self.memory.store.query, vector, top_k, filter, namespace)
+            return [{'id': m.id, 'score': m.score, 'metadata': m.metadata} for m in matches]
+        body = {'vector': vector, 'topK': top_k, 'namespace': namespace, 'includeMetadata': True}
+        if filter:
+            body['filter'] = filter
+        data = await self._pinecone('POST', '/query', json=body)
+        return data.get('matches', [])
+    
+    async def _fetch(self, ids: List[str], namespace: str) -> Dict[str, Dict[str, Any]]:
+        if not ids:
+            return {}
+        if self.pinecone_host is None:
+            return await asyncio.to_thread(self.memory.store.fetch, ids, namespace)
+        data = await self._pinecone('GET', '/vectors/fetch', params={'ids': ids, 'namespace': namespace})
+        return data.get('vectors', {})
+    
+    async def store_conversation(
+        self,
+        user_id: str,
+        user_message: str,
+        yudi_response: str,
+        emotion: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Store a conversation (same contract as PineconeMemory.store_conversation)
+        
+        Returns:
+            Vector ID (unique identifier for this memory)
+        """
+        embedding = await self._get_embedding(f"{user_message} {yudi_response}")
+        
+        now = time.time()
+        vector_id = self.memory._new_vector_id(user_id, int(now * 1000))
+        vector_metadata = self.memory._build_metadata(
+            user_id, user_message, yudi_response, emotion, metadata, timestamp=now
+        )
+        
+        try:
+            await self._upsert([{
+                'id': vector_id,
+                'values': embedding,
+                'metadata': vector_metadata
+            }], namespace=self.memory._namespace_for(user_id))
+        except Exception as e:
+            raise RuntimeError(f"Failed to store in Pinecone: {str(e)}")
+        
+        self.memory.recency_index.add(user_id, vector_id, int(now * 1000))
+        return vector_id
+    
+    async def retrieve_memories(
+        self,
+        user_id: str,
+        query_text: str,
+        top_k: int = 5,
+        emotion_filter: Optional[str] = None,
+        min_score: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve similar memories (same contract as PineconeMemory.retrieve_memories)
+        
+        Returns:
+            List of dictionaries containing memory data and similarity scores
+        """
+        query_embedding = await self._get_embedding(query_text, task_type="retrieval_query")
+        
+        filter_dict = self.memory._user_filter(user_id)
+        if emotion_filter:
+            filter_dict['emotion'] = emotion_filter
+        
+        try:
+            matches = await self._query(
+                query_embedding, top_k, filter_dict or None, self.memory._namespace_for(user_id)
+            )
+        except Exception as e:
+            raise RuntimeError(f"Failed to query Pinecone: {str(e)}")
+        
+        memories = []
+        for match in matches:
+            if match['score'] >= min_score:
+                metadata = match.get('metadata') or {}
+                memories.append({
+                    'id': match['id'],
+                    'score': match['score'],
+                    'user_message': metadata.get('user_message', ''),
+                    'yudi_response': metadata.get('yudi_response', ''),
+                    'emotion': metadata.get('emotion'),
+                    'timestamp': metadata.get('timestamp'),
+                    'datetime': metadata.get('datetime')
+                })
+        return memories
+    
+    async def list_user_memories(
+        self,
+        user_id: str,
+        before: Optional[float] = None,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        List a user's memories newest first (same contract as PineconeMemory.list_user_memories)
+        
+        Returns:
+            {'memories': [...], 'next_before': cursor for the next page or None}
+        """
+        before_ms = None
+        if before is not None:
+            before = float(before)
+            before_ms = int(before * 1000) if before < 1e11 else int(before)
+        
+        try:
+            if not self.memory.recency_index.is_fresh(user_id):
+                # ID listing is paginated and only needed when the timeline is cold
+                await asyncio.to_thread(self.memory._load_timeline, user_id)
+            
+            entries, has_more = self.memory.recency_index.page(user_id, before_ms=before_ms, limit=limit)
+            vectors = await self._fetch(
+                [vector_id for _, vector_id in entries], self.memory._namespace_for(user_id)
+            )
+        except Exception as e:
+            raise RuntimeError(f"Failed to list user memories: {str(e)}")
+        
+        memories = []
+        for _, vector_id in entries:
+            vector = vectors.get(vector_id)
+            if vector is None:
+                continue
+            metadata = vector.get('metadata') or {}
+            memories.append({
+                'id': vector_id,
+                'user_message': metadata.get('user_message', ''),
+                'yudi_response': metadata.get('yudi_response', ''),
+                'emotion': metadata.get('emotion'),
+                'timestamp': metadata.get('timestamp'),
+                'datetime': metadata.get('datetime')
+            })
+        
+        next_before = entries[-1][0] if entries and has_more else None
+        return {'memories': memories, 'next_before': next_before}
+    
+    async def get_context(
+        self,
+        user_id: str,
+        query_text: Optional[str] = None,
+        top_k: int = 5,
+        recent_limit: int = 10,
+        min_score: float = 0.0
+    ) -> Dict[str, Any]:
+        """
+        Fetch relevant and recent memories for a chat turn concurrently
+        
+        Args:
+            user_id: User identifier
+            query_text: Current message for semantic search (None = recent only)
+            top_k: Relevant memories to return
+            recent_limit: Recent memories to return
+            min_score: Minimum similarity score for relevant memories
+        
+        Returns:
+            {'relevant': [...], 'recent': [...]}
+        """
+        recent_task = self.list_user_memories(user_id, limit=recent_limit)
+        if not query_text:
+            return {'relevant': [], 'recent': (await recent_task)['memories']}
+        
+        relevant, recent = await asyncio.gather(
+            self.retrieve_memories(user_id, query_text, top_k=top_k, min_score=min_score),
+            recent_task
+        )
+        return {'relevant': relevant, 'recent': recent['memories']}
+
+
+class AsyncLoopRunner:
+    """
+    Event loop on a background thread for calling coroutines from sync code
+    Flask handlers submit work here, so all their I/O is multiplexed on one loop
+    """
+    
+    def __init__(self, name: str = 'memory-async-loop'):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self.thread.start()
+    
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the loop and wait for its result
+        
+        Args:
+            coro: Coroutine to run
+            timeout: Maximum seconds to wait (None = no limit)
+        
+        Returns:
+            The coroutine's result (its exception is re-raised)
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+    
+    def shutdown(self, cleanup: Optional[Coroutine] = None, timeout: float = 5.0) -> None:
+        """Run an optional cleanup coroutine, then stop the loop"""
+        if cleanup is not None and self.loop.is_running():
+            try:
+                self.run(cleanup, timeout=timeout)
+            except Exception as e:
+                print(f"⚠️  Async memory cleanup failed: {str(e)}")
+        elif cleanup is not None:
+            cleanup.close()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=timeout)
@@ -0,0 +1,260 @@
+"""
+Deletion Jobs - Background, resumable deletion of all memories of a user
+GDPR deletes for heavy users no longer hold a Flask worker; progress is
+exposed per job and job state can be persisted so restarts resume them.
+The state file is shared by all workers: each job record is merged into it
+under a file lock, so any worker can report or resume any job. Jobs record
+the PID of the worker running them; a job whose worker has exited (recycled
+or crashed) is taken over by the next worker that starts or asks for it
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+# File locking for the shared state file (not on Windows: single worker only there)
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# Finished jobs are kept this long for status queries
+JOB_RETENTION_SECONDS = 7 * 24 * 3600
+
+
+class DeletionJobManager:
+    """
+    Runs PineconeMemory.delete_user_memories_paged in background threads
+    One active job per user; failed or interrupted jobs can be resumed
+    """
+    
+    def __init__(self, memory_db, state_path: Optional[str] = None, max_workers: int = 2):
+        """
+        Initialize Deletion Job Manager
+        
+        Args:
+            memory_db: PineconeMemory instance
+            state_path: JSON file where job state is persisted and shared between workers (None = memory only)
+            max_workers: Deletion jobs running at the same time
+        """
+        self.memory_db = memory_db
+        self.state_path = state_path
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='memory-delete')
+    
+    def start(self, user_id: str) -> Dict[str, Any]:
+        """
+        Start deleting a user's memories (returns the running job if there is one)
+        
+        Args:
+            user_id: User identifier
+        
+        Returns:
+            Job status dictionary
+        """
+        with self.lock, self._state_lock():
+            # Jobs started by any worker count; an orphaned one is taken over
+            for job in {**self._read_state(), **self.jobs}.values():
+                if job['user_id'] == user_id and job['status'] in ('pending', 'running'):
+                    if _owner_alive(job.get('owner_pid')):
+                        return dict(job)
+                    return self._take_over(job)
+            
+            now = time.time()
+            self._prune(self.jobs, now)
+            job = {
+                'job_id': uuid.uuid4().hex,
+                'user_id': user_id,
+                'status': 'pending',
+                'deleted': 0,
+                'attempts': 0,
+                'error': None,
+                'created_at': now,
+                'updated_at': now,
+                'finished_at': None,
+                'owner_pid': os.getpid()
+            }
+            self.jobs[job['job_id']] = job
+            self._save(job, locked=True)
+        
+        self.executor.submit(self._run, job['job_id'])
+        return dict(job)
+    
+    def resume(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Re-run a failed job, or one whose worker exited (deleted count keeps accumulating)
+        
+        Args:
+            job_id: Job identifier
+        
+        Returns:
+            Job status dictionary, or None if the job is unknown
+        """
+        with self.lock, self._state_lock():
+            # The persisted record is the latest one, wherever the job last ran
+            job = self._read_state().get(job_id) or self.jobs.get(job_id)
+            if job is None:
+                return None
+            orphaned = job['status'] in ('pending', 'running') and not _owner_alive(job.get('owner_pid'))
+            if job['status'] in ('failed', 'interrupted') or orphaned:
+                return self._take_over(job)
+            return dict(job)
+    
+    def resume_incomplete(self) -> int:
+        """
+        Resume jobs left pending or running by a worker that has exited
+        
+        Safe to call from every worker: jobs whose worker is still alive are
+        left alone, and the state lock makes sure only one worker takes over
+        each orphaned job.
+        
+        Returns:
+            Number of jobs resumed
+        """
+        with self.lock, self._state_lock():
+            orphaned = [
+                job for job in self._read_state().values()
+                if job['status'] in ('pending', 'running') and not _owner_alive(job.get('owner_pid'))
+            ]
+            for job in orphaned:
+                self._take_over(job)
+        if orphaned:
+            print(f"✅ Resumed {len(orphaned)} memory deletion jobs")
+        return len(orphaned)
+    
+    def _take_over(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a job in this worker (caller holds self.lock and the state lock)"""
+        job['status'] = 'pending'
+        job['error'] = None
+        job['updated_at'] = time.time()
+        job['owner_pid'] = os.getpid()
+        self.jobs[job['job_id']] = job
+        self._save(job, locked=True)
+        self.executor.submit(self._run, job['job_id'])
+        return dict(job)
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get job status (None if unknown; jobs run by other workers come from the state file)"""
+        with self.lock, self._state_lock():
+            job = self._read_state().get(job_id) or self.jobs.get(job_id)
+            return dict(job) if job else None
+    
+    def _run(self, job_id: str) -> None:
+        with self.lock:
+            job = self.jobs[job_id]
+            job['status'] = 'running'
+            job['attempts'] += 1
+            job['updated_at'] = time.time()
+            base_deleted = job['deleted']
+            user_id = job['user_id']
+            self._save(job)
+        
+        def on_progress(deleted: int) -> None:
+            with self.lock:
+                job['deleted'] = base_deleted + deleted
+                job['updated_at'] = time.time()
+                self._save(job)
+        
+        try:
+            self.memory_db.delete_user_memories_paged(user_id, progress_callback=on_progress)
+            status, error = 'completed', None
+            print(f"✅ Deletion job {job_id} finished for user {user_id}")
+        except Exception as e:
+            status, error = 'failed', str(e)
+            print(f"❌ Deletion job {job_id} failed for user {user_id}: {error}")
+        
+        with self.lock:
+            job['status'] = status
+            job['error'] = error
+            job['updated_at'] = time.time()
+            if status == 'completed':
+                job['finished_at'] = job['updated_at']
+            self._save(job)
+    
+    @staticmethod
+    def _prune(jobs: Dict[str, Dict[str, Any]], now: float) -> None:
+        """Forget completed jobs past the retention window"""
+        expired = [
+            job_id for job_id, job in jobs.items()
+            if job['status'] == 'completed' and now - job['finished_at'] > JOB_RETENTION_SECONDS
+        ]
+        for job_id in expired:
+            del jobs[job_id]
+    
+    @contextmanager
+    def _state_lock(self) -> Iterator[None]:
+        """Exclusive lock on the shared state file across workers (caller holds self.lock)"""
+        if not self.state_path or not FCNTL_AVAILABLE:
+            yield
+            return
+        with open(self.state_path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _read_state(self) -> Dict[str, Dict[str, Any]]:
+        """All persisted jobs (caller holds the state lock)"""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Could not load deletion job state from {self.state_path}: {str(e)}")
+            return {}
+    
+    def _save(self, job: Dict[str, Any], locked: bool = False) -> None:
+        """
+        Merge one job's record into the shared state file (caller holds self.lock)
+        
+        Args:
+            job: Job to persist
+            locked: Caller already holds the state lock
+        """
+        if not self.state_path:
+            return
+        if not locked:
+            with self._state_lock():
+                self._save(job, locked=True)
+            return
+        
+        state = self._read_state()
+        state[job['job_id']] = job
+        self._prune(state, time.time())
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"⚠️  Failed to persist deletion job state: {str(e)}")
+    
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop accepting jobs (running jobs resume on next start when state is persisted)"""
+        self.executor.shutdown(wait=wait)
+
+
+def _owner_alive(pid: Optional[int]) -> bool:
+    """Whether the worker process that owns a job is still running"""
+    if pid is None:
+        return False
+    if pid == os.getpid():
+        return True
+    if not FCNTL_AVAILABLE:
+        return False  # single worker only (and os.kill(pid, 0) would terminate it on Windows)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
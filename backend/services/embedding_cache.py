@@ -0,0 +1,279 @@
+"""
+Embedding Cache - Content-addressed cache for Gemini embeddings
+Skips the embedding round-trip for repeated texts ("ok", "idk", "i'm sad")
+Two tiers: bounded in-memory LRU + optional SQLite file that survives restarts.
+Disk writes are batched into one commit per commit_every rows or
+commit_interval seconds, and the file is pruned by row count and age
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+class EmbeddingCache:
+    """
+    LRU cache for embedding vectors keyed by (model, task_type, normalized text)
+    Vectors are held as float32 arrays (Pinecone stores float32 anyway)
+    """
+    
+    def __init__(
+        self,
+        max_size: int = 10000,
+        disk_path: Optional[str] = None,
+        disk_max_rows: int = 1000000,
+        disk_max_age: float = 30 * 86400.0,
+        commit_every: int = 64,
+        commit_interval: float = 2.0
+    ):
+        """
+        Initialize Embedding Cache
+        
+        Args:
+            max_size: Maximum number of vectors kept in memory (LRU eviction after this)
+            disk_path: Path to SQLite file for the persistent tier (None = memory only)
+            disk_max_rows: Maximum rows in the SQLite tier (oldest deleted after this)
+            disk_max_age: Seconds a row is kept in the SQLite tier
+            commit_every: Pending rows that trigger a commit
+            commit_interval: Seconds after which pending rows are committed on the next set
+        """
+        self.max_size = max_size
+        self.disk_path = disk_path
+        self.disk_max_rows = disk_max_rows
+        self.disk_max_age = disk_max_age
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.cache: OrderedDict[str, array] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        
+        # The SQLite tier has its own lock: memory hits never wait on disk I/O
+        self.db_lock = threading.Lock()
+        self.pending: Dict[str, Tuple[bytes, float]] = {}
+        self.pending_since = 0.0
+        self.disk_rows = 0
+        self.commits = 0
+        self.pruned = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if disk_path:
+            try:
+                directory = os.path.dirname(os.path.abspath(disk_path))
+                os.makedirs(directory, exist_ok=True)
+                self._db = sqlite3.connect(disk_path, check_same_thread=False)
+                self._db.execute('PRAGMA journal_mode=WAL')
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS embeddings ('
+                    'key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)'
+                )
+                self._db.execute('CREATE INDEX IF NOT EXISTS embeddings_created_at ON embeddings (created_at)')
+                self._db.commit()
+                self._prune()
+            except Exception as e:
+                print(f"⚠️  Embedding disk cache disabled ({disk_path}): {str(e)}")
+                self._db = None
+    
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapse whitespace and lowercase so trivial variants share an entry"""
+        return ' '.join(text.split()).lower()
+    
+    def _make_key(self, text: str, model: str, task_type: str) -> str:
+        """
+        Create content-addressed cache key
+        
+        Args:
+            text: Text that is embedded
+            model: Embedding model name
+            task_type: Embedding task type
+        
+        Returns:
+            Cache key string
+        """
+        key_string = f"{model}\x00{task_type}\x00{self.normalize(text)}"
+        return hashlib.sha256(key_string.encode('utf-8')).hexdigest()
+    
+    def get(self, text: str, model: str, task_type: str) -> Optional[List[float]]:
+        """
+        Get cached embedding
+        
+        Args:
+            text: Text that is embedded
+            model: Embedding model name
+            task_type: Embedding task type
+        
+        Returns:
+            Embedding as list of floats if cached, None otherwise
+        """
+        key = self._make_key(text, model, task_type)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return self.cache[key].tolist()
+            if self._db is None:
+                self.misses += 1
+                return None
+        
+        row = None
+        with self.db_lock:
+            pending = self.pending.get(key)
+            if pending is not None:
+                row = pending
+            else:
+                try:
+                    row = self._db.execute(
+                        'SELECT vector FROM embeddings WHERE key = ?', (key,)
+                    ).fetchone()
+                except sqlite3.Error:
+                    row = None
+        
+        with self.lock:
+            if row is None:
+                self.misses += 1
+                return None
+            vector = array('f')
+            vector.frombytes(row[0])
+            self._remember(key, vector)
+            self.disk_hits += 1
+            return vector.tolist()
+    
+    def set(self, text: str, model: str, task_type: str, embedding: List[float]) -> None:
+        """
+        Cache embedding for text
+        
+        Args:
+            text: Text that was embedded
+            model: Embedding model name
+            task_type: Embedding task type
+            embedding: Embedding vector
+        """
+        key = self._make_key(text, model, task_type)
+        vector = array('f', embedding)
+        with self.lock:
+            self._remember(key, vector)
+        if self._db is None:
+            return
+        
+        now = time.time()
+        with self.db_lock:
+            if not self.pending:
+                self.pending_since = now
+            self.pending[key] = (vector.tobytes(), now)
+            if len(self.pending) >= self.commit_every or now - self.pending_since >= self.commit_interval:
+                self._commit()
+    
+    def flush(self) -> None:
+        """Commit pending rows to the SQLite tier (call on shutdown)"""
+        if self._db is None:
+            return
+        with self.db_lock:
+            self._commit()
+    
+    def _commit(self) -> None:
+        """Write pending rows in one transaction (caller holds db_lock)"""
+        if not self.pending:
+            return
+        rows = [(key, blob, created_at) for key, (blob, created_at) in self.pending.items()]
+        self.pending.clear()
+        try:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)', rows
+            )
+            self._db.commit()
+            self.commits += 1
+            self.disk_rows += len(rows)  # replaced keys overcount until the next prune
+        except sqlite3.Error as e:
+            print(f"⚠️  Failed to persist {len(rows)} embeddings: {str(e)}")
+        if self.disk_rows > self.disk_max_rows:
+            self._prune()
+    
+    def _prune(self) -> None:
+        """Delete expired rows and the oldest rows over disk_max_rows (caller holds db_lock)"""
+        try:
+            deleted = self._db.execute(
+                'DELETE FROM embeddings WHERE created_at < ?', (time.time() - self.disk_max_age,)
+            ).rowcount
+            self.disk_rows = self._db.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+            excess = self.disk_rows - self.disk_max_rows
+            if excess > 0:
+                # Leave headroom so the next prune is not one batch away
+                excess += self.disk_max_rows // 10
+                deleted += self._db.execute(
+                    'DELETE FROM embeddings WHERE key IN '
+                    '(SELECT key FROM embeddings ORDER BY created_at LIMIT ?)', (excess,)
+                ).rowcount
+                self.disk_rows = max(0, self.disk_rows - excess)
+            self._db.commit()
+            self.pruned += max(deleted, 0)
+        except sqlite3.Error as e:
+            print(f"⚠️  Failed to prune embedding disk cache: {str(e)}")
+    
+    def _remember(self, key: str, vector: array) -> None:
+        """Insert into memory tier (caller holds the lock)"""
+        self.cache[key] = vector
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)  # Remove oldest (first) item
+    
+    def clear(self) -> None:
+        """Clear memory tier and counters (disk tier is kept)"""
+        with self.lock:
+            self.cache.clear()
+            self.hits = 0
+            self.disk_hits = 0
+            self.misses = 0
+    
+    def get_stats(self) -> Dict:
+        """
+        Get cache statistics
+        
+        Returns:
+            Dictionary with cache stats
+        """
+        with self.lock:
+            total = self.hits + self.disk_hits + self.misses
+            hit_rate = ((self.hits + self.disk_hits) / total * 100) if total > 0 else 0.0
+            
+            stats = {
+                'size': len(self.cache),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': f"{hit_rate:.1f}%",
+                'disk_enabled': self._db is not None
+            }
+        if self._db is not None:
+            with self.db_lock:
+                stats['disk_size'] = self.disk_rows
+                stats['disk_max_rows'] = self.disk_max_rows
+                stats['disk_pending'] = len(self.pending)
+                stats['disk_commits'] = self.commits
+                stats['disk_pruned'] = self.pruned
+        return stats
+
+
+def create_embedding_cache_from_env() -> EmbeddingCache:
+    """
+    Build an EmbeddingCache from environment variables
+    
+    EMBEDDING_CACHE_SIZE: in-memory entries (default 10000)
+    EMBEDDING_CACHE_PATH: SQLite file for the persistent tier (unset = memory only)
+    EMBEDDING_CACHE_DISK_MAX_ROWS: rows kept in the SQLite tier (default 1000000)
+    EMBEDDING_CACHE_DISK_MAX_AGE: seconds a row is kept in the SQLite tier (default 2592000)
+    """
+    max_size = int(os.getenv('EMBEDDING_CACHE_SIZE', '10000'))
+    disk_path = os.getenv('EMBEDDING_CACHE_PATH') or None
+    return EmbeddingCache(
+        max_size=max_size,
+        disk_path=disk_path,
+        disk_max_rows=int(os.getenv('EMBEDDING_CACHE_DISK_MAX_ROWS', '1000000')),
+        disk_max_age=float(os.getenv('EMBEDDING_CACHE_DISK_MAX_AGE', str(30 * 86400)))
+    )
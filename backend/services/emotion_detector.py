@@ -4,7 +4,9 @@ Simple keyword-based emotion detection for Gen-Z emotional support
 """
 
 import re
-from typing import Dict, Optional, Literal
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Literal, Tuple, Union
 
 # Emotion keywords by language
 EMOTION_KEYWORDS = {
@@ -41,6 +43,110 @@ EMOTION_KEYWORDS = {
 }
 
 
+# Language codes with keywords; anything else is matched with the English keywords
+SUPPORTED_LANGUAGES = tuple(sorted({
+    language for keywords_by_lang in EMOTION_KEYWORDS.values() for language in keywords_by_lang
+}))
+
+
+def normalize_language(language: Any) -> str:
+    """Supported language code for a (possibly client-supplied) value ('en' if unknown)"""
+    return language if isinstance(language, str) and language in SUPPORTED_LANGUAGES else 'en'
+
+
+# Characters that continue a word: \w misses Indic vowel signs and viramas
+# (categories Mn/Mc), so r'\b' never matched after e.g. 'अकेला' or 'ఒంటరిగా'.
+# Danda (।, ॥) is punctuation and ends a word.
+WORD_CHARS = r'\w\u0900-\u0963\u0966-\u097F\u0C00-\u0C7F\u200C\u200D'
+
+
+class EmotionMatcher:
+    """
+    All emotion keywords of a language compiled into one alternation regex
+    A single scan returns per-emotion counts; longer keywords win where they
+    overlap ('ठीक है' counts once, not as 'ठीक' + 'ठीक है')
+    """
+    
+    def __init__(self, keywords_by_emotion: Dict[str, List[str]]):
+        """
+        Initialize Emotion Matcher
+        
+        Args:
+            keywords_by_emotion: {emotion: keywords}
+        """
+        self.emotions = list(keywords_by_emotion)
+        self.keyword_emotions: Dict[str, List[str]] = {}
+        for emotion, keywords in keywords_by_emotion.items():
+            for keyword in keywords:
+                emotions = self.keyword_emotions.setdefault(keyword.lower(), [])
+                if emotion not in emotions:
+                    emotions.append(emotion)
+        
+        alternation = '|'.join(
+            re.escape(keyword)
+            for keyword in sorted(self.keyword_emotions, key=len, reverse=True)
+        )
+        self.pattern = re.compile(f'(?<![{WORD_CHARS}])(?:{alternation})(?![{WORD_CHARS}])')
+    
+    def count(self, text: str) -> Dict[str, int]:
+        """
+        Count keyword matches per emotion in one pass
+        
+        Args:
+            text: Message text
+            
+        Returns:
+            {emotion: match count} for emotions with at least one match,
+            in EMOTION_KEYWORDS order
+        """
+        counts: Dict[str, int] = {}
+        for keyword in self.pattern.findall(text.lower()):
+            for emotion in self.keyword_emotions[keyword]:
+                counts[emotion] = counts.get(emotion, 0) + 1
+        return {emotion: counts[emotion] for emotion in self.emotions if emotion in counts}
+
+
+_matchers: Dict[str, EmotionMatcher] = {}
+
+
+def get_matcher(language: str = 'en') -> EmotionMatcher:
+    """
+    Matcher for a language's keywords plus English (compiled once per language)
+    
+    Args:
+        language: Language code ('en', 'hi', 'te'; unknown codes use 'en')
+        
+    Returns:
+        EmotionMatcher instance
+    """
+    # Only supported codes become cache keys (language can come straight from a request)
+    language = normalize_language(language)
+    matcher = _matchers.get(language)
+    if matcher is None:
+        matcher = EmotionMatcher({
+            emotion: keywords_by_lang.get(language, []) + keywords_by_lang.get('en', [])
+            for emotion, keywords_by_lang in EMOTION_KEYWORDS.items()
+        })
+        _matchers[language] = matcher
+    return matcher
+
+
+def count_emotions(text: str, language: str = 'en') -> Dict[str, int]:
+    """
+    Per-emotion keyword counts for a message
+    
+    Args:
+        text: User's message text
+        language: Language code ('en', 'hi', 'te')
+        
+    Returns:
+        {emotion: match count} for emotions with at least one match
+    """
+    if not text:
+        return {}
+    return get_matcher(language).count(text)
+
+
 def detect_emotion(text: str, language: str = 'en') -> str:
     """
     Detect emotion from text using keyword matching
@@ -55,22 +161,8 @@ def detect_emotion(text: str, language: str = 'en') -> str:
     if not text:
         return 'neutral'
     
-    text_lower = text.lower()
-    emotion_scores = {}
-    
     # Score each emotion based on keyword matches
-    for emotion, keywords_by_lang in EMOTION_KEYWORDS.items():
-        score = 0
-        keywords = keywords_by_lang.get(language, []) + keywords_by_lang.get('en', [])
-        
-        for keyword in keywords:
-            # Use word boundaries for better matching
-            pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
-            matches = len(re.findall(pattern, text_lower))
-            score += matches
-        
-        if score > 0:
-            emotion_scores[emotion] = score
+    emotion_scores = count_emotions(text, language)
     
     # Return emotion with highest score, or neutral if no matches
     if emotion_scores:
@@ -94,21 +186,8 @@ def detect_emotion_with_confidence(text: str, language: str = 'en') -> Dict[str,
     if not text:
         return {'emotion': 'neutral', 'confidence': 0.5, 'scores': {}}
     
-    text_lower = text.lower()
-    emotion_scores = {}
-    
     # Score each emotion
-    for emotion, keywords_by_lang in EMOTION_KEYWORDS.items():
-        score = 0
-        keywords = keywords_by_lang.get(language, []) + keywords_by_lang.get('en', [])
-        
-        for keyword in keywords:
-            pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
-            matches = len(re.findall(pattern, text_lower))
-            score += matches
-        
-        if score > 0:
-            emotion_scores[emotion] = score
+    emotion_scores = count_emotions(text, language)
     
     if not emotion_scores:
         return {'emotion': 'neutral', 'confidence': 0.3, 'scores': {}}
@@ -126,3 +205,97 @@ def detect_emotion_with_confidence(text: str, language: str = 'en') -> Dict[str,
         'scores': emotion_scores
     }
 
+
+def _detect_one(text: str, language: str, with_confidence: bool):
+    if with_confidence:
+        return detect_emotion_with_confidence(text, language)
+    return detect_emotion(text, language)
+
+
+def _detect_chunk(chunk: List[Tuple[str, str]], with_confidence: bool) -> List[Any]:
+    """Process-pool task: each worker compiles its matchers once and reuses them"""
+    return [_detect_one(text, language, with_confidence) for text, language in chunk]
+
+
+def _chunks(messages: Iterable[Tuple[str, str]], chunk_size: int) -> Iterator[List[Tuple[str, str]]]:
+    chunk = []
+    for message in messages:
+        chunk.append(message)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_emotions(
+    messages: Iterable[Union[str, Tuple[str, str]]],
+    language: str = 'en',
+    with_confidence: bool = False,
+    processes: Optional[int] = None,
+    chunk_size: int = 1000
+) -> Iterator[Any]:
+    """
+    Stream emotion detection over an iterable of messages (results in input order)
+    
+    Args:
+        messages: Message texts, or (text, language) pairs
+        language: Language for plain-text messages
+        with_confidence: Yield detect_emotion_with_confidence dicts instead of emotion strings
+        processes: Fan out across this many worker processes (None/0/1 = in-process)
+        chunk_size: Messages per process-pool task
+        
+    Yields:
+        Emotion string (or confidence dict) per message
+    """
+    pairs = (
+        (message, language) if isinstance(message, str) else (message[0], message[1] or language)
+        for message in messages
+    )
+    
+    if not processes or processes <= 1:
+        for text, lang in pairs:
+            yield _detect_one(text, lang, with_confidence)
+        return
+    
+    # Bounded number of chunks in flight so huge iterables are never fully materialized
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        pending = deque()
+        for chunk in _chunks(pairs, chunk_size):
+            pending.append(executor.submit(_detect_chunk, chunk, with_confidence))
+            if len(pending) >= processes * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def detect_emotions_batch(
+    texts: List[str],
+    languages: Union[str, List[str]] = 'en',
+    with_confidence: bool = False,
+    processes: Optional[int] = None,
+    chunk_size: int = 1000
+) -> List[Any]:
+    """
+    Detect emotions for many messages
+    
+    Args:
+        texts: Message texts
+        languages: One language code for all texts, or one per text
+        with_confidence: Return detect_emotion_with_confidence dicts instead of emotion strings
+        processes: Fan out across this many worker processes (None/0/1 = in-process)
+        chunk_size: Messages per process-pool task
+        
+    Returns:
+        Emotion string (or confidence dict) per text, in input order
+    """
+    if isinstance(languages, str):
+        messages = [(text, languages) for text in texts]
+    else:
+        if not isinstance(languages, (list, tuple)) or len(languages) != len(texts):
+            raise ValueError("languages must be a string or a list the same length as texts")
+        messages = list(zip(texts, languages))
+    
+    return list(iter_emotions(
+        messages, with_confidence=with_confidence, processes=processes, chunk_size=chunk_size
+    ))
@@ -0,0 +1,277 @@
+"""
+Emotion Scorer - Vectorized emotion scoring for large batches
+Messages become keyword-hit vectors (one regex scan per batch), which are multiplied
+by a keyword x emotion weight matrix; argmax and confidence are computed for the
+whole batch at once. Negated keywords ("not happy", "खुश नहीं") hit separate
+columns weighted by negation_weight, so negation costs no extra pass
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from .emotion_detector import EMOTION_KEYWORDS, WORD_CHARS, normalize_language
+
+# Negators before a keyword (one word may sit in between: "not very happy")
+NEGATORS_BEFORE = {
+    'en': ['not', 'never', 'no', "don't", 'dont', "didn't", "isn't", "wasn't", "aren't", "ain't", 'hardly', 'barely'],
+    'hi': ['नहीं', 'नही', 'न', 'मत'],
+    'te': []
+}
+
+# Negators after a keyword ("खुश नहीं", "సంతోషంగా లేను")
+NEGATORS_AFTER = {
+    'en': [],
+    'hi': ['नहीं', 'नही'],
+    'te': ['లేదు', 'లేను', 'కాదు']
+}
+
+
+def _alternation(words: List[str]) -> str:
+    return '|'.join(re.escape(w) for w in sorted(set(words), key=len, reverse=True))
+
+
+class EmotionScorer:
+    """
+    Keyword x emotion weight matrix for one language (plus English keywords)
+    Rows 0..k-1 weight plain hits, rows k..2k-1 weight negated hits
+    """
+    
+    def __init__(
+        self,
+        language: str = 'en',
+        weights: Optional[Dict[str, Dict[str, float]]] = None,
+        negation_weight: float = -0.5
+    ):
+        """
+        Initialize Emotion Scorer
+        
+        Args:
+            language: Language code ('en', 'hi', 'te')
+            weights: {emotion: {keyword: weight}} overrides (default weight 1.0)
+            negation_weight: Multiplier applied to negated hits (0 ignores them,
+                negative values count against the emotion)
+        """
+        self.language = language
+        self.negation_weight = negation_weight
+        self.emotions = list(EMOTION_KEYWORDS)
+        
+        self.keywords: List[str] = []
+        self.keyword_index: Dict[str, int] = {}
+        for keywords_by_lang in EMOTION_KEYWORDS.values():
+            for keyword in keywords_by_lang.get(language, []) + keywords_by_lang.get('en', []):
+                keyword = keyword.lower()
+                if keyword not in self.keyword_index:
+                    self.keyword_index[keyword] = len(self.keywords)
+                    self.keywords.append(keyword)
+        
+        weight_matrix = np.zeros((len(self.keywords), len(self.emotions)), dtype=np.float32)
+        for column, emotion in enumerate(self.emotions):
+            keywords_by_lang = EMOTION_KEYWORDS[emotion]
+            for keyword in keywords_by_lang.get(language, []) + keywords_by_lang.get('en', []):
+                weight_matrix[self.keyword_index[keyword.lower()], column] = 1.0
+        for emotion, keyword_weights in (weights or {}).items():
+            column = self.emotions.index(emotion)
+            for keyword, weight in keyword_weights.items():
+                row = self.keyword_index.get(keyword.lower())
+                if row is None:
+                    raise ValueError(f"Unknown keyword for language {language}: {keyword}")
+                weight_matrix[row, column] = weight
+        self.weights = weight_matrix
+        self.matrix = np.vstack([weight_matrix, weight_matrix * negation_weight])
+        
+        # Keywords and negators in one flat alternation (longest first: 'no one' beats 'no')
+        self.negators_before = set(w.lower() for w in NEGATORS_BEFORE.get(language, []) + NEGATORS_BEFORE['en'])
+        self.negators_after = set(w.lower() for w in NEGATORS_AFTER.get(language, []) + NEGATORS_AFTER['en'])
+        tokens = set(self.keywords) | self.negators_before | self.negators_after
+        # First-character lookahead rejects most positions before the boundary check
+        first_chars = ''.join(sorted(set(re.escape(token[0]) for token in tokens)))
+        self.pattern = re.compile(
+            f'(?=[{first_chars}])(?<![{WORD_CHARS}])(?:{_alternation(list(tokens))})(?![{WORD_CHARS}])'
+        )
+    
+    @classmethod
+    def from_weights_file(cls, path: str, language: str = 'en', negation_weight: float = -0.5) -> 'EmotionScorer':
+        """
+        Load weights tuned offline
+        
+        Args:
+            path: JSON file of {emotion: {keyword: weight}}
+            language: Language code
+            negation_weight: Multiplier applied to negated hits
+        
+        Returns:
+            EmotionScorer instance
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(language, weights=json.load(f), negation_weight=negation_weight)
+    
+    def hit_matrix(self, texts: List[str]) -> np.ndarray:
+        """
+        Keyword-hit counts per message
+        
+        All messages are scanned as one NUL-separated string; match positions
+        are mapped back to rows with searchsorted.
+        
+        Args:
+            texts: Message texts
+        
+        Returns:
+            (len(texts), 2 * keywords) float32 array; negated hits in the second half
+        """
+        keyword_count = len(self.keywords)
+        lowered = [text.lower() if text else '' for text in texts]
+        joined = '\x00'.join(lowered)
+        row_ends = np.cumsum([len(text) + 1 for text in lowered])
+        
+        positions: List[int] = []
+        columns: List[int] = []
+        last_keyword_end = -1
+        negator_end = -1
+        for match in self.pattern.finditer(joined):
+            token = match.group()
+            start, end = match.span()
+            
+            # "खुश नहीं": negator right after a keyword flips that keyword's hit
+            if token in self.negators_after and last_keyword_end >= 0 and not joined[last_keyword_end:start].strip():
+                if columns[-1] < keyword_count:
+                    columns[-1] += keyword_count
+                last_keyword_end = -1
+                continue
+            if token in self.negators_before:
+                negator_end = end
+                continue
+            if token not in self.keyword_index:
+                continue
+            
+            # "not happy" / "not very happy": at most one word between, same message
+            column = self.keyword_index[token]
+            if negator_end >= 0:
+                gap = joined[negator_end:start]
+                if '\x00' not in gap and len(gap.split()) <= 1:
+                    column += keyword_count
+                negator_end = -1
+            positions.append(start)
+            columns.append(column)
+            last_keyword_end = end
+        
+        # COO (row, column) hits -> dense counts (k is small, so dense rows are cheap)
+        rows = np.searchsorted(row_ends, np.asarray(positions, dtype=np.int64), side='right')
+        counts = np.bincount(
+            rows * 2 * keyword_count + np.asarray(columns, dtype=np.int64),
+            minlength=len(texts) * 2 * keyword_count
+        )
+        return counts.reshape(len(texts), 2 * keyword_count).astype(np.float32)
+    
+    def score(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Score a batch of messages
+        
+        Args:
+            texts: Message texts
+        
+        Returns:
+            {'scores': (n, emotions) array clipped at 0,
+             'emotion_index': (n,) argmax (-1 = no evidence, i.e. neutral),
+             'confidence': (n,) confidence in [0, 0.9]}
+        """
+        return self.score_hits(self.hit_matrix(texts))
+    
+    def score_hits(self, hits: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Score precomputed hit_matrix rows (re-scoring with new weights skips the text scan)
+        
+        Args:
+            hits: Output of hit_matrix (from any scorer of the same language)
+        
+        Returns:
+            Same as score
+        """
+        scores = np.maximum(hits @ self.matrix, 0.0)
+        totals = scores.sum(axis=1)
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(hits)), best]
+        
+        has_evidence = best_scores > 0
+        confidence = np.where(
+            has_evidence,
+            np.minimum(0.9, best_scores / np.maximum(totals, 1e-9) * 2),
+            0.3
+        )
+        return {
+            'scores': scores,
+            'emotion_index': np.where(has_evidence, best, -1),
+            'confidence': confidence
+        }
+    
+    def detect(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Batch counterpart of detect_emotion_with_confidence
+        
+        Args:
+            texts: Message texts
+        
+        Returns:
+            [{'emotion', 'confidence', 'scores'}] per message
+        """
+        result = self.score(texts)
+        detections = []
+        for row, index in enumerate(result['emotion_index'].tolist()):
+            if index < 0:
+                # Same fallbacks as detect_emotion_with_confidence
+                confidence = 0.5 if not texts[row] else 0.3
+                detections.append({'emotion': 'neutral', 'confidence': confidence, 'scores': {}})
+                continue
+            row_scores = result['scores'][row]
+            detections.append({
+                'emotion': self.emotions[index],
+                'confidence': float(result['confidence'][row]),
+                'scores': {
+                    emotion: float(row_scores[column])
+                    for column, emotion in enumerate(self.emotions)
+                    if row_scores[column] > 0
+                }
+            })
+        return detections
+
+
+_scorers: Dict[str, EmotionScorer] = {}
+
+
+def get_scorer(language: str = 'en') -> EmotionScorer:
+    """Default-weight scorer for a language (built once per language; unknown codes use 'en')"""
+    language = normalize_language(language)
+    scorer = _scorers.get(language)
+    if scorer is None:
+        scorer = EmotionScorer(language)
+        _scorers[language] = scorer
+    return scorer
+
+
+def score_emotions_batch(texts: List[str], languages: Union[str, List[str]] = 'en') -> List[Dict[str, Any]]:
+    """
+    Vectorized detect_emotion_with_confidence for many messages (with negation handling)
+    
+    Args:
+        texts: Message texts
+        languages: One language code for all texts, or one per text
+    
+    Returns:
+        [{'emotion', 'confidence', 'scores'}] per text, in input order
+    """
+    if isinstance(languages, str):
+        return get_scorer(languages).detect(texts)
+    if not isinstance(languages, (list, tuple)) or len(languages) != len(texts):
+        raise ValueError("languages must be a string or a list the same length as texts")
+    
+    # One vectorized call per language, results put back in input order
+    results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+    by_language: Dict[str, List[int]] = {}
+    for i, language in enumerate(languages):
+        by_language.setdefault(normalize_language(language), []).append(i)
+    for language, indexes in by_language.items():
+        for i, detection in zip(indexes, get_scorer(language).detect([texts[i] for i in indexes])):
+            results[i] = detection
+    return results
@@ -0,0 +1,235 @@
+"""
+Emotion Session Tracker - Rolling per-user mood from incremental updates
+Each message adds its keyword hits to exponentially decayed per-emotion
+scores, so a stable session mood is available without re-scoring history.
+State is per process (each gunicorn worker tracks the users it serves)
+"""
+
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .emotion_detector import EMOTION_KEYWORDS, count_emotions
+
+EMOTIONS = list(EMOTION_KEYWORDS)
+EMOTION_INDEX = {emotion: i for i, emotion in enumerate(EMOTIONS)}
+
+
+class _SessionMood:
+    """Decayed emotion scores of one user (one float per emotion)"""
+    
+    __slots__ = ('scores', 'decayed_at', 'updated_at', 'turns')
+    
+    def __init__(self, now: float):
+        self.scores = array('f', bytes(4 * len(EMOTIONS)))
+        self.decayed_at = now  # scores are current as of this time
+        self.updated_at = now  # last message (drives idle expiry)
+        self.turns = 0
+
+
+class EmotionSessionTracker:
+    """
+    LRU of per-user session moods with exponential time decay
+    An update costs O(emotions + keywords hit); idle sessions are evicted
+    """
+    
+    def __init__(
+        self,
+        half_life: float = 900.0,
+        max_sessions: int = 50000,
+        session_ttl: float = 6 * 3600.0,
+        min_score: float = 0.25
+    ):
+        """
+        Initialize Emotion Session Tracker
+        
+        Args:
+            half_life: Seconds for a score to decay to half
+            max_sessions: Maximum sessions kept (least recently updated are evicted)
+            session_ttl: Seconds of inactivity after which a session is dropped
+            min_score: Decayed top score below which the mood is 'neutral'
+        """
+        self.half_life = half_life
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.min_score = min_score
+        self.sessions: OrderedDict[str, _SessionMood] = OrderedDict()
+        self.lock = threading.Lock()
+        self.updates = 0
+        self.evictions = 0
+    
+    def _decay(self, session: _SessionMood, now: float) -> None:
+        elapsed = now - session.decayed_at
+        if elapsed > 0:
+            factor = 0.5 ** (elapsed / self.half_life)
+            scores = session.scores
+            for i in range(len(scores)):
+                scores[i] *= factor
+            session.decayed_at = now
+    
+    def _evict(self, now: float) -> None:
+        """Drop expired and over-capacity sessions (caller holds the lock)"""
+        while self.sessions:
+            user_id, session = next(iter(self.sessions.items()))
+            if len(self.sessions) <= self.max_sessions and now - session.updated_at < self.session_ttl:
+                break
+            del self.sessions[user_id]
+            self.evictions += 1
+    
+    def update(
+        self,
+        user_id: str,
+        text: Optional[str] = None,
+        language: str = 'en',
+        emotion: Optional[str] = None,
+        now: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Add a message to the user's session mood
+        
+        Args:
+            user_id: User identifier
+            text: Message text (keyword hits are added)
+            language: Language code of the text
+            emotion: Emotion label supplied by the caller (counts as one hit)
+            now: Event time in epoch seconds (default: now)
+        
+        Returns:
+            Session mood after the update (see get_mood)
+        """
+        hits = self._hits(text, language, emotion)
+        now = time.time() if now is None else now
+        with self.lock:
+            session = self.sessions.get(user_id)
+            if session is None:
+                session = _SessionMood(now)
+                self.sessions[user_id] = session
+            else:
+                self.sessions.move_to_end(user_id)
+                self._decay(session, now)
+            for hit_emotion, count in hits.items():
+                session.scores[EMOTION_INDEX[hit_emotion]] += count
+            session.updated_at = max(session.updated_at, now)
+            session.turns += 1
+            self.updates += 1
+            self._evict(now)
+            return self._mood(session)
+    
+    def preview(
+        self,
+        user_id: str,
+        text: Optional[str] = None,
+        language: str = 'en',
+        emotion: Optional[str] = None,
+        now: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Session mood update() would return, without recording the message
+        (for steering a reply before the turn is stored)
+        
+        Args: as for update()
+        
+        Returns:
+            Session mood including the message (see get_mood)
+        """
+        hits = self._hits(text, language, emotion)
+        now = time.time() if now is None else now
+        with self.lock:
+            preview = _SessionMood(now)
+            session = self.sessions.get(user_id)
+            if session is not None and now - session.updated_at < self.session_ttl:
+                self._decay(session, now)
+                preview.scores = array('f', session.scores)
+                preview.updated_at = max(session.updated_at, now)
+                preview.turns = session.turns
+        for hit_emotion, count in hits.items():
+            preview.scores[EMOTION_INDEX[hit_emotion]] += count
+        preview.turns += 1
+        return self._mood(preview)
+    
+    @staticmethod
+    def _hits(text: Optional[str], language: str, emotion: Optional[str]) -> Dict[str, int]:
+        hits = count_emotions(text, language) if text else {}
+        if emotion in EMOTION_INDEX:
+            hits[emotion] = hits.get(emotion, 0) + 1
+        return hits
+    
+    def _mood(self, session: _SessionMood) -> Dict[str, Any]:
+        scores = session.scores
+        total = sum(scores)
+        best = max(range(len(scores)), key=scores.__getitem__)
+        if scores[best] < self.min_score:
+            emotion, confidence = 'neutral', 0.3
+        else:
+            emotion = EMOTIONS[best]
+            confidence = min(0.9, scores[best] / total * 2)
+        return {
+            'emotion': emotion,
+            'confidence': round(confidence, 3),
+            'scores': {EMOTIONS[i]: round(s, 3) for i, s in enumerate(scores) if s >= 0.001},
+            'turns': session.turns,
+            'updated_at': session.updated_at
+        }
+    
+    def get_mood(self, user_id: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Current (decayed) session mood
+        
+        Args:
+            user_id: User identifier
+            now: Time to decay to in epoch seconds (default: now)
+        
+        Returns:
+            {'emotion', 'confidence', 'scores', 'turns', 'updated_at'} or None
+            if the user has no active session
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            session = self.sessions.get(user_id)
+            if session is None:
+                return None
+            if now - session.updated_at >= self.session_ttl:
+                del self.sessions[user_id]
+                self.evictions += 1
+                return None
+            self._decay(session, now)
+            return self._mood(session)
+    
+    def reset(self, user_id: str) -> None:
+        """Forget a user's session"""
+        with self.lock:
+            self.sessions.pop(user_id, None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get tracker statistics
+        
+        Returns:
+            Dictionary with tracker stats
+        """
+        with self.lock:
+            return {
+                'sessions': len(self.sessions),
+                'max_sessions': self.max_sessions,
+                'half_life': self.half_life,
+                'updates': self.updates,
+                'evictions': self.evictions
+            }
+
+
+def create_emotion_tracker_from_env() -> EmotionSessionTracker:
+    """
+    Build an EmotionSessionTracker from environment variables
+    
+    EMOTION_SESSION_HALF_LIFE: seconds for a score to decay to half (default 900)
+    EMOTION_SESSION_MAX: maximum tracked sessions (default 50000)
+    EMOTION_SESSION_TTL: idle seconds before a session is dropped (default 21600)
+    """
+    return EmotionSessionTracker(
+        half_life=float(os.getenv('EMOTION_SESSION_HALF_LIFE', '900')),
+        max_sessions=int(os.getenv('EMOTION_SESSION_MAX', '50000')),
+        session_ttl=float(os.getenv('EMOTION_SESSION_TTL', str(6 * 3600)))
+    )
@@ -3,18 +3,57 @@ Gemini Chat Service - Long Context Memory Integration
 Uses Gemini 2.5's 1M token window for perfect memory recall
 """
 
+import json
 import os
 import requests
-from typing import List, Dict, Optional, Any
+from contextlib import closing
+from functools import lru_cache
+from typing import List, Dict, Optional, Any, Callable, Iterator, Tuple
+
+from .gemini_client import CircuitOpenError, get_background_gemini_client, get_gemini_client
+from .token_counter import get_token_counter
+from .history_cache import HEADER_TOKENS, create_history_cache_from_env, history_parts, render_conversation
+from .memory_digest import format_digest
+from .prompt_cache import get_context_cache
 
 def get_gemini_api_key() -> Optional[str]:
     """Get Gemini API key from environment"""
     return os.getenv('GEMINI_API_KEY')
 
 
+PERSONA = "You are Yudi, an empathetic AI companion designed for Gen-Z. You provide emotional support, listen actively, and respond with warmth and understanding. You remember everything users share with you and reference past conversations naturally."
+
+LANGUAGE_GUIDES = {
+    'hi': "Respond in Hindi or Hinglish (Hindi-English mix). Use natural slangs like 'bhai', 'yaar', 'arre'. Be warm and conversational. Mix English words naturally when it feels right.",
+    'en': "Respond in English. Be warm, friendly, and authentic. Use Gen-Z language naturally when appropriate.",
+    'te': "Respond in Telugu. Use natural Telugu expressions. Be warm and caring."
+}
+
+EMOTION_GUIDES = {
+    'lonely': "The user feels isolated or lonely. Validate their feelings. Suggest ways to connect with others. Be caring and supportive. Ask follow-up questions to understand their situation better.",
+    'anxious': "The user is anxious or worried. Help ground them with calming techniques. Offer practical suggestions. Be reassuring and present.",
+    'sad': "The user is sad or upset. Listen with empathy. Ask clarifying questions to understand what's bothering them. Offer comfort without being pushy.",
+    'angry': "The user is angry or frustrated. Acknowledge their feelings. Help them process what's making them angry. Be understanding.",
+    'happy': "The user is happy or excited. Celebrate with them genuinely. Ask about what's making them happy. Share their joy.",
+    'neutral': "The user seems neutral. Be warm and engaging. Ask open-ended questions to understand how they're feeling."
+}
+
+
+def build_persona_prompt(language: str) -> str:
+    """Yudi's persona and language guide (the part of the system prompt that is stable per user)"""
+    return f"{PERSONA}\n\n{LANGUAGE_GUIDES.get(language, LANGUAGE_GUIDES['en'])}"
+
+
+def build_emotion_guide(emotion: str) -> str:
+    """Guidance for the detected emotion (changes from message to message)"""
+    return EMOTION_GUIDES.get(emotion, EMOTION_GUIDES['neutral'])
+
+
+@lru_cache(maxsize=64)
 def build_yudi_prompt(language: str, emotion: str) -> str:
     """
     Build Yudi's system prompt based on language and detected emotion
+    (memoized: one rendering per language/emotion pair)
     
     Args:
         language: Language code ('en', 'hi', 'te')
@@ -23,27 +62,7 @@ def build_yudi_prompt(language: str, emotion: str) -> str:
     Returns:
         System prompt string
     """
-    base = "You are Yudi, an empathetic AI companion designed for Gen-Z. You provide emotional support, listen actively, and respond with warmth and understanding. You remember everything users share with you and reference past conversations naturally."
-    
-    language_guides = {
-        'hi': "Respond in Hindi or Hinglish (Hindi-English mix). Use natural slangs like 'bhai', 'yaar', 'arre'. Be warm and conversational. Mix English words naturally when it feels right.",
-        'en': "Respond in English. Be warm, friendly, and authentic. Use Gen-Z language naturally when appropriate.",
-        'te': "Respond in Telugu. Use natural Telugu expressions. Be warm and caring."
-    }
-    
-    emotion_guides = {
-        'lonely': "The user feels isolated or lonely. Validate their feelings. Suggest ways to connect with others. Be caring and supportive. Ask follow-up questions to understand their situation better.",
-        'anxious': "The user is anxious or worried. Help ground them with calming techniques. Offer practical suggestions. Be reassuring and present.",
-        'sad': "The user is sad or upset. Listen with empathy. Ask clarifying questions to understand what's bothering them. Offer comfort without being pushy.",
-        'angry': "The user is angry or frustrated. Acknowledge their feelings. Help them process what's making them angry. Be understanding.",
-        'happy': "The user is happy or excited. Celebrate with them genuinely. Ask about what's making them happy. Share their joy.",
-        'neutral': "The user seems neutral. Be warm and engaging. Ask open-ended questions to understand how they're feeling."
-    }
-    
-    language_guide = language_guides.get(language, language_guides['en'])
-    emotion_guide = emotion_guides.get(emotion, emotion_guides['neutral'])
-    
-    return f"{base}\n\n{language_guide}\n\n{emotion_guide}"
+    return f"{build_persona_prompt(language)}\n\n{build_emotion_guide(emotion)}"
 
 
 def format_conversations(conversations: List[Dict[str, Any]]) -> str:
@@ -59,80 +78,267 @@ def format_conversations(conversations: List[Dict[str, Any]]) -> str:
     if not conversations:
         return "No previous conversations."
     
-    formatted = []
-    
-    for i, conv in enumerate(conversations, 1):
-        user_msg = conv.get('user_message', '')
-        yudi_resp = conv.get('yudi_response', '')
-        emotion = conv.get('emotion', 'unknown')
-        timestamp = conv.get('timestamp', 0)
-        
-        # Format timestamp if available
-        if timestamp:
-            from datetime import datetime
-            try:
-                dt = datetime.fromtimestamp(timestamp)
-                time_str = dt.strftime("%Y-%m-%d %H:%M")
-            except:
-                time_str = "recent"
-        else:
-            time_str = "recent"
-        
-        formatted.append(f"""
-Conversation #{i} ({time_str}):
-User: {user_msg}
-Yudi: {yudi_resp}
-Mood: {emotion}
----""")
-    
-    return "\n".join(formatted)
+    return "".join(history_parts([render_conversation(conv) for conv in conversations]))
 
 
 def estimate_tokens(text: str) -> int:
     """
-    Rough token estimation (1 token ≈ 4 characters for English)
-    This is a simple estimate - Gemini uses subword tokenization
+    Token count for prompt budgeting
+    Exact with a SentencePiece model (TOKENIZER_MODEL), otherwise a per-script
+    estimate; counts are memoized per block (see services/token_counter.py)
     """
-    return len(text) // 4
+    return get_token_counter().count(text)
+
+
+# Token budget for history (Gemini 2.5 has 1M tokens; leaves room for the system prompt)
+HISTORY_MAX_TOKENS = 900000
+
+# Rendered history blocks per user, reused across chat turns
+history_cache = create_history_cache_from_env(estimate_tokens)
 
 
-def truncate_conversations(conversations: List[Dict[str, Any]], max_tokens: int = 900000) -> List[Dict[str, Any]]:
+def truncate_conversations(conversations: List[Dict[str, Any]], max_tokens: int = HISTORY_MAX_TOKENS) -> List[Dict[str, Any]]:
     """
     Truncate conversations if they exceed token limit
     
     Args:
-        conversations: List of conversations
+        conversations: List of conversations (most recent first)
         max_tokens: Maximum tokens allowed (default 900K to leave room for system prompt)
         
     Returns:
         Truncated list (keeps most recent conversations)
     """
-    if not conversations:
-        return conversations
+    total_tokens = 0
+    for i, conv in enumerate(conversations):
+        total_tokens += estimate_tokens(render_conversation(conv)) + HEADER_TOKENS
+        if total_tokens > max_tokens:
+            return conversations[:i]
+    return conversations
+
+
+# Compact context budget: recent raw turns, retrieved memories and digests
+PROMPT_CONTEXT_TOKENS = int(os.getenv('PROMPT_CONTEXT_TOKENS', '32000'))
+
+# Budget shares of recent raw turns and retrieved memories; digests get a fixed
+# remainder so their section stays identical (and cacheable) from turn to turn
+RECENT_SHARE = 0.5
+RETRIEVED_SHARE = 0.2
+
+
+def build_compact_context(
+    user_id: Optional[str],
+    recent: List[Dict[str, Any]],
+    digests: List[Dict[str, Any]],
+    retrieved: List[Dict[str, Any]],
+    max_tokens: int = PROMPT_CONTEXT_TOKENS
+) -> Tuple[List[str], List[str]]:
+    """
+    Prompt context of bounded size, however long the user's history is
+    
+    Args:
+        user_id: User identifier (enables history_cache reuse)
+        recent: Raw turns not covered by digests, newest first
+        digests: Digests covering older turns, oldest first
+        retrieved: Memories from semantic search, best first
+        max_tokens: Token budget for the whole context
+        
+    Returns:
+        Tuple of (digest summary pieces, related + recent pieces); the summary
+        only changes when digests do, so it can be a cached prefix
+    """
+    # Newest raw turns first, then retrieved turns not already included
+    recent_blocks = history_cache.get_blocks(user_id, recent, int(max_tokens * RECENT_SHARE))
+    used = sum(estimate_tokens(block) + HEADER_TOKENS for block in recent_blocks)
     
-    # Estimate total tokens
-    total_text = format_conversations(conversations)
-    total_tokens = estimate_tokens(total_text)
+    included = {conv.get('id') for conv in recent[:len(recent_blocks)]}
+    retrieved_budget = used + int(max_tokens * RETRIEVED_SHARE)
+    retrieved_blocks = []
+    for conv in retrieved:
+        if conv.get('id') in included:
+            continue
+        block = render_conversation(conv)
+        tokens = estimate_tokens(block) + HEADER_TOKENS
+        if used + tokens > retrieved_budget:
+            break
+        retrieved_blocks.append(block)
+        used += tokens
     
-    if total_tokens <= max_tokens:
-        return conversations
+    # Digests newest first within their share (the oldest are dropped when over budget)
+    digest_budget = max_tokens - int(max_tokens * RECENT_SHARE) - int(max_tokens * RETRIEVED_SHARE)
+    digest_texts = []
+    digest_tokens = 0
+    for digest in reversed(digests):
+        text = format_digest(digest)
+        tokens = estimate_tokens(text)
+        if digest_tokens + tokens > digest_budget:
+            break
+        digest_texts.append(text)
+        digest_tokens += tokens
+    digest_texts.reverse()
     
-    # If too long, keep most recent conversations (reverse order, take from end)
-    # Conversations are typically returned most recent first
-    truncated = []
-    current_tokens = 0
+    summary = ["=== SUMMARY OF EARLIER CONVERSATIONS ==="]
+    for text in digest_texts or ["No earlier conversations."]:
+        summary.extend(["\n\n", text])
     
-    for conv in conversations:
-        conv_text = f"User: {conv.get('user_message', '')}\nYudi: {conv.get('yudi_response', '')}\n"
-        conv_tokens = estimate_tokens(conv_text)
-        
-        if current_tokens + conv_tokens <= max_tokens:
-            truncated.append(conv)
-            current_tokens += conv_tokens
+    parts = []
+    if retrieved_blocks:
+        parts.append("\n\n=== RELATED PAST CONVERSATIONS ===")
+        for block in retrieved_blocks:
+            parts.extend(["\n\nRelated conversation", block])
+    parts.append("\n\n=== RECENT CONVERSATIONS ===\n")
+    parts.extend(history_parts(recent_blocks) if recent_blocks else ["No previous conversations."])
+    return summary, parts
+
+
+def build_generate_request(
+    user_message: str,
+    conversation_history: List[Dict[str, Any]],
+    language: str,
+    emotion: str,
+    gemini_model: str = "gemini-2.5-flash",
+    user_id: Optional[str] = None,
+    digests: Optional[List[Dict[str, Any]]] = None,
+    retrieved: Optional[List[Dict[str, Any]]] = None,
+    cache_prefix: bool = False
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the generateContent URL and payload (shared by the blocking and streaming calls)
+    
+    With a user_id, the history's rendered blocks and token totals come from
+    history_cache, so only turns added since the user's last request are rendered.
+    With digests or retrieved memories, the prompt uses the bounded compact
+    context (build_compact_context) instead of the full history. The system
+    prompt is sent once, as systemInstruction.
+    
+    Args:
+        cache_prefix: Reference the persona + digest summary as Gemini cached
+            content when GEMINI_CONTEXT_CACHE is on; the emotion guide then goes
+            in the message, since it changes per turn (the cache is created in
+            the background, and requests send everything inline until it exists)
+    
+    Returns:
+        Tuple of (URL, JSON payload)
+    """
+    system_prompt = build_yudi_prompt(language, emotion)
+    cached_content = None
+    if digests is None and retrieved is None:
+        # Newest turns that fit the budget, already rendered
+        blocks = history_cache.get_blocks(user_id, conversation_history, HISTORY_MAX_TOKENS)
+        context = [
+            "=== USER'S CONVERSATION HISTORY ===\n",
+            *(history_parts(blocks) if blocks else ["No previous conversations."])
+        ]
+    else:
+        summary, context = build_compact_context(user_id, conversation_history, digests or [], retrieved or [])
+        context_cache = get_context_cache() if cache_prefix and user_id and digests else None
+        if context_cache is not None:
+            persona = build_persona_prompt(language)
+            prefix = "".join(summary)
+            cached_content = context_cache.get(
+                user_id, gemini_model, persona, prefix,
+                estimate_tokens(persona) + estimate_tokens(prefix)
+            )
+        if cached_content is None:
+            context = summary + context
         else:
-            break
+            context[0] = context[0].lstrip("\n")
+            context = ["=== HOW TO RESPOND ===\n", build_emotion_guide(emotion), "\n\n", *context]
+    
+    # Build prompts (one join over the cached pieces)
+    full_prompt = "".join([
+        *context,
+        "\n\n=== CURRENT MESSAGE ===\nUser: ",
+        user_message,
+        "\n\nRespond as Yudi:"
+    ])
+    
+    url = f"https://generativelanguage.googleapis.com/v1beta/models/{gemini_model}:generateContent"
+    
+    payload = {
+        "contents": [{
+            "role": "user",
+            "parts": [{"text": full_prompt}]
+        }]
+    }
+    if cached_content:
+        # Persona and digest summary live in the cached content
+        payload["cachedContent"] = cached_content
+    else:
+        payload["systemInstruction"] = {
+            "parts": [{"text": system_prompt}]
+        }
+    
+    return url, payload
+
+
+def parse_generate_response(status_code: int, ok: bool, text: str, data: Optional[Dict[str, Any]]) -> str:
+    """
+    Extract generated text from a generateContent response
+    
+    Args:
+        status_code: HTTP status code
+        ok: Whether the status is a success
+        text: Raw response body
+        data: Parsed JSON body (None if not JSON)
+        
+    Returns:
+        Generated response text
+    """
+    if not ok:
+        error_text = text
+        try:
+            error_text = data.get('error', {}).get('message', error_text)
+        except:
+            pass
+        raise Exception(f"Gemini API error: {status_code} - {error_text}")
+    
+    if data is None:
+        raise Exception("Gemini API returned a non-JSON response")
     
-    return truncated
+    generated_text = data.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '')
+    
+    if not generated_text:
+        raise Exception("No text generated from Gemini API")
+    
+    return generated_text.strip()
+
+
+def _json_or_none(response) -> Optional[Dict[str, Any]]:
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+def _post_generate(
+    path: str,
+    build_payload: Callable[[bool], Dict[str, Any]],
+    api_key: str,
+    user_id: Optional[str],
+    params: Optional[Dict[str, Any]] = None,
+    stream: bool = False
+):
+    """
+    POST a generate request built by build_payload(cache_prefix); if the cached
+    content it references is gone (expired, or deleted by another worker) the
+    request is sent once more with the prefix inline
+    """
+    client = get_gemini_client()
+    payload = build_payload(True)
+    try:
+        response = client.post(path, payload, params=params, stream=stream, api_key=api_key)
+        if response.ok or "cachedContent" not in payload or response.status_code not in (400, 403, 404):
+            return response
+        
+        response.close()
+        context_cache = get_context_cache()
+        if context_cache is not None and user_id:
+            context_cache.invalidate(user_id)
+        return client.post(path, build_payload(False), params=params, stream=stream, api_key=api_key)
+    except CircuitOpenError as e:
+        raise Exception(f"Gemini API unavailable: {str(e)}")
+    except requests.exceptions.RequestException as e:
+        raise Exception(f"Failed to call Gemini API: {str(e)}")
 
 
 def generate_response_with_history(
@@ -141,7 +347,10 @@ def generate_response_with_history(
     language: str,
     emotion: str,
     gemini_api_key: Optional[str] = None,
-    gemini_model: str = "gemini-2.5-flash"
+    gemini_model: str = "gemini-2.5-flash",
+    user_id: Optional[str] = None,
+    digests: Optional[List[Dict[str, Any]]] = None,
+    retrieved: Optional[List[Dict[str, Any]]] = None
 ) -> str:
     """
     Generate Gemini response with full conversation history
@@ -153,6 +362,9 @@ def generate_response_with_history(
         emotion: Detected emotion
         gemini_api_key: Gemini API key (if None, uses environment variable)
         gemini_model: Gemini model to use
+        user_id: User the history belongs to (enables history_cache reuse)
+        digests: Memory digests (oldest first); with retrieved, switches to the compact context
+        retrieved: Memories from semantic search (best first)
         
     Returns:
         Generated response text
@@ -163,62 +375,151 @@ def generate_response_with_history(
     if not gemini_api_key:
         raise ValueError("GEMINI_API_KEY not set")
     
-    # Truncate conversations if needed (Gemini 2.5 has 1M tokens, but be safe)
-    truncated_history = truncate_conversations(conversation_history, max_tokens=900000)
+    def build_payload(cache_prefix: bool) -> Dict[str, Any]:
+        return build_generate_request(
+            user_message, conversation_history, language, emotion, gemini_model, user_id, digests, retrieved,
+            cache_prefix=cache_prefix
+        )[1]
     
-    # Build prompts
-    system_prompt = build_yudi_prompt(language, emotion)
-    formatted_history = format_conversations(truncated_history)
+    # Call Gemini API (pooled keep-alive session with retries and circuit breaker)
+    response = _post_generate(f"models/{gemini_model}:generateContent", build_payload, gemini_api_key, user_id)
     
-    full_prompt = f"""{system_prompt}
+    return parse_generate_response(response.status_code, response.ok, response.text, _json_or_none(response))
+
 
-=== USER'S CONVERSATION HISTORY ===
-{formatted_history}
+DIGEST_PROMPTS = {
+    0: "Summarize these conversations between a user and Yudi, their companion. Keep the people, events, feelings, preferences and open worries the user may bring up again. Write in the third person, in English, in under 200 words.",
+    1: "Merge these summaries of consecutive periods into one summary of the whole period. Keep what still matters about the user (people, recurring feelings, important events, how things developed) and drop repetition. Write in the third person, in English, in under 300 words."
+}
 
-=== CURRENT MESSAGE ===
-User: {user_message}
 
-Respond as Yudi:"""
+def generate_digest(
+    content: str,
+    level: int,
+    gemini_api_key: Optional[str] = None,
+    gemini_model: str = "gemini-2.5-flash"
+) -> str:
+    """
+    Summarize conversations (level 0) or child digests (higher levels) for memory compaction
     
-    # Call Gemini API
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{gemini_model}:generateContent"
+    Runs at lower priority than chat turns: it goes through the background
+    client (own circuit breaker) and is skipped while the chat breaker is not
+    closed, so compaction neither trips nor adds load to the chat path.
+    
+    Args:
+        content: Formatted turns or digests, oldest first
+        level: Digest level being produced
+        gemini_api_key: Gemini API key (if None, uses environment variable)
+        gemini_model: Gemini model to use
+        
+    Returns:
+        Summary text
+    """
+    if not gemini_api_key:
+        gemini_api_key = get_gemini_api_key()
+    
+    if not gemini_api_key:
+        raise ValueError("GEMINI_API_KEY not set")
     
     payload = {
         "contents": [{
             "role": "user",
-            "parts": [{"text": full_prompt}]
+            "parts": [{"text": content}]
         }],
         "systemInstruction": {
-            "parts": [{"text": system_prompt}]
+            "parts": [{"text": DIGEST_PROMPTS[min(level, 1)]}]
         }
     }
     
+    if get_gemini_client().breaker.state != 'closed':
+        raise Exception("Gemini API unavailable for chat turns; digest deferred")
+    
     try:
-        response = requests.post(
-            url,
-            headers={"Content-Type": "application/json"},
-            params={"key": gemini_api_key},
-            json=payload,
-            timeout=60
+        response = get_background_gemini_client().post(
+            f"models/{gemini_model}:generateContent",
+            payload,
+            api_key=gemini_api_key
         )
+    except CircuitOpenError as e:
+        raise Exception(f"Gemini API unavailable: {str(e)}")
+    except requests.exceptions.RequestException as e:
+        raise Exception(f"Failed to call Gemini API: {str(e)}")
+    
+    return parse_generate_response(response.status_code, response.ok, response.text, _json_or_none(response))
+
+
+def _chunk_text(data: Dict[str, Any]) -> str:
+    """Text of one streamGenerateContent chunk (empty for metadata-only chunks)"""
+    candidates = data.get('candidates') or [{}]
+    parts = candidates[0].get('content', {}).get('parts') or []
+    return ''.join(part.get('text', '') for part in parts)
+
+
+def stream_response_with_history(
+    user_message: str,
+    conversation_history: List[Dict[str, Any]],
+    language: str,
+    emotion: str,
+    gemini_api_key: Optional[str] = None,
+    gemini_model: str = "gemini-2.5-flash",
+    user_id: Optional[str] = None,
+    digests: Optional[List[Dict[str, Any]]] = None,
+    retrieved: Optional[List[Dict[str, Any]]] = None
+) -> Iterator[str]:
+    """
+    Streaming generate_response_with_history (streamGenerateContent over SSE)
+    
+    Args:
+        (same as generate_response_with_history)
         
+    Yields:
+        Text chunks as Gemini produces them (join them for the full reply)
+    """
+    if not gemini_api_key:
+        gemini_api_key = get_gemini_api_key()
+    
+    if not gemini_api_key:
+        raise ValueError("GEMINI_API_KEY not set")
+    
+    def build_payload(cache_prefix: bool) -> Dict[str, Any]:
+        return build_generate_request(
+            user_message, conversation_history, language, emotion, gemini_model, user_id, digests, retrieved,
+            cache_prefix=cache_prefix
+        )[1]
+    
+    response = _post_generate(
+        f"models/{gemini_model}:streamGenerateContent", build_payload, gemini_api_key, user_id,
+        params={"alt": "sse"}, stream=True
+    )
+    
+    with closing(response):
         if not response.ok:
-            error_text = response.text
-            try:
-                error_data = response.json()
-                error_text = error_data.get('error', {}).get('message', error_text)
-            except:
-                pass
-            raise Exception(f"Gemini API error: {response.status_code} - {error_text}")
+            parse_generate_response(response.status_code, False, response.text, _json_or_none(response))
         
-        data = response.json()
-        generated_text = data.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '')
+        # SSE is UTF-8, but requests falls back to ISO-8859-1 for text/* without
+        # a charset, which garbles Hindi and Telugu
+        response.encoding = 'utf-8'
+        produced = False
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                # SSE frames: "data: {GenerateContentResponse JSON}" separated by blank lines
+                if not line or not line.startswith('data:'):
+                    continue
+                try:
+                    data = json.loads(line[5:].strip())
+                except ValueError:
+                    continue
+                if 'error' in data:
+                    get_gemini_client().record_failure()
+                    raise Exception(f"Gemini API error: {data['error'].get('message', data['error'])}")
+                text = _chunk_text(data)
+                if text:
+                    produced = True
+                    yield text
+        except requests.exceptions.RequestException as e:
+            # The response counted as a success when headers arrived; the breaker must see the break
+            get_gemini_client().record_failure()
+            raise Exception(f"Gemini stream interrupted: {str(e)}")
         
-        if not generated_text:
+        if not produced:
             raise Exception("No text generated from Gemini API")
-        
-        return generated_text.strip()
-    
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"Failed to call Gemini API: {str(e)}")
-
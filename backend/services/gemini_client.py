@@ -0,0 +1,347 @@
+"""
+Gemini Client - Pooled, retrying HTTP client for the Gemini REST API
+One requests.Session per process keeps TLS connections alive across chat turns;
+connection failures and 429/5xx responses are retried with backoff (read
+timeouts are not, so a call stays within its read timeout plus backoff) and a
+circuit breaker fails fast while the API is down
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+
+# Statuses worth retrying (rate limited or transient server errors)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Statuses after which a non-idempotent request certainly had no effect
+NOT_APPLIED_STATUSES = (429, 503)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit breaker is open"""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after consecutive failures; after reset_timeout one trial call is
+    let through (half-open) and its outcome closes or re-opens the circuit
+    """
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize Circuit Breaker
+        
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.times_opened = 0
+        self.lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        with self.lock:
+            return self._state()
+    
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+    
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may proceed"""
+        with self.lock:
+            state = self._state()
+            if state == 'open' or (state == 'half_open' and self.trial_in_flight):
+                raise CircuitOpenError("Gemini API circuit breaker is open")
+            if state == 'half_open':
+                self.trial_in_flight = True
+    
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+    
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self._state() != 'open':
+                    self.times_opened += 1
+                self.opened_at = time.monotonic()
+
+
+class GeminiClient:
+    """
+    Shared HTTP client for Gemini generateContent/streamGenerateContent/cachedContents calls
+    Thread-safe; use get_gemini_client() for the process-wide instance
+    """
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        pool_size: int = 20,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        breaker: Optional[CircuitBreaker] = None,
+        base_url: str = GEMINI_API_BASE
+    ):
+        """
+        Initialize Gemini Client
+        
+        Args:
+            api_key: Gemini API key (default: GEMINI_API_KEY)
+            pool_size: Keep-alive connections kept per host
+            connect_timeout: Seconds to establish a connection
+            read_timeout: Seconds to wait for response data
+            max_retries: Retries on connection errors and 429/5xx (429/503 only for
+                non-idempotent requests; read timeouts are never retried)
+            backoff_factor: Retry delay base (0.5 → 0.5s, 1s, 2s; Retry-After is honoured)
+            breaker: Circuit breaker (default: opens after 5 consecutive failures for 30s)
+            base_url: API base URL
+        """
+        self.api_key = api_key or os.getenv('GEMINI_API_KEY')
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = breaker or CircuitBreaker()
+        
+        # read=0: a read timeout may come after the server did the work, and
+        # retrying it would multiply the read timeout past the serving timeout
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'POST', 'PATCH', 'DELETE']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = self._make_session(self.adapter)
+        
+        # Creates (cachedContents) are only retried where the server cannot have applied them
+        self.once_adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=retry.new(status_forcelist=NOT_APPLIED_STATUSES)
+        )
+        self.once_session = self._make_session(self.once_adapter)
+        
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+    
+    @staticmethod
+    def _make_session(adapter: HTTPAdapter) -> requests.Session:
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Content-Type': 'application/json'})
+        return session
+    
+    def post(
+        self,
+        path: str,
+        payload: Dict[str, Any],
+        params: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+        api_key: Optional[str] = None,
+        idempotent: bool = True
+    ) -> requests.Response:
+        """POST to a Gemini REST path (see request)"""
+        return self.request(
+            'POST', path, payload, params=params, stream=stream, api_key=api_key, idempotent=idempotent
+        )
+    
+    def request(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+        api_key: Optional[str] = None,
+        idempotent: bool = True
+    ) -> requests.Response:
+        """
+        Call a Gemini REST path through the pooled session
+        
+        Args:
+            method: HTTP method
+            path: Path below base_url (e.g. "models/gemini-2.5-flash:generateContent")
+            payload: JSON body (None for bodiless requests)
+            params: Extra query parameters (the API key is added)
+            stream: Stream the response body (caller must close the response)
+            api_key: Key for this call (default: the client's key)
+            idempotent: False for requests that create something (retried on
+                connection errors and 429/503 only, never on 500/502/504)
+        
+        Returns:
+            Response after retries (may still be an error status)
+        
+        Raises:
+            CircuitOpenError: While the breaker is open
+            requests.exceptions.RequestException: On connection failures after retries
+        """
+        api_key = api_key or self.api_key
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not set")
+        
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            with self.lock:
+                self.rejected += 1
+            raise
+        
+        with self.lock:
+            self.calls += 1
+        session = self.session if idempotent else self.once_session
+        try:
+            response = session.request(
+                method,
+                f"{self.base_url}/{path}",
+                params={**(params or {}), 'key': api_key},
+                json=payload,
+                timeout=self.timeout,
+                stream=stream
+            )
+        except Exception:
+            # Any failure must settle a half-open trial, or the breaker stays stuck
+            self._record(success=False)
+            raise
+        
+        self._record(success=response.status_code not in RETRY_STATUSES)
+        return response
+    
+    def record_failure(self) -> None:
+        """Report a failure seen after request() returned (e.g. a stream that broke mid-body)"""
+        self._record(success=False)
+    
+    def _record(self, success: bool) -> None:
+        if success:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+            with self.lock:
+                self.failures += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get client statistics (connections opened vs requests sent shows keep-alive reuse)
+        
+        Returns:
+            Dictionary with client stats
+        """
+        connections = 0
+        requests_sent = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            requests_sent += pool.num_requests
+        
+        with self.lock:
+            return {
+                'calls': self.calls,
+                'failures': self.failures,
+                'rejected_by_breaker': self.rejected,
+                'http_requests': requests_sent,
+                'connections_opened': connections,
+                'connection_reuse_rate': (
+                    round(1 - connections / requests_sent, 3) if requests_sent else 0.0
+                ),
+                'breaker_state': self.breaker.state,
+                'breaker_opened': self.breaker.times_opened
+            }
+    
+    def close(self) -> None:
+        """Close pooled connections"""
+        self.session.close()
+        self.once_session.close()
+
+
+_client: Optional[GeminiClient] = None
+_client_lock = threading.Lock()
+
+
+def get_gemini_client() -> GeminiClient:
+    """
+    Process-wide GeminiClient built from environment variables
+    
+    GEMINI_POOL_SIZE: keep-alive connections (default 20)
+    GEMINI_CONNECT_TIMEOUT / GEMINI_READ_TIMEOUT: seconds (default 5 / 60)
+    GEMINI_MAX_RETRIES: retries on connection errors and 429/5xx responses, not on
+        read timeouts; creates are retried on 429/503 only (default 3)
+    GEMINI_BREAKER_THRESHOLD / GEMINI_BREAKER_RESET: breaker failures / open seconds (default 5 / 30)
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GeminiClient(
+                    pool_size=int(os.getenv('GEMINI_POOL_SIZE', '20')),
+                    connect_timeout=float(os.getenv('GEMINI_CONNECT_TIMEOUT', '5')),
+                    read_timeout=float(os.getenv('GEMINI_READ_TIMEOUT', '60')),
+                    max_retries=int(os.getenv('GEMINI_MAX_RETRIES', '3')),
+                    breaker=CircuitBreaker(
+                        failure_threshold=int(os.getenv('GEMINI_BREAKER_THRESHOLD', '5')),
+                        reset_timeout=float(os.getenv('GEMINI_BREAKER_RESET', '30'))
+                    )
+                )
+    return _client
+
+
+_background_client: Optional[GeminiClient] = None
+
+
+def get_background_gemini_client() -> GeminiClient:
+    """
+    Process-wide GeminiClient for background calls (memory digest summaries)
+    
+    It has its own circuit breaker and a small pool, so a compaction burst
+    that gets rate limited opens this breaker, not the one chat turns go
+    through. Timeouts and breaker settings are shared with get_gemini_client.
+    
+    GEMINI_BACKGROUND_POOL_SIZE: keep-alive connections (default 4)
+    GEMINI_BACKGROUND_MAX_RETRIES: retries on connection errors and 429/5xx (default 1)
+    """
+    global _background_client
+    if _background_client is None:
+        with _client_lock:
+            if _background_client is None:
+                _background_client = GeminiClient(
+                    pool_size=int(os.getenv('GEMINI_BACKGROUND_POOL_SIZE', '4')),
+                    connect_timeout=float(os.getenv('GEMINI_CONNECT_TIMEOUT', '5')),
+                    read_timeout=float(os.getenv('GEMINI_READ_TIMEOUT', '60')),
+                    max_retries=int(os.getenv('GEMINI_BACKGROUND_MAX_RETRIES', '1')),
+                    breaker=CircuitBreaker(
+                        failure_threshold=int(os.getenv('GEMINI_BREAKER_THRESHOLD', '5')),
+                        reset_timeout=float(os.getenv('GEMINI_BREAKER_RESET', '30'))
+                    )
+                )
+    return _background_client
@@ -0,0 +1,283 @@
+"""
+History Cache - Per-user rendered conversation blocks with running token totals
+Each past turn is rendered into its prompt block once; a new chat turn only
+renders the turns added since the last one, truncation pops the oldest blocks
+(O(dropped turns)) and the prompt is assembled from the cached pieces with a
+single join. State is per process, like the emotion session tracker
+"""
+
+import os
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+# Prompt-block header overhead ("\n\nConversation #123") in tokens
+HEADER_TOKENS = 5
+
+
+def render_conversation(conv: Dict[str, Any]) -> str:
+    """
+    Render one past turn as a history block (without its "Conversation #i" header)
+    
+    Args:
+        conv: Conversation dictionary from Pinecone
+    
+    Returns:
+        Block text
+    """
+    time_str = "recent"
+    timestamp = conv.get('timestamp', 0)
+    if timestamp:
+        try:
+            time_str = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+        except (TypeError, ValueError, OverflowError, OSError):
+            pass
+    
+    return (
+        f" ({time_str}):\n"
+        f"User: {conv.get('user_message', '')}\n"
+        f"Yudi: {conv.get('yudi_response', '')}\n"
+        f"Mood: {conv.get('emotion', 'unknown')}\n"
+        f"---"
+    )
+
+
+def history_parts(blocks: List[str]) -> List[str]:
+    """
+    Interleave numbered headers with rendered blocks (newest first)
+    
+    Args:
+        blocks: Output of render_conversation per turn
+    
+    Returns:
+        Pieces whose ''.join is the formatted history
+    """
+    parts = []
+    for i, block in enumerate(blocks, 1):
+        parts.append(f"\nConversation #{i}" if i == 1 else f"\n\nConversation #{i}")
+        parts.append(block)
+    return parts
+
+
+class _Turn:
+    """One rendered turn"""
+    
+    __slots__ = ('key', 'block', 'tokens')
+    
+    def __init__(self, key: str, block: str, tokens: int):
+        self.key = key
+        self.block = block
+        self.tokens = tokens
+
+
+class _UserHistory:
+    """Rendered turns of one user, oldest to newest, within max_tokens"""
+    
+    __slots__ = ('turns', 'total_tokens', 'total_chars', 'max_tokens', 'trimmed')
+    
+    def __init__(self, max_tokens: int):
+        self.turns: Deque[_Turn] = deque()
+        self.total_tokens = 0
+        self.total_chars = 0
+        self.max_tokens = max_tokens
+        self.trimmed = False  # older turns were dropped for the token budget
+
+
+class HistoryCache:
+    """
+    LRU of per-user rendered histories
+    Expects history lists newest first with stable per-turn 'id's (as returned
+    by PineconeMemory.get_user_memories); lists without ids are rendered uncached
+    """
+    
+    def __init__(
+        self,
+        count_tokens: Callable[[str], int],
+        max_users: int = 2000,
+        max_chars: int = 256 * 1024 * 1024
+    ):
+        """
+        Initialize History Cache
+        
+        Args:
+            count_tokens: Token estimate for a block of text
+            max_users: Maximum users cached (least recently used are evicted)
+            max_chars: Maximum rendered characters cached across all users
+        """
+        self.count_tokens = count_tokens
+        self.max_users = max_users
+        self.max_chars = max_chars
+        self.entries: OrderedDict[str, _UserHistory] = OrderedDict()
+        self.total_chars = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rendered = 0
+        self.dropped = 0
+        self.evictions = 0
+    
+    def _turn(self, conv: Dict[str, Any]) -> _Turn:
+        block = render_conversation(conv)
+        self.rendered += 1
+        return _Turn(conv.get('id'), block, self.count_tokens(block) + HEADER_TOKENS)
+    
+    def _add(self, entry: _UserHistory, turn: _Turn, newest: bool) -> None:
+        if newest:
+            entry.turns.append(turn)
+        else:
+            entry.turns.appendleft(turn)
+        entry.total_tokens += turn.tokens
+        entry.total_chars += len(turn.block)
+    
+    def _drop_oldest(self, entry: _UserHistory) -> None:
+        turn = entry.turns.popleft()
+        entry.total_tokens -= turn.tokens
+        entry.total_chars -= len(turn.block)
+        self.dropped += 1
+    
+    def _trim(self, entry: _UserHistory) -> None:
+        """Drop oldest turns until the total fits the budget"""
+        while entry.turns and entry.total_tokens > entry.max_tokens:
+            self._drop_oldest(entry)
+            entry.trimmed = True
+    
+    def _extend_older(self, entry: _UserHistory, older: List[Dict[str, Any]]) -> None:
+        """Add turns older than the cached ones (newest first) while they fit"""
+        for conv in older:
+            turn = self._turn(conv)
+            if entry.total_tokens + turn.tokens > entry.max_tokens:
+                entry.trimmed = True
+                return
+            self._add(entry, turn, newest=False)
+    
+    def _sync(self, entry: _UserHistory, conversations: List[Dict[str, Any]]) -> bool:
+        """
+        Bring a cached history in line with the caller's list
+        
+        Returns:
+            False if the list does not continue the cached history (rebuild)
+        """
+        newest_key = entry.turns[-1].key
+        # New turns sit at the front of the list; stop at the newest cached one
+        position = next((i for i, conv in enumerate(conversations) if conv.get('id') == newest_key), None)
+        if position is None:
+            return False
+        
+        # A shorter list (smaller limit) drops the oldest cached turns
+        available = len(conversations) - position
+        if len(entry.turns) > available:
+            while len(entry.turns) > available:
+                self._drop_oldest(entry)
+            entry.trimmed = False
+        oldest_index = position + len(entry.turns) - 1
+        if conversations[oldest_index].get('id') != entry.turns[0].key:
+            return False
+        
+        for conv in reversed(conversations[:position]):
+            self._add(entry, self._turn(conv), newest=True)
+        self._trim(entry)
+        
+        # A longer list (larger limit) extends the history if the budget allows
+        if not entry.trimmed and oldest_index + 1 < len(conversations):
+            self._extend_older(entry, conversations[oldest_index + 1:])
+        return True
+    
+    def _build(self, conversations: List[Dict[str, Any]], max_tokens: int) -> _UserHistory:
+        entry = _UserHistory(max_tokens)
+        self._extend_older(entry, conversations)
+        return entry
+    
+    def _evict(self) -> None:
+        """Drop least recently used users over capacity (caller holds the lock)"""
+        while len(self.entries) > 1 and (len(self.entries) > self.max_users or self.total_chars > self.max_chars):
+            _, entry = self.entries.popitem(last=False)
+            self.total_chars -= entry.total_chars
+            self.evictions += 1
+    
+    def get_blocks(
+        self,
+        user_id: Optional[str],
+        conversations: List[Dict[str, Any]],
+        max_tokens: int
+    ) -> List[str]:
+        """
+        Rendered blocks of the newest turns that fit max_tokens
+        
+        Args:
+            user_id: User identifier (None renders without caching)
+            conversations: Past turns, newest first
+            max_tokens: Token budget for the history
+        
+        Returns:
+            Blocks newest first (pass to history_parts)
+        """
+        if not conversations:
+            return []
+        if user_id is None or any(conv.get('id') is None for conv in (conversations[0], conversations[-1])):
+            return [turn.block for turn in reversed(self._build(conversations, max_tokens).turns)]
+        
+        with self.lock:
+            entry = self.entries.get(user_id)
+            cached_chars = entry.total_chars if entry is not None else 0
+            if entry is not None and entry.turns and entry.max_tokens == max_tokens:
+                self.entries.move_to_end(user_id)
+                if not self._sync(entry, conversations):
+                    entry = None
+            else:
+                entry = None
+            
+            if entry is None:
+                self.misses += 1
+                entry = self._build(conversations, max_tokens)
+                self.entries[user_id] = entry
+            else:
+                self.hits += 1
+            self.total_chars += entry.total_chars - cached_chars
+            
+            blocks = [turn.block for turn in reversed(entry.turns)]
+            self._evict()
+            return blocks
+    
+    def invalidate(self, user_id: str) -> None:
+        """Forget a user's rendered history (e.g. after their memories are deleted)"""
+        with self.lock:
+            entry = self.entries.pop(user_id, None)
+            if entry is not None:
+                self.total_chars -= entry.total_chars
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+        
+        Returns:
+            Dictionary with cache stats
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'users': len(self.entries),
+                'max_users': self.max_users,
+                'cached_chars': self.total_chars,
+                'max_chars': self.max_chars,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'turns_rendered': self.rendered,
+                'turns_dropped': self.dropped,
+                'evictions': self.evictions
+            }
+
+
+def create_history_cache_from_env(count_tokens: Callable[[str], int]) -> HistoryCache:
+    """
+    Build a HistoryCache from environment variables
+    
+    HISTORY_CACHE_MAX_USERS: maximum cached users (default 2000)
+    HISTORY_CACHE_MAX_CHARS: maximum rendered characters cached (default 268435456)
+    """
+    return HistoryCache(
+        count_tokens,
+        max_users=int(os.getenv('HISTORY_CACHE_MAX_USERS', '2000')),
+        max_chars=int(os.getenv('HISTORY_CACHE_MAX_CHARS', str(256 * 1024 * 1024)))
+    )
@@ -0,0 +1,549 @@
+"""
+Local Vector Store - In-process NumPy vector index (no network hop)
+Contiguous float32 matrix with per-user row indexes: vectorized brute-force cosine
+top-k, optional IVF partitioning for large corpora, memory-mapped persistence
+"""
+
+import bisect
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Try to import NumPy
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    print("Warning: numpy not installed. Install with: pip install numpy")
+
+from .vector_store import VectorMatch, VectorStore
+
+# Files inside the store directory
+VECTORS_FILE = 'vectors.f32'    # memory-mapped (capacity x dimension) float32 matrix
+ROWS_LOG_FILE = 'rows.jsonl'    # append-only row log (id, namespace, metadata per row)
+CENTROIDS_FILE = 'centroids.npy'
+
+# Rows scored per chunk when (re)assigning rows to IVF lists
+ASSIGN_CHUNK_ROWS = 65536
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Single-process vector store for deployments without Pinecone
+    Rows are L2-normalized on insert so cosine similarity is one matrix-vector product
+    """
+    
+    def __init__(
+        self,
+        dimension: int = 768,
+        path: Optional[str] = None,
+        initial_capacity: int = 1024,
+        ivf_lists: int = 0,
+        nprobe: int = 8,
+        ivf_min_rows: Optional[int] = None
+    ):
+        """
+        Initialize Local Vector Store
+        
+        Args:
+            dimension: Vector dimension
+            path: Directory for the memory-mapped matrix and row log (None = in-memory only)
+            initial_capacity: Rows allocated up front (the matrix doubles when full)
+            ivf_lists: Number of IVF partitions (0 = brute force only)
+            nprobe: Partitions scanned per query in IVF mode
+            ivf_min_rows: Candidate count above which queries use IVF (default 40 x ivf_lists)
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy not installed. Install with: pip install numpy")
+        
+        self.dimension = dimension
+        self.path = path
+        self.initial_capacity = max(1, initial_capacity)
+        self.ivf_lists = ivf_lists
+        self.nprobe = max(1, nprobe)
+        self.ivf_min_rows = ivf_min_rows if ivf_min_rows is not None else 40 * max(ivf_lists, 1)
+        
+        self.lock = threading.RLock()
+        self._matrix = None
+        self._capacity = 0
+        self._size = 0  # rows [0, _size) have been handed out at least once
+        
+        # Row bookkeeping (row number -> id / namespace / metadata)
+        self._ids: List[Optional[str]] = []
+        self._namespaces: List[Optional[str]] = []
+        self._metadata: List[Optional[Dict[str, Any]]] = []
+        self._free_rows: List[int] = []
+        self._rows: Dict[Tuple[str, str], int] = {}  # (namespace, id) -> row
+        self._ns_rows: Dict[str, Set[int]] = {}
+        self._ns_ids: Dict[str, List[str]] = {}  # sorted IDs per namespace (list_ids pages)
+        self._user_rows: Dict[Tuple[str, str], Set[int]] = {}  # (namespace, user_id) -> rows
+        self._rows_arrays: Dict[Any, Any] = {}  # cached np arrays of the sets above
+        
+        # IVF state
+        self._centroids = None
+        self._row_list = None  # IVF list per row (-1 = unassigned)
+        self._trained_rows = 0
+        self._training = None  # background IVF training thread
+        self._ivf_dirty: Optional[Set[int]] = None  # rows written while training runs
+        
+        self._log = None
+        self._log_entries = 0
+        
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+        else:
+            self._grow(self.initial_capacity)
+    
+    def _grow(self, min_capacity: int) -> None:
+        """Grow the matrix (and memory-mapped file) to at least min_capacity rows"""
+        new_capacity = max(min_capacity, self._capacity * 2, self.initial_capacity)
+        
+        if self.path:
+            vectors_path = os.path.join(self.path, VECTORS_FILE)
+            if self._matrix is not None:
+                self._matrix.flush()
+                self._matrix = None
+            mode = 'r+b' if os.path.exists(vectors_path) else 'w+b'
+            with open(vectors_path, mode) as f:
+                f.truncate(new_capacity * self.dimension * 4)
+            self._matrix = np.memmap(
+                vectors_path, dtype=np.float32, mode='r+', shape=(new_capacity, self.dimension)
+            )
+        else:
+            matrix = np.zeros((new_capacity, self.dimension), dtype=np.float32)
+            if self._matrix is not None:
+                matrix[:self._capacity] = self._matrix[:self._capacity]
+            self._matrix = matrix
+        
+        row_list = np.full(new_capacity, -1, dtype=np.int32)
+        if self._row_list is not None:
+            row_list[:self._capacity] = self._row_list[:self._capacity]
+        self._row_list = row_list
+        
+        extra = new_capacity - len(self._ids)
+        self._ids.extend([None] * extra)
+        self._namespaces.extend([None] * extra)
+        self._metadata.extend([None] * extra)
+        self._capacity = new_capacity
+    
+    def _load(self) -> None:
+        """Open the memory-mapped matrix and replay the row log"""
+        vectors_path = os.path.join(self.path, VECTORS_FILE)
+        existing_rows = 0
+        if os.path.exists(vectors_path):
+            existing_rows = os.path.getsize(vectors_path) // (self.dimension * 4)
+        self._grow(max(existing_rows, self.initial_capacity))
+        
+        log_path = os.path.join(self.path, ROWS_LOG_FILE)
+        if os.path.exists(log_path):
+            with open(log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn write at the end of the log
+                    row = entry['row']
+                    if row >= self._capacity:
+                        continue
+                    if self._ids[row] is not None:
+                        self._unindex(row)
+                    if entry['op'] == 'put':
+                        self._index(row, entry['id'], entry['ns'], entry.get('meta') or {})
+                    self._size = max(self._size, row + 1)
+                    self._log_entries += 1
+        
+        self._free_rows = [row for row in range(self._size - 1, -1, -1) if self._ids[row] is None]
+        self._log = open(log_path, 'a', encoding='utf-8')
+        
+        centroids_path = os.path.join(self.path, CENTROIDS_FILE)
+        if self.ivf_lists and os.path.exists(centroids_path):
+            centroids = np.load(centroids_path)
+            if centroids.shape[1] == self.dimension:
+                self._centroids = centroids.astype(np.float32)
+                self._assign_lists(self._live_rows())
+                self._trained_rows = len(self._rows)
+        
+        print(f"✅ Loaded local vector store: {len(self._rows)} vectors from {self.path}")
+    
+    def _write_log(self, entry: Dict[str, Any]) -> None:
+        if self._log is not None:
+            self._log.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._log_entries += 1
+    
+    def _flush_log(self) -> None:
+        if self._log is None:
+            return
+        self._log.flush()
+        if self._log_entries > 2 * len(self._rows) + 1000:
+            self._compact_log()
+    
+    def _compact_log(self) -> None:
+        """Rewrite the row log with live rows only"""
+        log_path = os.path.join(self.path, ROWS_LOG_FILE)
+        tmp_path = log_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for row in self._live_rows().tolist():
+                f.write(json.dumps({
+                    'op': 'put', 'row': row, 'id': self._ids[row],
+                    'ns': self._namespaces[row], 'meta': self._metadata[row]
+                }, ensure_ascii=False) + '\n')
+        self._log.close()
+        os.replace(tmp_path, log_path)
+        self._log = open(log_path, 'a', encoding='utf-8')
+        self._log_entries = len(self._rows)
+    
+    def persist(self) -> None:
+        """Flush the memory-mapped matrix and compact the row log"""
+        with self.lock:
+            if not self.path:
+                return
+            self._matrix.flush()
+            self._compact_log()
+            if self._centroids is not None:
+                np.save(os.path.join(self.path, CENTROIDS_FILE), self._centroids)
+    
+    def close(self) -> None:
+        """Persist and release file handles"""
+        with self.lock:
+            if self.path and self._log is not None:
+                self.persist()
+                self._log.close()
+                self._log = None
+    
+    def _index(self, row: int, vector_id: str, namespace: str, metadata: Dict[str, Any]) -> None:
+        self._ids[row] = vector_id
+        self._namespaces[row] = namespace
+        self._metadata[row] = metadata
+        self._rows[(namespace, vector_id)] = row
+        self._ns_rows.setdefault(namespace, set()).add(row)
+        bisect.insort(self._ns_ids.setdefault(namespace, []), vector_id)
+        self._rows_arrays.pop(('ns', namespace), None)
+        user_id = metadata.get('user_id')
+        if user_id is not None:
+            key = (namespace, str(user_id))
+            self._user_rows.setdefault(key, set()).add(row)
+            self._rows_arrays.pop(('user',) + key, None)
+    
+    def _unindex(self, row: int) -> None:
+        namespace = self._namespaces[row]
+        metadata = self._metadata[row] or {}
+        self._rows.pop((namespace, self._ids[row]), None)
+        rows = self._ns_rows.get(namespace)
+        if rows is not None:
+            rows.discard(row)
+            if not rows:
+                del self._ns_rows[namespace]
+        ids = self._ns_ids.get(namespace)
+        if ids is not None:
+            i = bisect.bisect_left(ids, self._ids[row])
+            if i < len(ids) and ids[i] == self._ids[row]:
+                del ids[i]
+            if not ids:
+                del self._ns_ids[namespace]
+        self._rows_arrays.pop(('ns', namespace), None)
+        user_id = metadata.get('user_id')
+        if user_id is not None:
+            key = (namespace, str(user_id))
+            rows = self._user_rows.get(key)
+            if rows is not None:
+                rows.discard(row)
+                if not rows:
+                    del self._user_rows[key]
+            self._rows_arrays.pop(('user',) + key, None)
+        self._ids[row] = None
+        self._namespaces[row] = None
+        self._metadata[row] = None
+        self._row_list[row] = -1
+    
+    def _rows_array(self, kind: str, *key) -> Any:
+        """Cached sorted np.int64 array of a row set"""
+        cache_key = (kind,) + key
+        cached = self._rows_arrays.get(cache_key)
+        if cached is None:
+            rows = self._ns_rows.get(key[0]) if kind == 'ns' else self._user_rows.get(key)
+            cached = np.fromiter(rows or (), dtype=np.int64)
+            cached.sort()
+            self._rows_arrays[cache_key] = cached
+        return cached
+    
+    def _live_rows(self) -> Any:
+        rows = np.fromiter(self._rows.values(), dtype=np.int64, count=len(self._rows))
+        rows.sort()
+        return rows
+    
+    def build_ivf(self, n_lists: Optional[int] = None, iterations: int = 10, seed: int = 0) -> None:
+        """
+        Train IVF centroids (spherical k-means on a sample) and assign every row
+        
+        k-means and the row assignment run on a snapshot without holding the
+        store lock; the lock is only taken to take the snapshot and to swap the
+        new centroids in (rows written meanwhile are reassigned at the swap)
+        
+        Args:
+            n_lists: Number of partitions (default: ivf_lists)
+            iterations: k-means iterations
+            seed: Random seed for sampling
+        """
+        with self.lock:
+            n_lists = n_lists or self.ivf_lists
+            live = self._live_rows()
+            if n_lists <= 0 or live.size < n_lists or self._ivf_dirty is not None:
+                return  # nothing to train, or a training is already running
+            rng = np.random.default_rng(seed)
+            sample_size = min(live.size, max(256 * n_lists, 10000), 200000)
+            sample = np.asarray(self._matrix[rng.choice(live, size=sample_size, replace=False)])
+            matrix = self._matrix  # stays readable if the store grows meanwhile
+            self._ivf_dirty = set()
+        
+        try:
+            centroids = sample[rng.choice(sample_size, size=n_lists, replace=False)].copy()
+            for _ in range(iterations):
+                assignment = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignment, sample)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                empty = norms[:, 0] == 0
+                sums[empty] = centroids[empty]  # keep empty clusters where they were
+                norms[empty] = 1.0
+                centroids = (sums / norms).astype(np.float32)
+            lists = self._nearest_lists(matrix, live, centroids)
+        except BaseException:
+            with self.lock:
+                self._ivf_dirty = None
+            raise
+        
+        with self.lock:
+            self.ivf_lists = n_lists
+            self._centroids = centroids
+            self._row_list[live] = lists
+            dirty = np.fromiter(self._ivf_dirty, dtype=np.int64, count=len(self._ivf_dirty))
+            self._ivf_dirty = None
+            self._assign_lists(dirty)
+            self._trained_rows = live.size
+            if self.path:
+                np.save(os.path.join(self.path, CENTROIDS_FILE), centroids)
+        print(f"✅ Built IVF index: {n_lists} lists over {live.size} vectors")
+    
+    @staticmethod
+    def _nearest_lists(matrix: Any, rows: Any, centroids: Any) -> Any:
+        lists = np.empty(rows.size, dtype=np.int32)
+        for start in range(0, rows.size, ASSIGN_CHUNK_ROWS):
+            chunk = rows[start:start + ASSIGN_CHUNK_ROWS]
+            lists[start:start + chunk.size] = np.argmax(matrix[chunk] @ centroids.T, axis=1)
+        return lists
+    
+    def _assign_lists(self, rows: Any) -> None:
+        """Assign rows to their nearest IVF list (caller holds the lock)"""
+        if self._ivf_dirty is not None:
+            self._ivf_dirty.update(rows.tolist())  # centroids are about to change
+        if self._centroids is not None and rows.size:
+            self._row_list[rows] = self._nearest_lists(self._matrix, rows, self._centroids)
+    
+    def _maybe_train_ivf(self) -> None:
+        """Start background (re)training when the store has grown enough (caller holds the lock)"""
+        live = len(self._rows)
+        if self.ivf_lists <= 0 or live < self.ivf_min_rows:
+            return
+        if self._training is not None and self._training.is_alive():
+            return
+        if self._centroids is None or live >= 4 * self._trained_rows:
+            self._training = threading.Thread(target=self._train_in_background, name='ivf-train', daemon=True)
+            self._training.start()
+    
+    def _train_in_background(self) -> None:
+        try:
+            self.build_ivf()
+        except Exception as e:
+            print(f"⚠️  IVF training failed (queries keep the previous index): {str(e)}")
+    
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = '') -> None:
+        if not vectors:
+            return
+        values = np.asarray([v['values'] for v in vectors], dtype=np.float32)
+        if values.ndim != 2 or values.shape[1] != self.dimension:
+            raise ValueError(f"Vector dimension mismatch: expected {self.dimension}")
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        values /= norms
+        
+        with self.lock:
+            rows = []
+            for vector in vectors:
+                vector_id = vector['id']
+                metadata = dict(vector.get('metadata') or {})
+                row = self._rows.get((namespace, vector_id))
+                if row is None:
+                    row = self._allocate_row()
+                else:
+                    self._unindex(row)
+                self._index(row, vector_id, namespace, metadata)
+                self._write_log({'op': 'put', 'row': row, 'id': vector_id, 'ns': namespace, 'meta': metadata})
+                rows.append(row)
+            
+            rows = np.asarray(rows, dtype=np.int64)
+            self._matrix[rows] = values
+            self._assign_lists(rows)
+            self._flush_log()
+            self._maybe_train_ivf()
+    
+    def _allocate_row(self) -> int:
+        if self._free_rows:
+            return self._free_rows.pop()
+        if self._size >= self._capacity:
+            self._grow(self._size + 1)
+        row = self._size
+        self._size += 1
+        return row
+    
+    def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        filter: Optional[Dict[str, Any]] = None,
+        namespace: str = ''
+    ) -> List[VectorMatch]:
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        
+        with self.lock:
+            rows = self._candidate_rows(namespace, filter)
+            if rows.size == 0 or top_k <= 0:
+                return []
+            
+            # IVF: only scan rows in the partitions closest to the query
+            if self._centroids is not None and rows.size >= self.ivf_min_rows:
+                nprobe = min(self.nprobe, len(self._centroids))
+                centroid_scores = self._centroids @ query
+                probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+                rows = rows[np.isin(self._row_list[rows], probes)]
+                if rows.size == 0:
+                    return []
+            
+            scores = self._matrix[rows] @ query
+            k = min(top_k, rows.size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            
+            return [
+                VectorMatch(self._ids[row], float(scores[i]), dict(self._metadata[row]))
+                for i, row in zip(top.tolist(), rows[top].tolist())
+            ]
+    
+    def _candidate_rows(self, namespace: str, filter: Optional[Dict[str, Any]]) -> Any:
+        """Rows in the namespace that pass the filter (user_id uses the per-user index)"""
+        conditions = dict(filter or {})
+        user_condition = conditions.pop('user_id', None)
+        if isinstance(user_condition, dict) and set(user_condition) == {'$eq'}:
+            user_condition = user_condition['$eq']
+        
+        if user_condition is None:
+            rows = self._rows_array('ns', namespace)
+        elif isinstance(user_condition, dict):
+            rows = self._rows_array('ns', namespace)
+            conditions['user_id'] = user_condition
+        else:
+            rows = self._rows_array('user', namespace, str(user_condition))
+        
+        if conditions and rows.size:
+            keep = [row for row in rows.tolist() if _matches_filter(self._metadata[row], conditions)]
+            rows = np.asarray(keep, dtype=np.int64)
+        return rows
+    
+    def fetch(self, ids: List[str], namespace: str = '') -> Dict[str, Dict[str, Any]]:
+        """Fetch vectors by ID (values come back L2-normalized)"""
+        with self.lock:
+            found = {}
+            for vector_id in ids:
+                row = self._rows.get((namespace, vector_id))
+                if row is not None:
+                    found[vector_id] = {
+                        'values': self._matrix[row].tolist(),
+                        'metadata': dict(self._metadata[row])
+                    }
+            return found
+    
+    def delete(self, ids: List[str], namespace: str = '') -> None:
+        with self.lock:
+            for vector_id in ids:
+                row = self._rows.get((namespace, vector_id))
+                if row is None:
+                    continue
+                self._unindex(row)
+                self._matrix[row] = 0.0
+                self._free_rows.append(row)
+                self._write_log({'op': 'del', 'row': row})
+            self._flush_log()
+    
+    def delete_namespace(self, namespace: str) -> None:
+        with self.lock:
+            ids = [self._ids[row] for row in self._ns_rows.get(namespace, ())]
+        self.delete(ids, namespace=namespace)
+    
+    def list_ids(
+        self,
+        prefix: Optional[str] = None,
+        namespace: str = '',
+        limit: int = 100,
+        pagination_token: Optional[str] = None
+    ) -> Tuple[List[str], Optional[str]]:
+        # Pagination token is the last ID of the previous page (IDs are listed sorted);
+        # a page is a slice of the namespace's sorted IDs, so a full listing is O(N)
+        prefix = prefix or ''
+        with self.lock:
+            ids = self._ns_ids.get(namespace, [])
+            start = bisect.bisect_left(ids, prefix)
+            if pagination_token:
+                start = max(start, bisect.bisect_right(ids, pagination_token))
+            candidates = ids[start:start + limit + 1]
+        # IDs sharing the prefix are contiguous in sorted order
+        page = [vector_id for vector_id in candidates if vector_id.startswith(prefix)]
+        next_token = page[limit - 1] if len(page) > limit else None
+        return page[:limit], next_token
+    
+    def describe_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'backend': 'local',
+                'total_vector_count': len(self._rows),
+                'namespaces': {name: len(rows) for name, rows in self._ns_rows.items()},
+                'capacity': self._capacity,
+                'persistent': bool(self.path),
+                'ivf_lists': len(self._centroids) if self._centroids is not None else 0
+            }
+
+
+def _matches_filter(metadata: Dict[str, Any], conditions: Dict[str, Any]) -> bool:
+    """Evaluate a Pinecone-style metadata filter ($eq/$ne/$in/$nin/$gt/$gte/$lt/$lte)"""
+    for field, condition in conditions.items():
+        value = metadata.get(field)
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        for op, expected in condition.items():
+            if op == '$eq':
+                ok = value == expected
+            elif op == '$ne':
+                ok = value != expected
+            elif op == '$in':
+                ok = value in expected
+            elif op == '$nin':
+                ok = value not in expected
+            elif value is None:
+                ok = False
+            elif op == '$gt':
+                ok = value > expected
+            elif op == '$gte':
+                ok = value >= expected
+            elif op == '$lt':
+                ok = value < expected
+            elif op == '$lte':
+                ok = value <= expected
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            if not ok:
+                return False
+    return True
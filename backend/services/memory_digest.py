@@ -0,0 +1,532 @@
+"""
+Memory Digests - Hierarchical summaries of older conversation turns
+Turns older than the raw window are summarized in chunks (level 0); every
+`fanout` consecutive digests of a level are rolled up into one of the next
+level. Digests are stored as vectors in their own namespace of the memory
+index and refreshed incrementally by a background worker, so prompts can
+carry a bounded summary of an arbitrarily long history.
+The index is the source of truth shared by all workers: cached digest lists
+are re-checked against its ID listing after cache_ttl seconds, and chunk
+boundaries follow the stored turns, so workers compacting the same user
+write the same digests
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Namespace holding every user's digests (memory namespaces never start with it)
+DIGEST_NAMESPACE = 'digests'
+
+# Digest IDs: "digest_<user_id>_L<level>_<start epoch ms>"
+DIGEST_ID_PREFIX = 'digest_'
+
+# Vectors fetched per request when loading digests
+FETCH_CHUNK = 100
+
+
+class MemoryDigestManager:
+    """
+    Builds, stores and serves a user's digests
+    Digests are kept in an LRU and re-checked against the index after
+    cache_ttl seconds; compaction runs on a background worker after every
+    chunk_turns new turns of a user, or when a prompt finds a backlog
+    """
+    
+    def __init__(
+        self,
+        memory_db,
+        summarize: Callable[[str, int], str],
+        chunk_turns: int = 20,
+        fanout: int = 5,
+        recent_turns: int = 20,
+        max_levels: int = 4,
+        max_users: int = 10000,
+        cache_ttl: float = 30.0,
+        max_raw_turns: Optional[int] = None,
+        max_summaries: int = 5
+    ):
+        """
+        Initialize Memory Digest Manager
+        
+        Args:
+            memory_db: PineconeMemory instance
+            summarize: (content, level) -> summary text; level 0 content is raw
+                turns, higher levels get the child digests
+            chunk_turns: Raw turns summarized per level-0 digest
+            fanout: Digests of one level rolled up into one of the next
+            recent_turns: Newest turns never compacted (sent raw in prompts)
+            max_levels: Number of digest levels
+            max_users: Users whose digests are kept in memory
+            cache_ttl: Seconds a user's cached digests are served before they are
+                re-checked against the index (bounds how long digests created or
+                deleted by another worker go unnoticed)
+            max_raw_turns: Most uncompacted turns fetched for a prompt (default:
+                recent_turns + fanout * chunk_turns); a larger backlog schedules
+                compaction
+            max_summaries: Most summaries (chunks and roll-ups) one compaction
+                writes; the rest of a backlog is left to a rescheduled run, so
+                the user's lock and the worker are released in between
+        """
+        self.memory_db = memory_db
+        self.summarize = summarize
+        self.chunk_turns = chunk_turns
+        self.fanout = fanout
+        self.recent_turns = recent_turns
+        self.max_levels = max_levels
+        self.max_users = max_users
+        self.cache_ttl = cache_ttl
+        self.max_raw_turns = max_raw_turns or recent_turns + fanout * chunk_turns
+        self.max_summaries = max(1, max_summaries)
+        
+        # user_id -> (validated at (monotonic), digests)
+        self.digests: OrderedDict[str, Tuple[float, List[Dict[str, Any]]]] = OrderedDict()
+        self.turns_since: Dict[str, int] = {}
+        self.generations: Dict[str, int] = {}
+        self.user_locks: Dict[str, threading.Lock] = {}
+        self.lock = threading.Lock()
+        
+        self.queue: queue.Queue = queue.Queue()
+        self.scheduled = set()
+        self.worker: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        
+        self.compactions = 0
+        self.created = 0
+        self.failures = 0
+        self.revalidations = 0
+        self.backlogs = 0
+        self.discarded = 0
+        self.continued = 0
+    
+    def _id_prefix(self, user_id: str) -> str:
+        return f"{DIGEST_ID_PREFIX}{user_id}_L"
+    
+    def _list_ids(self, user_id: str) -> List[str]:
+        """IDs of a user's digests in the index"""
+        store = self.memory_db.store
+        ids: List[str] = []
+        token = None
+        while True:
+            page, token = store.list_ids(
+                prefix=self._id_prefix(user_id), namespace=DIGEST_NAMESPACE, pagination_token=token
+            )
+            ids.extend(page)
+            if not token:
+                return ids
+    
+    def _load(self, user_id: str, max_age: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        User's digests sorted by (level, start), from the LRU or the index
+        
+        Args:
+            user_id: User identifier
+            max_age: Seconds a cached list is trusted without checking the index
+                (default cache_ttl; 0 always checks)
+        """
+        max_age = self.cache_ttl if max_age is None else max_age
+        now = time.monotonic()
+        with self.lock:
+            cached = self.digests.get(user_id)
+            if cached is not None:
+                self.digests.move_to_end(user_id)
+                if now - cached[0] < max_age:
+                    return cached[1]
+            generation = self.generations.get(user_id, 0)
+        
+        # Keep digests still listed, fetch the ones other workers added, drop deleted ones
+        ids = self._list_ids(user_id)
+        known = {d['id']: d for d in cached[1]} if cached is not None else {}
+        digests = [known[vector_id] for vector_id in ids if vector_id in known]
+        new_ids = [vector_id for vector_id in ids if vector_id not in known]
+        store = self.memory_db.store
+        for i in range(0, len(new_ids), FETCH_CHUNK):
+            vectors = store.fetch(new_ids[i:i + FETCH_CHUNK], namespace=DIGEST_NAMESPACE)
+            for vector_id, vector in vectors.items():
+                metadata = vector['metadata']
+                if metadata.get('user_id') != user_id:
+                    continue  # another user whose ID shares the prefix
+                digests.append(self._from_metadata(vector_id, metadata))
+        digests.sort(key=lambda d: (d['level'], d['start_ms']))
+        
+        with self.lock:
+            if cached is not None:
+                self.revalidations += 1
+            # A delete in this process meanwhile: do not cache what was listed before it
+            if self.generations.get(user_id, 0) == generation:
+                self.digests[user_id] = (now, digests)
+                while len(self.digests) > self.max_users:
+                    self.digests.popitem(last=False)
+        return digests
+    
+    @staticmethod
+    def _from_metadata(vector_id: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'id': vector_id,
+            'level': int(metadata['level']),
+            'start_ms': int(metadata['start_ms']),
+            'end_ms': int(metadata['end_ms']),
+            'turns': int(metadata.get('turns', 0)),
+            'summary': metadata.get('summary', ''),
+            'created_at': metadata.get('created_at')
+        }
+    
+    def _store(
+        self,
+        user_id: str,
+        generation: int,
+        digests: List[Dict[str, Any]],
+        level: int,
+        start_ms: int,
+        end_ms: int,
+        turns: int,
+        summary: str,
+        source_id: str,
+        source_namespace: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Embed and upsert one digest (skipped if the user was deleted meanwhile)
+        
+        source_id is the newest turn or child digest summarized; if it is gone
+        after the upsert, the user was deleted (possibly by another worker)
+        while this digest was being built, and the digest is removed again
+        """
+        if self.generations.get(user_id, 0) != generation:
+            return None
+        
+        vector_id = f"{self._id_prefix(user_id)}{level}_{start_ms}"
+        metadata = {
+            'user_id': user_id,
+            'kind': 'digest',
+            'level': level,
+            'start_ms': start_ms,
+            'end_ms': end_ms,
+            'turns': turns,
+            'summary': summary,
+            'created_at': int(time.time())
+        }
+        embedding = self.memory_db._get_embedding(summary)
+        store = self.memory_db.store
+        store.upsert(
+            vectors=[{'id': vector_id, 'values': embedding, 'metadata': metadata}],
+            namespace=DIGEST_NAMESPACE
+        )
+        if self.generations.get(user_id, 0) != generation or not store.fetch([source_id], namespace=source_namespace):
+            store.delete(ids=[vector_id], namespace=DIGEST_NAMESPACE)
+            with self.lock:
+                self.discarded += 1
+            return None
+        
+        digest = self._from_metadata(vector_id, metadata)
+        digests.append(digest)
+        digests.sort(key=lambda d: (d['level'], d['start_ms']))
+        with self.lock:
+            self.created += 1
+        return digest
+    
+    def _turn_ms(self, user_id: str, memory: Dict[str, Any]) -> int:
+        timestamp_ms = self.memory_db._timestamp_from_vector_id(user_id, memory['id'])
+        if timestamp_ms is None:
+            timestamp_ms = int((memory.get('timestamp') or 0) * 1000)
+        return timestamp_ms
+    
+    def covered_until(self, user_id: str) -> Optional[int]:
+        """Epoch ms of the newest turn covered by a digest (None if none)"""
+        return self._watermark(self._load(user_id))
+    
+    @staticmethod
+    def _watermark(digests: List[Dict[str, Any]]) -> Optional[int]:
+        level0 = [d['end_ms'] for d in digests if d['level'] == 0]
+        return max(level0) if level0 else None
+    
+    def _uncompacted_turns(
+        self,
+        user_id: str,
+        watermark: Optional[int],
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Turns newer than the watermark, newest first (at most limit)"""
+        turns = []
+        before = None
+        while limit is None or len(turns) < limit:
+            page_size = 100 if limit is None else min(100, limit - len(turns))
+            page = self.memory_db.list_user_memories(user_id, before=before, limit=page_size)
+            for memory in page['memories']:
+                if watermark is not None and self._turn_ms(user_id, memory) <= watermark:
+                    return turns
+                turns.append(memory)
+            before = page['next_before']
+            if before is None:
+                return turns
+        return turns
+    
+    def compact(self, user_id: str) -> int:
+        """
+        Summarize a user's uncompacted turns and roll up full digest groups
+        
+        At most max_summaries summaries are written per call; if more are due,
+        another compaction is scheduled.
+        
+        Args:
+            user_id: User identifier
+        
+        Returns:
+            Number of digests created
+        """
+        with self.lock:
+            user_lock = self.user_locks.setdefault(user_id, threading.Lock())
+            generation = self.generations.get(user_id, 0)
+        
+        created = 0
+        budget = self.max_summaries
+        with user_lock:
+            # Always from the index: other workers may have compacted this user
+            digests = self._load(user_id, max_age=0)
+            turns = self._uncompacted_turns(user_id, self._watermark(digests))
+            
+            # Oldest first, excluding the raw window; only full chunks are summarized.
+            # Chunks start at the first stored turn after the watermark, so every
+            # worker cuts the same chunks (and writes the same digest IDs)
+            candidates = turns[self.recent_turns:][::-1]
+            for i in range(0, len(candidates) - self.chunk_turns + 1, self.chunk_turns):
+                if budget <= 0:
+                    break
+                budget -= 1
+                chunk = candidates[i:i + self.chunk_turns]
+                summary = self.summarize(format_turns(chunk), 0)
+                if self._store(
+                    user_id, generation, digests, 0,
+                    self._turn_ms(user_id, chunk[0]), self._turn_ms(user_id, chunk[-1]), len(chunk), summary,
+                    chunk[-1]['id'], self.memory_db._namespace_for(user_id)
+                ):
+                    created += 1
+            
+            # Roll up every full group of digests not yet covered by a parent
+            for level in range(self.max_levels - 1):
+                children = [d for d in digests if d['level'] == level]
+                parents = [d['end_ms'] for d in digests if d['level'] == level + 1]
+                covered = max(parents) if parents else None
+                uncovered = [d for d in children if covered is None or d['start_ms'] > covered]
+                for i in range(0, len(uncovered) - self.fanout + 1, self.fanout):
+                    if budget <= 0:
+                        break
+                    budget -= 1
+                    group = uncovered[i:i + self.fanout]
+                    summary = self.summarize(format_digests(group), level + 1)
+                    if self._store(
+                        user_id, generation, digests, level + 1,
+                        group[0]['start_ms'], group[-1]['end_ms'], sum(d['turns'] for d in group), summary,
+                        group[-1]['id'], DIGEST_NAMESPACE
+                    ):
+                        created += 1
+        
+        with self.lock:
+            self.compactions += 1
+        if budget <= 0:
+            # Budget spent: pick up the rest after other users' compactions
+            with self.lock:
+                self.continued += 1
+            self.schedule(user_id)
+        return created
+    
+    def get_digests(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Fewest digests covering everything compacted so far, oldest first
+        (highest-level digests plus the lower-level ones newer than them)
+        
+        Args:
+            user_id: User identifier
+        
+        Returns:
+            Digest dictionaries ({'id', 'level', 'start_ms', 'end_ms', 'turns', 'summary', ...})
+        """
+        digests = list(self._load(user_id))  # compaction may be appending
+        selected = []
+        covered = None
+        for level in range(self.max_levels - 1, -1, -1):
+            for digest in digests:
+                if digest['level'] == level and (covered is None or digest['start_ms'] > covered):
+                    selected.append(digest)
+            if selected:
+                covered = max(d['end_ms'] for d in selected)
+        selected.sort(key=lambda d: d['start_ms'])
+        return selected
+    
+    def get_prompt_context(self, user_id: str) -> Dict[str, Any]:
+        """
+        Digests plus the raw turns they do not cover yet
+        
+        Args:
+            user_id: User identifier
+        
+        Returns:
+            {'digests': oldest first, 'recent': raw turns newest first}
+        """
+        digests = self.get_digests(user_id)
+        # Every turn back to the watermark, so none fall between digests and raw turns
+        recent = self._uncompacted_turns(user_id, self.covered_until(user_id), limit=self.max_raw_turns)
+        if len(recent) >= self.recent_turns + self.chunk_turns:
+            # Compaction is behind (or never ran on any worker for this user)
+            with self.lock:
+                self.backlogs += 1
+            self.schedule(user_id)
+        return {'digests': digests, 'recent': recent}
+    
+    def note_turn(self, user_id: str) -> None:
+        """Count a stored turn; schedules compaction every chunk_turns turns"""
+        with self.lock:
+            count = self.turns_since.get(user_id)
+            # First turn seen by this process: check for a backlog right away
+            count = self.chunk_turns if count is None else count + 1
+            if count < self.chunk_turns:
+                self.turns_since[user_id] = count
+                return
+            self.turns_since[user_id] = 0
+        self.schedule(user_id)
+    
+    def schedule(self, user_id: str) -> None:
+        """Queue a background compaction (no-op if one is already queued)"""
+        with self.lock:
+            if user_id in self.scheduled:
+                return
+            self.scheduled.add(user_id)
+        self.queue.put(user_id)
+    
+    def start(self) -> None:
+        """Start the background worker (idempotent)"""
+        if self.worker is not None:
+            return
+        self._stopping.clear()
+        self.worker = threading.Thread(target=self._worker_loop, name='memory-digests', daemon=True)
+        self.worker.start()
+    
+    def _worker_loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                user_id = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self.lock:
+                self.scheduled.discard(user_id)
+            try:
+                created = self.compact(user_id)
+                if created:
+                    print(f"✅ Created {created} memory digests for user {user_id}")
+            except Exception as e:
+                with self.lock:
+                    self.failures += 1
+                print(f"⚠️  Memory digest compaction failed for user {user_id}: {str(e)}")
+    
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop the worker (queued compactions are dropped; they rerun on later turns)"""
+        if self.worker is None:
+            return
+        self._stopping.set()
+        self.worker.join(timeout=timeout)
+        self.worker = None
+    
+    def delete_user_digests(self, user_id: str) -> int:
+        """
+        Delete a user's digests and stop in-flight compaction from writing more
+        
+        Args:
+            user_id: User identifier
+        
+        Returns:
+            Number of digests deleted
+        """
+        with self.lock:
+            self.generations[user_id] = self.generations.get(user_id, 0) + 1
+            self.digests.pop(user_id, None)
+            self.turns_since.pop(user_id, None)
+        
+        # List everything first: listings can lag behind deletes. Other workers
+        # see the deletion when their cached list expires (cache_ttl), and their
+        # in-flight compactions remove what they write once the turns are gone
+        store = self.memory_db.store
+        ids = self._list_ids(user_id)
+        for i in range(0, len(ids), FETCH_CHUNK):
+            store.delete(ids=ids[i:i + FETCH_CHUNK], namespace=DIGEST_NAMESPACE)
+        
+        with self.lock:
+            self.digests.pop(user_id, None)
+        return len(ids)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get digest statistics
+        
+        Returns:
+            Dictionary with digest stats
+        """
+        with self.lock:
+            return {
+                'users_cached': len(self.digests),
+                'scheduled': len(self.scheduled),
+                'compactions': self.compactions,
+                'digests_created': self.created,
+                'failures': self.failures,
+                'revalidations': self.revalidations,
+                'backlogs_scheduled': self.backlogs,
+                'discarded_after_delete': self.discarded,
+                'continued': self.continued,
+                'max_summaries': self.max_summaries,
+                'cache_ttl': self.cache_ttl,
+                'chunk_turns': self.chunk_turns,
+                'fanout': self.fanout,
+                'recent_turns': self.recent_turns
+            }
+
+
+def _date(timestamp_ms: int) -> str:
+    return datetime.fromtimestamp(timestamp_ms / 1000).strftime("%Y-%m-%d")
+
+
+def format_turns(turns: List[Dict[str, Any]]) -> str:
+    """Raw turns (oldest first) as summarizer input"""
+    return "\n\n".join(
+        f"User: {turn.get('user_message', '')}\nYudi: {turn.get('yudi_response', '')}\nMood: {turn.get('emotion') or 'unknown'}"
+        for turn in turns
+    )
+
+
+def format_digest(digest: Dict[str, Any]) -> str:
+    """One digest with its date range (summarizer input and prompt text)"""
+    return (
+        f"[{_date(digest['start_ms'])} to {_date(digest['end_ms'])}, "
+        f"{digest['turns']} conversations]\n{digest['summary']}"
+    )
+
+
+def format_digests(digests: List[Dict[str, Any]]) -> str:
+    """Child digests (oldest first) as summarizer input"""
+    return "\n\n".join(format_digest(digest) for digest in digests)
+
+
+def create_digest_manager_from_env(memory_db, summarize: Callable[[str, int], str]) -> MemoryDigestManager:
+    """
+    Build a MemoryDigestManager from environment variables
+    
+    DIGEST_CHUNK_TURNS: raw turns per level-0 digest (default 20)
+    DIGEST_FANOUT: digests rolled up into one of the next level (default 5)
+    DIGEST_RECENT_TURNS: newest turns kept raw (default 20)
+    DIGEST_MAX_LEVELS: digest levels (default 4)
+    DIGEST_CACHE_TTL: seconds cached digests are served before re-checking the index (default 30)
+    DIGEST_MAX_RAW_TURNS: most uncompacted turns put in a prompt (default recent + fanout x chunk turns)
+    DIGEST_MAX_SUMMARIES_PER_RUN: summaries written per compaction before it yields (default 5)
+    """
+    return MemoryDigestManager(
+        memory_db,
+        summarize,
+        chunk_turns=int(os.getenv('DIGEST_CHUNK_TURNS', '20')),
+        fanout=int(os.getenv('DIGEST_FANOUT', '5')),
+        recent_turns=int(os.getenv('DIGEST_RECENT_TURNS', '20')),
+        max_levels=int(os.getenv('DIGEST_MAX_LEVELS', '4')),
+        cache_ttl=float(os.getenv('DIGEST_CACHE_TTL', '30')),
+        max_raw_turns=int(os.getenv('DIGEST_MAX_RAW_TURNS', '0')) or None,
+        max_summaries=int(os.getenv('DIGEST_MAX_SUMMARIES_PER_RUN', '5'))
+    )
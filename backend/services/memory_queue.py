@@ -0,0 +1,392 @@
+"""
+Memory Write Queue - Write-behind storage for conversation memories
+/api/memories/store returns as soon as the memory is queued (~1ms);
+background workers embed + upsert in micro-batches via store_conversations_bulk.
+Memories are validated before they are queued; only transient failures are retried.
+cancel_user() drops a user's queued memories before their memories are deleted
+"""
+
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when the write queue stays full for longer than the enqueue timeout"""
+
+
+class MemoryWriteQueue:
+    """
+    Bounded write-behind queue in front of PineconeMemory
+    Workers coalesce queued memories into batches and retry failures with jittered backoff
+    """
+    
+    def __init__(
+        self,
+        memory_db,
+        max_queue_size: int = 10000,
+        workers: int = 2,
+        batch_size: int = 50,
+        linger_ms: int = 20,
+        max_retries: int = 5,
+        base_backoff: float = 0.2,
+        max_backoff: float = 5.0,
+        enqueue_timeout: float = 0.05
+    ):
+        """
+        Initialize Memory Write Queue
+        
+        Args:
+            memory_db: PineconeMemory instance (needs new_memory_id + store_conversations_bulk)
+            max_queue_size: Maximum queued memories before enqueue applies backpressure
+            workers: Number of background worker threads
+            batch_size: Maximum memories per store_conversations_bulk call
+            linger_ms: How long a worker waits to fill a batch after the first item
+            max_retries: Attempts per memory before it is dropped
+            base_backoff: First retry delay in seconds (doubles per attempt, full jitter)
+            max_backoff: Cap on retry delay in seconds
+            enqueue_timeout: Seconds enqueue waits for a free slot before raising QueueFullError
+        """
+        self.memory_db = memory_db
+        self.max_queue_size = max_queue_size
+        self.num_workers = workers
+        self.batch_size = batch_size
+        self.linger = linger_ms / 1000.0
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.enqueue_timeout = enqueue_timeout
+        
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self.workers: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        
+        # Memories enqueued but not yet stored or dropped
+        self._pending = 0
+        self._pending_cond = threading.Condition()
+        
+        # Per-user cancellation cutoffs and batches being stored right now
+        self._cancelled: Dict[str, float] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._flight_cond = threading.Condition()
+        
+        self.lock = threading.Lock()
+        self.enqueued = 0
+        self.stored = 0
+        self.retried = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.batches = 0
+    
+    def start(self) -> None:
+        """Start background workers (idempotent)"""
+        if self.workers:
+            return
+        self._stopping.clear()
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"memory-writer-{i}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+    
+    def enqueue(
+        self,
+        user_id: str,
+        user_message: str,
+        yudi_response: str,
+        emotion: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Queue a conversation for storage
+        
+        Args:
+            user_id: User identifier
+            user_message: User's message
+            yudi_response: Yudi's response
+            emotion: Detected emotion (optional)
+            metadata: Additional metadata (optional)
+        
+        Returns:
+            Pre-assigned memory ID (the vector ID the memory will be stored under)
+        
+        Raises:
+            ValueError: If a field is invalid (PineconeMemory.validate_memory)
+            QueueFullError: If the queue is full or shutting down
+        """
+        self.memory_db.validate_memory(user_id, user_message, yudi_response, emotion, metadata)
+        if self._stopping.is_set():
+            raise QueueFullError("Memory write queue is shutting down")
+        
+        now = time.time()
+        memory_id = self.memory_db.new_memory_id(user_id, timestamp=now)
+        item = {
+            'memory_id': memory_id,
+            'user_id': user_id,
+            'user_message': user_message,
+            'yudi_response': yudi_response,
+            'emotion': emotion,
+            'metadata': metadata or {},
+            'timestamp': now,
+            '_attempts': 0
+        }
+        
+        with self._pending_cond:
+            self._pending += 1
+        try:
+            self.queue.put(item, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self._finish(1)
+            with self.lock:
+                self.rejected += 1
+            raise QueueFullError(f"Memory write queue full ({self.max_queue_size} pending)")
+        
+        with self.lock:
+            self.enqueued += 1
+        return memory_id
+    
+    def _worker_loop(self) -> None:
+        """Drain the queue in micro-batches until stopped and empty"""
+        while True:
+            try:
+                first = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+            
+            batch = [first]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self.queue.get(timeout=remaining))
+                    else:
+                        batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            self._store_batch(batch)
+    
+    def _store_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """Store one batch, retrying transient failures with jittered exponential backoff"""
+        while batch:
+            batch = self._drop_cancelled(batch)
+            if not batch:
+                return
+            with self.lock:
+                self.batches += 1
+            users = {item['user_id'] for item in batch}
+            try:
+                result = self.memory_db.store_conversations_bulk(
+                    [{k: v for k, v in item.items() if k != '_attempts'} for item in batch]
+                )
+                failed_indexes = {
+                    f['index']: (f['error'], f.get('retryable', True)) for f in result['failed']
+                }
+            except (ValueError, TypeError) as e:
+                # Bad input fails the same way on every attempt: isolate the item and drop it
+                if len(batch) > 1:
+                    for item in batch:
+                        self._store_batch([item])
+                    return
+                failed_indexes = {0: (str(e), False)}
+            except Exception as e:
+                failed_indexes = {i: (str(e), True) for i in range(len(batch))}
+            finally:
+                self._end_flight(users)
+            
+            stored_count = len(batch) - len(failed_indexes)
+            with self.lock:
+                self.stored += stored_count
+            self._finish(stored_count)
+            
+            retry = []
+            for i, (error, retryable) in failed_indexes.items():
+                item = batch[i]
+                item['_attempts'] += 1
+                if not retryable or item['_attempts'] >= self.max_retries:
+                    print(f"❌ Dropping memory {item['memory_id']} after {item['_attempts']} attempts: {error}")
+                    with self.lock:
+                        self.dropped += 1
+                    self._finish(1)
+                else:
+                    retry.append(item)
+            
+            if retry:
+                attempt = max(item['_attempts'] for item in retry)
+                delay = random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+                with self.lock:
+                    self.retried += len(retry)
+                time.sleep(delay)
+            batch = retry
+    
+    def _drop_cancelled(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Remove memories queued before their user's cancel_user() and mark the rest's users in flight"""
+        with self._flight_cond:
+            keep = [
+                item for item in batch
+                if item['user_id'] not in self._cancelled
+                or item['timestamp'] > self._cancelled[item['user_id']]
+            ]
+            for user_id in {item['user_id'] for item in keep}:
+                self._in_flight[user_id] = self._in_flight.get(user_id, 0) + 1
+        dropped = len(batch) - len(keep)
+        if dropped:
+            with self.lock:
+                self.cancelled += dropped
+            self._finish(dropped)
+        return keep
+    
+    def _end_flight(self, users: set) -> None:
+        with self._flight_cond:
+            for user_id in users:
+                self._in_flight[user_id] -= 1
+                if self._in_flight[user_id] <= 0:
+                    del self._in_flight[user_id]
+            self._flight_cond.notify_all()
+    
+    def cancel_user(self, user_id: str, timeout: float = 10.0) -> int:
+        """
+        Drop a user's queued memories and wait for their in-flight batches
+        
+        Called before a user's memories are deleted so a queued write cannot
+        land after the deletion has listed the user's IDs. Memories enqueued
+        after this call are stored normally.
+        
+        Args:
+            user_id: User identifier
+            timeout: Maximum seconds to wait for batches already being stored
+        
+        Returns:
+            Number of queued memories dropped
+        """
+        cutoff = time.time()
+        with self._flight_cond:
+            self._cancelled[user_id] = cutoff
+            # Anything queued before the cutoff is gone once the queue has been scanned
+            # and in-flight batches finished; keep cutoffs for an hour for retries in backoff
+            for stale in [u for u, t in self._cancelled.items() if t < cutoff - 3600]:
+                del self._cancelled[stale]
+        
+        with self.queue.mutex:
+            kept = [item for item in self.queue.queue if item['user_id'] != user_id]
+            removed = len(self.queue.queue) - len(kept)
+            if removed:
+                self.queue.queue.clear()
+                self.queue.queue.extend(kept)
+                self.queue.not_full.notify(removed)
+        if removed:
+            with self.lock:
+                self.cancelled += removed
+            self._finish(removed)
+        
+        deadline = time.monotonic() + timeout
+        with self._flight_cond:
+            while self._in_flight.get(user_id, 0) > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print(f"⚠️  Memory writes for user {user_id} still in flight after {timeout}s")
+                    break
+                self._flight_cond.wait(remaining)
+        return removed
+    
+    def _finish(self, count: int) -> None:
+        """Mark memories as no longer pending and wake flush() waiters"""
+        if count <= 0:
+            return
+        with self._pending_cond:
+            self._pending -= count
+            if self._pending <= 0:
+                self._pending_cond.notify_all()
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued memory is stored or dropped
+        
+        Args:
+            timeout: Maximum seconds to wait (None = wait forever)
+        
+        Returns:
+            True if the queue drained, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._pending_cond:
+            while self._pending > 0:
+                if deadline is None:
+                    self._pending_cond.wait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._pending_cond.wait(remaining)
+        return True
+    
+    def shutdown(self, timeout: Optional[float] = 30.0) -> bool:
+        """
+        Stop accepting memories, drain the queue and stop workers
+        
+        Args:
+            timeout: Maximum seconds to wait for the drain
+        
+        Returns:
+            True if everything queued was stored or dropped before the timeout
+        """
+        if not self.workers:
+            return self._pending <= 0
+        self._stopping.set()
+        drained = self.flush(timeout)
+        for worker in self.workers:
+            worker.join(timeout=1.0)
+        self.workers = []
+        if drained:
+            print("✅ Memory write queue drained")
+        else:
+            print(f"⚠️  Memory write queue shutdown timed out with {self._pending} memories pending")
+        return drained
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get queue statistics
+        
+        Returns:
+            Dictionary with queue stats
+        """
+        with self.lock:
+            return {
+                'depth': self.queue.qsize(),
+                'max_queue_size': self.max_queue_size,
+                'pending': self._pending,
+                'workers': len(self.workers),
+                'enqueued': self.enqueued,
+                'stored': self.stored,
+                'retried': self.retried,
+                'dropped': self.dropped,
+                'rejected': self.rejected,
+                'cancelled': self.cancelled,
+                'batches': self.batches
+            }
+
+
+def create_write_queue_from_env(memory_db) -> MemoryWriteQueue:
+    """
+    Build a MemoryWriteQueue from environment variables
+    
+    MEMORY_QUEUE_SIZE: maximum queued memories (default 10000)
+    MEMORY_QUEUE_WORKERS: worker threads (default 2)
+    MEMORY_QUEUE_BATCH_SIZE: memories per bulk store (default 50)
+    MEMORY_QUEUE_LINGER_MS: batch fill wait in ms (default 20)
+    MEMORY_QUEUE_MAX_RETRIES: attempts before a memory is dropped (default 5)
+    """
+    return MemoryWriteQueue(
+        memory_db,
+        max_queue_size=int(os.getenv('MEMORY_QUEUE_SIZE', '10000')),
+        workers=int(os.getenv('MEMORY_QUEUE_WORKERS', '2')),
+        batch_size=int(os.getenv('MEMORY_QUEUE_BATCH_SIZE', '50')),
+        linger_ms=int(os.getenv('MEMORY_QUEUE_LINGER_MS', '20')),
+        max_retries=int(os.getenv('MEMORY_QUEUE_MAX_RETRIES', '5'))
+    )
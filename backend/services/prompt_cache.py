@@ -0,0 +1,261 @@
+"""
+Prompt Cache - Stable prompt prefixes registered as Gemini cached content
+A user's persona (language) plus digest summary changes only when their
+digests change, so it is uploaded once as a cachedContents resource and
+later requests reference it by name instead of resending it. Resources are
+created in the background (requests go inline until one is ready), refreshed
+before their TTL runs out while in use and replaced (the old resource
+deleted) when the prefix changes
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from .gemini_client import GeminiClient, get_gemini_client
+
+
+class _CachedPrefix:
+    """One registered cachedContents resource"""
+    
+    __slots__ = ('name', 'fingerprint', 'expires_at', 'tokens')
+    
+    def __init__(self, name: str, fingerprint: str, expires_at: float, tokens: int):
+        self.name = name
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at  # time.monotonic() deadline
+        self.tokens = tokens
+
+
+class ContextCache:
+    """
+    One cached prefix per key (e.g. per user), LRU-bounded
+    Prefixes below the provider's minimum size are not cached
+    """
+    
+    def __init__(
+        self,
+        client: Optional[GeminiClient] = None,
+        ttl: int = 3600,
+        min_tokens: int = 1024,
+        max_entries: int = 1000,
+        retry_after: float = 300.0
+    ):
+        """
+        Initialize Context Cache
+        
+        Args:
+            client: Gemini client (default: the process-wide client)
+            ttl: Seconds a cached prefix lives without use
+            min_tokens: Smallest prefix worth caching (Gemini rejects smaller ones)
+            max_entries: Maximum cached prefixes (least recently used are deleted)
+            retry_after: Seconds to stop creating caches after the API refuses one
+        """
+        self.client = client or get_gemini_client()
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.max_entries = max_entries
+        self.retry_after = retry_after
+        
+        self.entries: OrderedDict[str, _CachedPrefix] = OrderedDict()
+        self.creating = set()
+        self.cancelled = set()  # invalidated while their create was in flight
+        self.disabled_until = 0.0
+        self.lock = threading.Lock()
+        # Creates, deletes and TTL refreshes never hold up a chat request
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gemini-cache')
+        
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.refreshed = 0
+        self.too_small = 0
+        self.failures = 0
+    
+    @staticmethod
+    def fingerprint(model: str, system_text: str, prefix_text: str) -> str:
+        digest = hashlib.sha256()
+        for text in (model, system_text, prefix_text):
+            digest.update(text.encode('utf-8'))
+            digest.update(b'\x00')
+        return digest.hexdigest()
+    
+    def get(self, key: str, model: str, system_text: str, prefix_text: str, tokens: int) -> Optional[str]:
+        """
+        Cached content name for a prefix; on a miss the prefix is registered in
+        the background and this request sends it inline
+        
+        Args:
+            key: Cache slot (one live prefix per key)
+            model: Model the cache is created for (e.g. "gemini-2.5-flash")
+            system_text: System instruction
+            prefix_text: Stable first user content
+            tokens: Token count of system_text + prefix_text
+        
+        Returns:
+            "cachedContents/..." name, or None to send the prefix inline
+        """
+        fingerprint = self.fingerprint(model, system_text, prefix_text)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.fingerprint == fingerprint and now < entry.expires_at - 30:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                # In use with under half its TTL left: extend it in the background
+                if entry.expires_at - now < self.ttl / 2:
+                    entry.expires_at = now + self.ttl
+                    self.executor.submit(self._refresh, entry.name)
+                return entry.name
+            
+            self.misses += 1
+            if tokens < self.min_tokens:
+                self.too_small += 1
+                return None
+            if now < self.disabled_until or key in self.creating:
+                return None
+            self.creating.add(key)
+        
+        self.executor.submit(self._register, key, model, system_text, prefix_text, fingerprint, tokens)
+        return None
+    
+    def _register(
+        self,
+        key: str,
+        model: str,
+        system_text: str,
+        prefix_text: str,
+        fingerprint: str,
+        tokens: int
+    ) -> None:
+        """Create a cached prefix and make it the key's entry (runs on the executor)"""
+        try:
+            name = self._create(model, system_text, prefix_text)
+        finally:
+            with self.lock:
+                self.creating.discard(key)
+                cancelled = key in self.cancelled
+                self.cancelled.discard(key)
+        if name is None:
+            return
+        if cancelled:
+            self._delete(name)
+            return
+        
+        stale = []
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                stale.append(old.name)
+            self.entries[key] = _CachedPrefix(name, fingerprint, time.monotonic() + self.ttl, tokens)
+            while len(self.entries) > self.max_entries:
+                stale.append(self.entries.popitem(last=False)[1].name)
+            self.created += 1
+        for stale_name in stale:
+            self._delete(stale_name)
+    
+    def _create(self, model: str, system_text: str, prefix_text: str) -> Optional[str]:
+        payload = {
+            "model": f"models/{model}",
+            "systemInstruction": {"parts": [{"text": system_text}]},
+            "contents": [{"role": "user", "parts": [{"text": prefix_text}]}],
+            "ttl": f"{self.ttl}s"
+        }
+        try:
+            response = self.client.post("cachedContents", payload, idempotent=False)
+            if response.ok:
+                return response.json()['name']
+            error = response.text
+        except Exception as e:
+            error = str(e)
+        
+        with self.lock:
+            self.failures += 1
+            self.disabled_until = time.monotonic() + self.retry_after
+        print(f"⚠️  Gemini context cache unavailable, sending prompts inline: {error[:200]}")
+        return None
+    
+    def _refresh(self, name: str) -> None:
+        try:
+            response = self.client.request(
+                'PATCH', name, {"ttl": f"{self.ttl}s"}, params={"updateMask": "ttl"}
+            )
+            if response.ok:
+                with self.lock:
+                    self.refreshed += 1
+                return
+        except Exception:
+            pass
+        # Refresh failed: forget the entry so the next request recreates it
+        with self.lock:
+            for key, entry in list(self.entries.items()):
+                if entry.name == name:
+                    del self.entries[key]
+    
+    def _delete(self, name: str) -> None:
+        try:
+            self.client.request('DELETE', name)
+        except Exception:
+            pass  # expires on its own
+    
+    def invalidate(self, key: str) -> None:
+        """Drop a key's cached prefix (e.g. after the user's memories are deleted)"""
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if key in self.creating:
+                self.cancelled.add(key)
+        if entry is not None:
+            self.executor.submit(self._delete, entry.name)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+        
+        Returns:
+            Dictionary with cache stats
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'cached_tokens': sum(entry.tokens for entry in self.entries.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'created': self.created,
+                'refreshed': self.refreshed,
+                'too_small': self.too_small,
+                'failures': self.failures,
+                'ttl': self.ttl
+            }
+
+
+_cache: Optional[ContextCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_context_cache() -> Optional[ContextCache]:
+    """
+    Process-wide ContextCache built from environment variables (None when disabled)
+    
+    GEMINI_CONTEXT_CACHE: register stable prefixes as cached content (default False)
+    GEMINI_CONTEXT_CACHE_TTL: seconds an unused cached prefix lives (default 3600)
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS: smallest prefix cached (default 1024)
+    GEMINI_CONTEXT_CACHE_MAX: maximum cached prefixes (default 1000)
+    """
+    global _cache
+    if os.getenv('GEMINI_CONTEXT_CACHE', 'False').lower() != 'true':
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ContextCache(
+                    ttl=int(os.getenv('GEMINI_CONTEXT_CACHE_TTL', '3600')),
+                    min_tokens=int(os.getenv('GEMINI_CONTEXT_CACHE_MIN_TOKENS', '1024')),
+                    max_entries=int(os.getenv('GEMINI_CONTEXT_CACHE_MAX', '1000'))
+                )
+    return _cache
@@ -0,0 +1,160 @@
+"""
+Recency Index - Per-user time index over memory vector IDs
+Vector IDs are "<user_id>_<epoch ms>", so a user's timeline can be built
+from an ID listing and paged newest-first without any similarity query.
+A timeline is built once; refreshes only merge IDs listed since then
+"""
+
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class _UserTimeline:
+    """Sorted (timestamp_ms, vector_id) entries for one user"""
+    
+    __slots__ = ('entries', 'loaded_at', 'listed_ms')
+    
+    def __init__(self, entries: List[Tuple[int, str]], listed_ms: int):
+        self.entries = sorted(entries)
+        self.loaded_at = time.monotonic()
+        self.listed_ms = listed_ms
+
+
+class RecencyIndex:
+    """
+    LRU of user timelines kept in process memory
+    Timelines older than ttl are refreshed so writes from other workers show up
+    """
+    
+    def __init__(self, max_users: int = 10000, ttl: float = 300.0):
+        """
+        Initialize Recency Index
+        
+        Args:
+            max_users: Maximum timelines kept (least recently used are dropped)
+            ttl: Seconds before a timeline is considered stale and refreshed
+        """
+        self.max_users = max_users
+        self.ttl = ttl
+        self.timelines: OrderedDict[str, _UserTimeline] = OrderedDict()
+        self.lock = threading.Lock()
+        self.loads = 0
+        self.refreshes = 0
+    
+    def is_fresh(self, user_id: str) -> bool:
+        """Whether the user's timeline is loaded and younger than ttl"""
+        with self.lock:
+            timeline = self.timelines.get(user_id)
+            return timeline is not None and time.monotonic() - timeline.loaded_at < self.ttl
+    
+    def listed_until(self, user_id: str) -> Optional[int]:
+        """Epoch ms up to which the user's IDs have been listed (None = timeline not loaded)"""
+        with self.lock:
+            timeline = self.timelines.get(user_id)
+            return timeline.listed_ms if timeline is not None else None
+    
+    def load(self, user_id: str, entries: Iterable[Tuple[int, str]], listed_ms: int) -> None:
+        """
+        Replace a user's timeline
+        
+        Args:
+            user_id: User identifier
+            entries: (timestamp_ms, vector_id) pairs in any order
+            listed_ms: Epoch ms at which the listing the entries came from started
+        """
+        timeline = _UserTimeline(list(entries), listed_ms)
+        with self.lock:
+            self.timelines[user_id] = timeline
+            self.timelines.move_to_end(user_id)
+            if len(self.timelines) > self.max_users:
+                self.timelines.popitem(last=False)
+            self.loads += 1
+    
+    def merge(self, user_id: str, entries: Iterable[Tuple[int, str]], listed_ms: int) -> None:
+        """
+        Add entries from an incremental listing and mark the timeline fresh
+        
+        Args:
+            user_id: User identifier
+            entries: (timestamp_ms, vector_id) pairs, possibly already known
+            listed_ms: Epoch ms at which the listing started
+        """
+        with self.lock:
+            timeline = self.timelines.get(user_id)
+            if timeline is None:
+                return
+            for entry in entries:
+                self._insert(timeline, entry)
+            timeline.loaded_at = time.monotonic()
+            timeline.listed_ms = max(timeline.listed_ms, listed_ms)
+            self.timelines.move_to_end(user_id)
+            self.refreshes += 1
+    
+    def add(self, user_id: str, vector_id: str, timestamp_ms: int) -> None:
+        """Record a new memory (ignored until the user's timeline is loaded)"""
+        with self.lock:
+            timeline = self.timelines.get(user_id)
+            if timeline is not None:
+                self._insert(timeline, (timestamp_ms, vector_id))
+    
+    @staticmethod
+    def _insert(timeline: _UserTimeline, entry: Tuple[int, str]) -> None:
+        """Insert an entry unless it is already there (caller holds the lock)"""
+        position = bisect.bisect_left(timeline.entries, entry)
+        if position == len(timeline.entries) or timeline.entries[position] != entry:
+            timeline.entries.insert(position, entry)
+    
+    def remove(self, user_id: str, vector_ids: Iterable[str]) -> None:
+        """Forget deleted memories"""
+        removed = set(vector_ids)
+        with self.lock:
+            timeline = self.timelines.get(user_id)
+            if timeline is not None:
+                timeline.entries = [e for e in timeline.entries if e[1] not in removed]
+    
+    def drop_user(self, user_id: str) -> None:
+        """Forget a user's timeline entirely"""
+        with self.lock:
+            self.timelines.pop(user_id, None)
+    
+    def page(self, user_id: str, before_ms: Optional[int] = None, limit: int = 20) -> Tuple[List[Tuple[int, str]], bool]:
+        """
+        Newest-first page of a user's memories
+        
+        Args:
+            user_id: User identifier
+            before_ms: Only memories strictly older than this (epoch ms; None = newest)
+            limit: Maximum entries
+        
+        Returns:
+            Tuple of ((timestamp_ms, vector_id) entries newest first, whether older entries remain)
+        """
+        with self.lock:
+            timeline = self.timelines.get(user_id)
+            if timeline is None:
+                return [], False
+            self.timelines.move_to_end(user_id)
+            entries = timeline.entries
+            end = len(entries) if before_ms is None else bisect.bisect_left(entries, (before_ms, ''))
+            start = max(0, end - limit)
+            return entries[start:end][::-1], start > 0
+    
+    def get_stats(self) -> Dict:
+        """
+        Get index statistics
+        
+        Returns:
+            Dictionary with index stats
+        """
+        with self.lock:
+            return {
+                'users': len(self.timelines),
+                'max_users': self.max_users,
+                'entries': sum(len(t.entries) for t in self.timelines.values()),
+                'loads': self.loads,
+                'refreshes': self.refreshes,
+                'ttl': self.ttl
+            }
@@ -0,0 +1,115 @@
+"""
+Service Warm-up - Background, retrying construction of slow service clients
+The server binds its port immediately while Pinecone/genai clients are built
+on a background thread; transient failures are retried with backoff instead
+of leaving the service unavailable until restart
+"""
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class ServiceWarmup:
+    """
+    Runs a factory on a background thread until it succeeds
+    Configuration errors (ValueError, ImportError) are not retried
+    """
+    
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0
+    ):
+        """
+        Initialize Service Warm-up
+        
+        Args:
+            factory: Builds and returns the services (raises on failure)
+            base_backoff: Delay before the first retry in seconds
+            max_backoff: Upper bound on the retry delay in seconds
+        """
+        self.factory = factory
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.result = None
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.state: Dict[str, Any] = {
+            'status': 'pending',
+            'attempts': 0,
+            'last_error': None,
+            'started_at': None,
+            'ready_at': None,
+            'init_seconds': None
+        }
+    
+    def start(self) -> None:
+        """Start warming up (no-op if already running, ready or unavailable)"""
+        with self.lock:
+            if self.state['status'] != 'pending':
+                return
+            self.state['status'] = 'initializing'
+            self.state['started_at'] = time.time()
+            self.thread = threading.Thread(target=self._run, name='service-warmup', daemon=True)
+            self.thread.start()
+    
+    def _run(self) -> None:
+        started = time.monotonic()
+        backoff = self.base_backoff
+        while True:
+            with self.lock:
+                self.state['attempts'] += 1
+            try:
+                result = self.factory()
+            except (ValueError, ImportError) as e:
+                # Missing API keys or packages: retrying cannot help
+                with self.lock:
+                    self.state['status'] = 'unavailable'
+                    self.state['last_error'] = str(e)
+                print(f"❌ Service initialization failed: {e}")
+                self.ready.set()
+                return
+            except Exception as e:
+                with self.lock:
+                    self.state['last_error'] = str(e)
+                delay = random.uniform(0, backoff)
+                print(f"⚠️  Service initialization failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            
+            with self.lock:
+                self.result = result
+                self.state['status'] = 'ready'
+                self.state['last_error'] = None
+                self.state['ready_at'] = time.time()
+                self.state['init_seconds'] = round(time.monotonic() - started, 3)
+            self.ready.set()
+            return
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Start warming up if needed and wait until it finishes
+        
+        Args:
+            timeout: Maximum seconds to wait (None = no limit)
+        
+        Returns:
+            True if the services are ready
+        """
+        self.start()
+        self.ready.wait(timeout)
+        return self.is_ready()
+    
+    def is_ready(self) -> bool:
+        with self.lock:
+            return self.state['status'] == 'ready'
+    
+    def get_state(self) -> Dict[str, Any]:
+        """Get warm-up state (status: pending, initializing, ready or unavailable)"""
+        with self.lock:
+            return dict(self.state)
@@ -0,0 +1,237 @@
+"""
+Token Counter - Pluggable token counts for prompt budgeting
+SentencePieceCounter uses a local SentencePiece model (e.g. Gemma's tokenizer,
+which shares Gemini's vocabulary); ScriptTokenCounter is a dependency-free
+fallback with per-script ratios, since Devanagari and Telugu text yields far
+more tokens per character than English. Its default ratios are estimates;
+fit them to a real tokenizer with benchmarks/calibrate_tokens.py and set
+TOKEN_CHARS_PER_TOKEN. Counts are memoized per text block
+"""
+
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Protocol
+
+# Try to import SentencePiece (optional: exact counts)
+try:
+    import sentencepiece as spm
+    SENTENCEPIECE_AVAILABLE = True
+except ImportError:
+    SENTENCEPIECE_AVAILABLE = False
+
+# Characters per token by script (ASCII covers English, digits and spacing).
+# Rough estimates for SentencePiece-style vocabularies, not measured on
+# Gemini's tokenizer: refit them with benchmarks/calibrate_tokens.py
+DEFAULT_CHARS_PER_TOKEN = {
+    'ascii': 4.0,
+    'devanagari': 2.8,
+    'telugu': 2.2,
+    'other': 1.5
+}
+
+# UTF-8 lead + second byte of each script's block (Devanagari U+0900-U+097F,
+# Telugu U+0C00-U+0C7F); counting byte pairs beats a regex scan several times over
+SCRIPT_UTF8_PREFIXES = {
+    'devanagari': (b'\xe0\xa4', b'\xe0\xa5'),
+    'telugu': (b'\xe0\xb0', b'\xe0\xb1')
+}
+
+
+class TokenCounter(Protocol):
+    """Anything with count(text) -> tokens"""
+    
+    def count(self, text: str) -> int:
+        ...
+
+
+class ScriptTokenCounter:
+    """
+    Token estimate from per-script character counts
+    ASCII-only text (most English) takes a single isascii() check
+    """
+    
+    def __init__(self, chars_per_token: Optional[Dict[str, float]] = None):
+        """
+        Initialize Script Token Counter
+        
+        Args:
+            chars_per_token: Per-script ratios overriding DEFAULT_CHARS_PER_TOKEN
+                ('ascii', 'devanagari', 'telugu', 'other')
+        """
+        self.chars_per_token = {**DEFAULT_CHARS_PER_TOKEN, **(chars_per_token or {})}
+    
+    def script_chars(self, text: str) -> Dict[str, int]:
+        """Characters per script in text"""
+        ascii_chars = len(text.encode('ascii', 'ignore'))
+        counts = {'ascii': ascii_chars}
+        remaining = len(text) - ascii_chars
+        encoded = text.encode('utf-8') if remaining else b''
+        for script, prefixes in SCRIPT_UTF8_PREFIXES.items():
+            chars = sum(encoded.count(prefix) for prefix in prefixes)
+            counts[script] = chars
+            remaining -= chars
+        counts['other'] = remaining
+        return counts
+    
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if text.isascii():
+            return math.ceil(len(text) / self.chars_per_token['ascii'])
+        tokens = sum(
+            chars / self.chars_per_token[script]
+            for script, chars in self.script_chars(text).items()
+            if chars
+        )
+        return math.ceil(tokens)
+    
+    @classmethod
+    def calibrate(cls, reference: TokenCounter, samples: Iterable[str]) -> 'ScriptTokenCounter':
+        """
+        Fit per-script ratios to a reference tokenizer
+        
+        Args:
+            reference: Exact counter (e.g. SentencePieceCounter)
+            samples: Texts that are each (mostly) in a single script
+        
+        Returns:
+            ScriptTokenCounter with fitted ratios (scripts without samples keep defaults)
+        """
+        chars: Dict[str, int] = {}
+        tokens: Dict[str, int] = {}
+        counter = cls()
+        for text in samples:
+            script_chars = counter.script_chars(text)
+            # Attribute the sample to its dominant non-ASCII script (spaces ride along)
+            script = max(script_chars, key=lambda s: (s != 'ascii', script_chars[s]))
+            if not script_chars[script]:
+                script = 'ascii'
+            chars[script] = chars.get(script, 0) + len(text)
+            tokens[script] = tokens.get(script, 0) + reference.count(text)
+        return cls({script: chars[script] / tokens[script] for script in chars if tokens[script]})
+
+
+class SentencePieceCounter:
+    """Exact counts from a local SentencePiece model file"""
+    
+    def __init__(self, model_path: str):
+        """
+        Initialize SentencePiece Counter
+        
+        Args:
+            model_path: Path to a .model file (e.g. Gemma's tokenizer.model)
+        """
+        if not SENTENCEPIECE_AVAILABLE:
+            raise ImportError("sentencepiece not installed. Install with: pip install sentencepiece")
+        self.model_path = model_path
+        self.processor = spm.SentencePieceProcessor(model_file=model_path)
+    
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self.processor.encode(text))
+
+
+class CachedTokenCounter:
+    """
+    Memoizes another counter's results (LRU keyed by text hash, so cached
+    blocks are not kept alive by the cache)
+    """
+    
+    def __init__(self, counter: TokenCounter, max_entries: int = 100000, min_length: int = 64):
+        """
+        Initialize Cached Token Counter
+        
+        Args:
+            counter: Counter to memoize
+            max_entries: Maximum memoized counts
+            min_length: Shorter texts are counted directly
+        """
+        self.counter = counter
+        self.max_entries = max_entries
+        self.min_length = min_length
+        self.counts: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def count(self, text: str) -> int:
+        if len(text) < self.min_length:
+            return self.counter.count(text)
+        
+        key = (hash(text), len(text))
+        with self.lock:
+            tokens = self.counts.get(key)
+            if tokens is not None:
+                self.counts.move_to_end(key)
+                self.hits += 1
+                return tokens
+        
+        tokens = self.counter.count(text)
+        with self.lock:
+            self.misses += 1
+            self.counts[key] = tokens
+            if len(self.counts) > self.max_entries:
+                self.counts.popitem(last=False)
+        return tokens
+    
+    def get_stats(self) -> Dict[str, object]:
+        """
+        Get counter statistics
+        
+        Returns:
+            Dictionary with counter stats
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'counter': type(self.counter).__name__,
+                'memoized': len(self.counts),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+_counter: Optional[CachedTokenCounter] = None
+_counter_lock = threading.Lock()
+
+
+def get_token_counter() -> CachedTokenCounter:
+    """
+    Process-wide token counter built from environment variables
+    
+    TOKENIZER_MODEL: SentencePiece model file for exact counts (default: per-script estimate)
+    TOKEN_CHARS_PER_TOKEN: JSON object of fitted per-script ratios for the estimate
+        (as printed by benchmarks/calibrate_tokens.py)
+    TOKEN_COUNT_CACHE_SIZE: memoized block counts (default 100000)
+    """
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                ratios = None
+                if os.getenv('TOKEN_CHARS_PER_TOKEN'):
+                    try:
+                        ratios = {
+                            script: float(ratio)
+                            for script, ratio in json.loads(os.environ['TOKEN_CHARS_PER_TOKEN']).items()
+                        }
+                    except (ValueError, TypeError, AttributeError) as e:
+                        print(f"⚠️  Ignoring invalid TOKEN_CHARS_PER_TOKEN: {str(e)}")
+                counter: TokenCounter = ScriptTokenCounter(ratios)
+                model_path = os.getenv('TOKENIZER_MODEL')
+                if model_path:
+                    try:
+                        counter = SentencePieceCounter(model_path)
+                        print(f"✅ Token counter: SentencePiece ({model_path})")
+                    except Exception as e:
+                        print(f"⚠️  Token counter: falling back to per-script estimate ({str(e)})")
+                _counter = CachedTokenCounter(
+                    counter,
+                    max_entries=int(os.getenv('TOKEN_COUNT_CACHE_SIZE', '100000'))
+                )
+    return _counter
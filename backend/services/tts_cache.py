@@ -1,12 +1,87 @@
 """
 TTS Cache - Cache common TTS responses for instant playback
 Speeds up frequently used phrases from ~4 seconds to instant
+Two tiers: an in-memory LRU bounded by entries and bytes, and an optional
+on-disk tier of per-key files that entries evicted from memory move down to.
+Disk entries survive restarts and are served from a memory map (zero-copy).
+The disk directory can be shared by several workers: a miss also looks for a
+file another worker wrote, and the disk budget is enforced under a file lock
+Entries can be stored compressed (see tts_codecs) and are decoded on hit
 """
 
 import hashlib
+import heapq
+import itertools
+import mmap
+import os
+import struct
 import threading
-from typing import Optional, Tuple, Dict
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Optional, Tuple, Dict, Iterable, Iterator, List, Union
 from collections import OrderedDict
+from contextlib import contextmanager
+
+# File locking for a disk tier shared by workers (not on Windows: one worker per directory there)
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+from .tts_codecs import CODEC_IDS, CODEC_NAMES, RAW, available_codecs, decode_audio, default_codec, encode_audio
+from .tts_segments import SegmentStitcher, decode_pcm, encode_pcm, encode_wav, split_segments
+
+# Disk entry header: magic, sample rate and codec id, followed by the stored audio bytes
+DISK_MAGIC = b'YTT2'
+DISK_HEADER = struct.Struct('<4sIB')
+DISK_SUFFIX = '.tts'
+DISK_LOCK_FILE = '.lock'
+
+# A disk hit refreshes its file's mtime (the shared LRU order) at most this often
+DISK_TOUCH_INTERVAL = 60.0
+
+# The disk index is rebuilt from the directory at least this often, so files
+# written by other workers count against the budget
+DISK_RESCAN_INTERVAL = 60.0
+
+# Snapshot file: header (magic, entry count), then per entry its key digest,
+# sample rate, codec id, decoded and stored length followed by the stored bytes
+SNAPSHOT_MAGIC = b'YTS2'
+SNAPSHOT_HEADER = struct.Struct('<4sI')
+SNAPSHOT_ENTRY = struct.Struct('<16sIBII')
+
+# Compressed entries are kept only if at least this much smaller than raw
+MIN_COMPRESSION_SAVING = 0.1
+
+AudioData = Union[bytes, memoryview]
+
+
+class SynthesisTimeoutError(Exception):
+    """Raised when another caller's synthesis of the same phrase does not finish in time"""
+
+
+class _Entry:
+    """One cached phrase as stored (possibly compressed)"""
+    
+    __slots__ = ('data', 'sample_rate', 'codec', 'raw_size')
+    
+    def __init__(self, data: bytes, sample_rate: int, codec: str = RAW, raw_size: Optional[int] = None):
+        self.data = data
+        self.sample_rate = sample_rate
+        self.codec = codec
+        self.raw_size = len(data) if raw_size is None else raw_size
+
+
+class _Flight:
+    """One in-progress synthesis that concurrent callers wait on"""
+    
+    __slots__ = ('done', 'result', 'error')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Tuple[bytes, int]] = None
+        self.error: Optional[BaseException] = None
 
 
 class TTSCache:
@@ -15,18 +90,85 @@ class TTSCache:
     Caches common responses for instant playback
     """
     
-    def __init__(self, max_size: int = 1000):
+    def __init__(
+        self,
+        max_size: int = 1000,
+        max_bytes: int = 64 * 1024 * 1024,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 1024 * 1024 * 1024,
+        synthesis_timeout: float = 30.0,
+        segment_workers: int = 4,
+        codec: Optional[str] = None,
+        compress_min_bytes: int = 16 * 1024
+    ):
         """
         Initialize TTS Cache
         
         Args:
-            max_size: Maximum number of cached entries (LRU eviction after this)
+            max_size: Maximum number of entries in memory (LRU eviction after this)
+            max_bytes: Maximum stored (possibly compressed) audio bytes in memory (LRU eviction after this)
+            disk_dir: Directory for the on-disk tier (None = memory only)
+            disk_max_bytes: Maximum audio bytes on disk (oldest files removed after this)
+            synthesis_timeout: Seconds get_or_synthesize waits on another caller's synthesis
+            segment_workers: Concurrent segment syntheses for segmented replies
+            codec: Compress entries with this codec ('zstd', 'lz4', 'deflate', 'flac'; None = raw)
+            compress_min_bytes: Entries smaller than this are stored raw (not worth a decode)
         """
         self.max_size = max_size
-        self.cache: OrderedDict[str, Tuple[bytes, int]] = OrderedDict()
+        self.max_bytes = max_bytes
+        self.cache: OrderedDict[str, _Entry] = OrderedDict()
+        self.memory_bytes = 0
+        self.memory_raw_bytes = 0
         self.lock = threading.Lock()
         self.hits = 0
+        self.disk_hits = 0
         self.misses = 0
+        self.demoted = 0
+        self.disk_evictions = 0
+        
+        # key -> synthesis in progress (single-flight)
+        self.synthesis_timeout = synthesis_timeout
+        self.flights: Dict[str, _Flight] = {}
+        self.synthesized = 0
+        self.coalesced = 0
+        self.synthesis_failures = 0
+        self.synthesis_timeouts = 0
+        self.preload: Dict = {'state': 'idle'}
+        
+        # Segmented replies synthesize their missing segments on this pool, taking
+        # (priority, seq, future, args) jobs from a heap: every reply's first
+        # missing segment runs ahead of later segments of other replies
+        self.segment_workers = segment_workers
+        self.segment_executor: Optional[ThreadPoolExecutor] = None
+        self.segment_jobs: List[Tuple[int, int, Future, tuple]] = []
+        self.segment_seq = itertools.count()
+        self.segmented = 0
+        
+        if codec is not None and codec not in available_codecs():
+            print(f"⚠️  TTS cache codec '{codec}' unavailable, storing audio raw (available: {available_codecs()})")
+            codec = None
+        self.codec = codec
+        self.compress_min_bytes = compress_min_bytes
+        self.encodes = 0
+        self.encode_seconds = 0.0
+        self.decodes = 0
+        self.decode_seconds = 0.0
+        self.served_encoded = 0
+        
+        # key -> file size, least recently used first
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_index: OrderedDict[str, int] = OrderedDict()
+        self.disk_bytes = 0
+        self.disk_scanned_at = 0.0
+        self.disk_rescans = 0
+        if disk_dir:
+            try:
+                os.makedirs(disk_dir, exist_ok=True)
+                self._scan_disk()
+            except OSError as e:
+                print(f"⚠️  TTS disk cache disabled ({disk_dir}): {str(e)}")
+                self.disk_dir = None
     
     def _make_key(self, text: str, language: str, speaker: str = 'female') -> str:
         """
@@ -47,7 +189,7 @@ class TTSCache:
         key_string = f"{normalized_text}_{language}_{speaker}"
         return hashlib.md5(key_string.encode('utf-8')).hexdigest()
     
-    def get(self, text: str, language: str, speaker: str = 'female') -> Optional[Tuple[bytes, int]]:
+    def get(self, text: str, language: str, speaker: str = 'female') -> Optional[Tuple[AudioData, int]]:
         """
         Get cached audio for text/language/speaker
         
@@ -57,22 +199,105 @@ class TTSCache:
             speaker: Speaker type ('male', 'female')
             
         Returns:
-            Tuple of (audio_bytes, sample_rate) if cached, None otherwise
+            Tuple of (audio_bytes, sample_rate) if cached, None otherwise.
+            Uncompressed disk-tier hits return a read-only memoryview over the mapped file
+        """
+        entry = self._lookup(self._make_key(text, language, speaker))
+        if entry is None:
+            return None
+        return self._decode(entry), entry.sample_rate
+    
+    def get_encoded(
+        self,
+        text: str,
+        language: str,
+        accept: Iterable[str],
+        speaker: str = 'female'
+    ) -> Optional[Tuple[AudioData, int, str]]:
         """
+        Get cached audio without decoding it when the client accepts the stored codec
+        ('deflate' and 'zstd' are HTTP Content-Encodings, 'flac' is audio/flac)
+        
+        Args:
+            text: Text to synthesize
+            language: Language code ('hi', 'te', 'en')
+            accept: Codecs the client can decode
+            speaker: Speaker type ('male', 'female')
+        
+        Returns:
+            Tuple of (audio_bytes, sample_rate, codec) if cached, None otherwise;
+            codec is 'raw' when the audio had to be decoded (or was stored raw)
+        """
+        entry = self._lookup(self._make_key(text, language, speaker))
+        if entry is None:
+            return None
+        if entry.codec != RAW and entry.codec.split('/')[0] in accept:
+            with self.lock:
+                self.served_encoded += 1
+            return entry.data, entry.sample_rate, entry.codec.split('/')[0]
+        return self._decode(entry), entry.sample_rate, RAW
+    
+    def _lookup(self, key: str) -> Optional[_Entry]:
+        """Stored entry from memory or disk, counting the hit or miss"""
         with self.lock:
-            key = self._make_key(text, language, speaker)
-            
-            if key in self.cache:
+            entry = self.cache.get(key)
+            if entry is not None:
                 # Move to end (most recently used)
-                audio_data = self.cache.pop(key)
-                self.cache[key] = audio_data
+                self.cache.move_to_end(key)
                 self.hits += 1
-                return audio_data
-            else:
+                return entry
+            if not self.disk_dir:
                 self.misses += 1
                 return None
+        
+        # Also tried for keys missing from the index: another worker may have written them
+        entry = self._read_disk(key)
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+                stale = self._forget_disk(key)
+            else:
+                if key in self.disk_index:
+                    self.disk_index.move_to_end(key)
+                else:
+                    size = DISK_HEADER.size + len(entry.data)
+                    self.disk_index[key] = size
+                    self.disk_bytes += size
+                self.disk_hits += 1
+                return entry
+        if stale:
+            self._remove_file(key)  # unreadable (e.g. an older format)
+        return None
+    
+    def _encode(self, audio_bytes: bytes, sample_rate: int) -> _Entry:
+        """Compress an entry if it is large enough and compression pays off"""
+        if self.codec is None or len(audio_bytes) < self.compress_min_bytes:
+            return _Entry(audio_bytes, sample_rate)
+        start = time.perf_counter()
+        try:
+            data, codec = encode_audio(audio_bytes, self.codec, sample_rate)
+        except Exception as e:
+            print(f"⚠️  TTS cache compression failed, storing raw: {str(e)}")
+            return _Entry(audio_bytes, sample_rate)
+        with self.lock:
+            self.encodes += 1
+            self.encode_seconds += time.perf_counter() - start
+        if len(data) > len(audio_bytes) * (1 - MIN_COMPRESSION_SAVING):
+            return _Entry(audio_bytes, sample_rate)
+        return _Entry(data, sample_rate, codec, len(audio_bytes))
+    
+    def _decode(self, entry: _Entry) -> AudioData:
+        """Audio bytes of an entry, decompressing lazily (raw data is returned as is)"""
+        if entry.codec == RAW:
+            return entry.data
+        start = time.perf_counter()
+        audio_bytes = decode_audio(entry.data, entry.codec)
+        with self.lock:
+            self.decodes += 1
+            self.decode_seconds += time.perf_counter() - start
+        return audio_bytes
     
-    def set(self, text: str, language: str, audio_bytes: bytes, sample_rate: int, speaker: str = 'female') -> None:
+    def set(self, text: str, language: str, audio_bytes: AudioData, sample_rate: int, speaker: str = 'female') -> None:
         """
         Cache audio for text/language/speaker
         
@@ -83,26 +308,530 @@ class TTSCache:
             sample_rate: Audio sample rate
             speaker: Speaker type ('male', 'female')
         """
+        entry = self._encode(bytes(audio_bytes), sample_rate)
+        self._put(self._make_key(text, language, speaker), entry)
+    
+    def _put(self, key: str, entry: _Entry) -> None:
+        """Insert into the memory tier, demoting what no longer fits"""
         with self.lock:
-            key = self._make_key(text, language, speaker)
-            
             # If key exists, remove it (will re-add at end)
             if key in self.cache:
-                self.cache.pop(key)
+                old = self.cache.pop(key)
+                self.memory_bytes -= len(old.data)
+                self.memory_raw_bytes -= old.raw_size
+            # The new audio supersedes any copy on disk
+            stale = self._forget_disk(key)
             
-            # Add new entry at end
-            self.cache[key] = (audio_bytes, sample_rate)
-            
-            # LRU eviction: remove oldest if cache is full
-            if len(self.cache) > self.max_size:
-                self.cache.popitem(last=False)  # Remove oldest (first) item
+            if len(entry.data) > self.max_bytes:
+                # Larger than the whole memory budget: straight to disk
+                evicted = [(key, entry)]
+            else:
+                # Add new entry at end
+                self.cache[key] = entry
+                self.memory_bytes += len(entry.data)
+                self.memory_raw_bytes += entry.raw_size
+                evicted = self._evict_memory()
+        
+        if stale:
+            self._remove_file(key)
+        self._demote(evicted)
+    
+    def get_or_synthesize(
+        self,
+        text: str,
+        language: str,
+        speaker: str,
+        engine,
+        timeout: Optional[float] = None
+    ) -> Tuple[AudioData, int]:
+        """
+        Get cached audio, synthesizing it on a miss
+        Concurrent misses for the same phrase share one synthesis: the first
+        caller runs it and the others wait for its result. A failed synthesis
+        is raised to everyone waiting on it but is not cached, so the next
+        call tries again
+        
+        Args:
+            text: Text to synthesize
+            language: Language code ('hi', 'te', 'en')
+            speaker: Speaker type ('male', 'female')
+            engine: TTS engine with synthesize(text=, language=, speaker=) -> (audio_bytes, sample_rate)
+            timeout: Seconds to wait on another caller's synthesis (default synthesis_timeout)
+        
+        Returns:
+            Tuple of (audio_bytes, sample_rate)
+        
+        Raises:
+            SynthesisTimeoutError: If the shared synthesis does not finish in time
+            Exception: Whatever the engine raised
+        """
+        cached = self.get(text, language, speaker)
+        if cached is not None:
+            return cached
+        return self._synthesize_once(text, language, speaker, engine, timeout)
+    
+    def _synthesize_once(
+        self,
+        text: str,
+        language: str,
+        speaker: str,
+        engine,
+        timeout: Optional[float] = None
+    ) -> Tuple[AudioData, int]:
+        """Single-flight synthesis after a miss (see get_or_synthesize)"""
+        key = self._make_key(text, language, speaker)
+        with self.lock:
+            # Filled in while we were looking
+            entry = self.cache.get(key)
+            if entry is not None:
+                self.cache.move_to_end(key)
+            flight = self.flights.get(key)
+            leader = flight is None
+            if entry is None and leader:
+                flight = self.flights[key] = _Flight()
+            elif entry is None:
+                self.coalesced += 1
+        if entry is not None:
+            return self._decode(entry), entry.sample_rate
+        
+        if not leader:
+            if not flight.done.wait(self.synthesis_timeout if timeout is None else timeout):
+                with self.lock:
+                    self.synthesis_timeouts += 1
+                raise SynthesisTimeoutError(f"TTS synthesis of '{text[:30]}' ({language}) timed out")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        
+        try:
+            audio_bytes, sample_rate = engine.synthesize(text=text, language=language, speaker=speaker)
+            flight.result = (bytes(audio_bytes), sample_rate)
+            self.set(text, language, flight.result[0], sample_rate, speaker)
+            with self.lock:
+                self.synthesized += 1
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            with self.lock:
+                self.synthesis_failures += 1
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+    
+    def iter_segments(
+        self,
+        text: str,
+        language: str,
+        speaker: str,
+        engine
+    ) -> Iterator[Tuple[AudioData, int]]:
+        """
+        Audio of each segment of a reply, in order, as soon as it is available
+        Every segment is looked up on its own; misses are synthesized in
+        parallel, so cached segments (often the first) play immediately
+        
+        Args:
+            text: Reply text (split with split_segments)
+            language: Language code ('hi', 'te', 'en')
+            speaker: Speaker type ('male', 'female')
+            engine: TTS engine (see get_or_synthesize)
+        
+        Yields:
+            Tuple of (audio_bytes, sample_rate) per segment
+        """
+        pending = []
+        first_missing = True
+        for segment in split_segments(text):
+            cached = self.get(segment, language, speaker)
+            if cached is None:
+                # Playback waits on the first missing segment: it goes ahead of queued later segments
+                cached = self._submit_segment(0 if first_missing else 1, (segment, language, speaker, engine))
+                first_missing = False
+            pending.append(cached)
+        
+        try:
+            for item in pending:
+                yield item.result() if isinstance(item, Future) else item
+        finally:
+            # Caller stopped early or a synthesis failed: drop work not yet started
+            for item in pending:
+                if isinstance(item, Future):
+                    item.cancel()
+    
+    def stream_segmented(
+        self,
+        text: str,
+        language: str,
+        speaker: str,
+        engine,
+        sample_rate: Optional[int] = None,
+        crossfade_ms: float = 15.0
+    ) -> Iterator[Tuple[bytes, int]]:
+        """
+        A reply as raw 16-bit mono PCM chunks, stitched from per-segment entries
+        The first chunk is ready once the first segment is (playback can start
+        while later segments synthesize)
+        
+        Args:
+            text: Reply text
+            language: Language code ('hi', 'te', 'en')
+            speaker: Speaker type ('male', 'female')
+            engine: TTS engine (see get_or_synthesize)
+            sample_rate: Output rate (default: the first segment's rate)
+            crossfade_ms: Overlap between consecutive segments
+        
+        Yields:
+            Tuple of (pcm_bytes, sample_rate)
+        """
+        for samples, rate, _ in self._stitch(text, language, speaker, engine, sample_rate, crossfade_ms):
+            if len(samples):
+                yield encode_pcm(samples), rate
+    
+    def get_or_synthesize_segmented(
+        self,
+        text: str,
+        language: str,
+        speaker: str,
+        engine,
+        crossfade_ms: float = 15.0
+    ) -> Tuple[AudioData, int]:
+        """
+        Whole reply stitched from per-segment entries (see iter_segments)
+        
+        Args:
+            text: Reply text
+            language: Language code ('hi', 'te', 'en')
+            speaker: Speaker type ('male', 'female')
+            engine: TTS engine (see get_or_synthesize)
+            crossfade_ms: Overlap between consecutive segments
+        
+        Returns:
+            Tuple of (audio_bytes, sample_rate); WAV if the engine returns WAV, raw PCM otherwise
+        """
+        segments = split_segments(text)
+        if len(segments) <= 1:
+            return self.get_or_synthesize(segments[0] if segments else text, language, speaker, engine)
+        
+        chunks = []
+        rate = 0
+        was_wav = False
+        for samples, rate, was_wav in self._stitch(text, language, speaker, engine, None, crossfade_ms):
+            chunks.append(encode_pcm(samples))
+        pcm = b''.join(chunks)
+        return (encode_wav(pcm, rate) if was_wav else pcm), rate
+    
+    def _stitch(
+        self,
+        text: str,
+        language: str,
+        speaker: str,
+        engine,
+        sample_rate: Optional[int],
+        crossfade_ms: float
+    ) -> Iterator[Tuple['np.ndarray', int, bool]]:
+        """Yield (samples, rate, was_wav) from a SegmentStitcher fed segment by segment"""
+        with self.lock:
+            self.segmented += 1
+        stitcher = None
+        was_wav = False
+        for audio_bytes, segment_rate in self.iter_segments(text, language, speaker, engine):
+            samples, segment_wav = decode_pcm(audio_bytes)
+            if stitcher is None:
+                # The first segment decides the output rate and container
+                stitcher = SegmentStitcher(sample_rate or segment_rate, crossfade_ms)
+                was_wav = segment_wav
+            yield stitcher.push(samples, segment_rate), stitcher.sample_rate, was_wav
+        if stitcher is not None:
+            yield stitcher.flush(), stitcher.sample_rate, was_wav
+    
+    def _submit_segment(self, priority: int, args: tuple) -> Future:
+        """Queue a segment synthesis (lower priority runs first, then in submission order)"""
+        future = Future()
+        with self.lock:
+            heapq.heappush(self.segment_jobs, (priority, next(self.segment_seq), future, args))
+        self._segment_pool().submit(self._run_segment)
+        return future
+    
+    def _run_segment(self) -> None:
+        """Run the most urgent queued segment (one call per _submit_segment)"""
+        with self.lock:
+            _, _, future, args = heapq.heappop(self.segment_jobs)
+        if not future.set_running_or_notify_cancel():
+            return  # the reply was abandoned
+        try:
+            future.set_result(self._synthesize_once(*args))
+        except BaseException as e:
+            future.set_exception(e)
+    
+    def _segment_pool(self) -> ThreadPoolExecutor:
+        if self.segment_executor is None:
+            with self.lock:
+                if self.segment_executor is None:
+                    self.segment_executor = ThreadPoolExecutor(
+                        max_workers=self.segment_workers, thread_name_prefix='tts-segment'
+                    )
+        return self.segment_executor
+    
+    def save_snapshot(self, path: str) -> int:
+        """
+        Write the memory tier to a single file that load_snapshot restores
+        
+        Args:
+            path: Snapshot file path (replaced atomically)
+        
+        Returns:
+            Number of entries written
+        """
+        with self.lock:
+            entries = list(self.cache.items())  # oldest first, so LRU order is kept
+        
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(entries)))
+                for key, entry in entries:
+                    f.write(SNAPSHOT_ENTRY.pack(
+                        bytes.fromhex(key), entry.sample_rate, CODEC_IDS[entry.codec], entry.raw_size, len(entry.data)
+                    ))
+                    f.write(entry.data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️  Failed to save TTS cache snapshot ({path}): {str(e)}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return 0
+        return len(entries)
+    
+    def load_snapshot(self, path: str) -> int:
+        """
+        Load entries written by save_snapshot (no synthesis needed)
+        
+        Args:
+            path: Snapshot file path
+        
+        Returns:
+            Number of entries loaded (0 if the file is missing or unreadable)
+        """
+        start = time.time()
+        try:
+            with open(path, 'rb') as f:
+                data = memoryview(f.read())
+            magic, count = SNAPSHOT_HEADER.unpack_from(data)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError("not a TTS cache snapshot")
+            offset = SNAPSHOT_HEADER.size
+            entries = []
+            for _ in range(count):
+                digest, sample_rate, codec_id, raw_size, length = SNAPSHOT_ENTRY.unpack_from(data, offset)
+                offset += SNAPSHOT_ENTRY.size
+                if offset + length > len(data):
+                    raise ValueError("truncated snapshot")
+                if codec_id not in CODEC_NAMES:
+                    raise ValueError(f"unknown codec id {codec_id}")
+                entry = _Entry(bytes(data[offset:offset + length]), sample_rate, CODEC_NAMES[codec_id], raw_size)
+                entries.append((digest.hex(), entry))
+                offset += length
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError, struct.error) as e:
+            print(f"⚠️  Ignoring TTS cache snapshot ({path}): {str(e)}")
+            return 0
+        
+        for key, entry in entries:
+            self._put(key, entry)
+        print(f"✅ Loaded {len(entries)} TTS responses from snapshot in {(time.time() - start) * 1000:.0f}ms")
+        return len(entries)
     
-    def clear(self) -> None:
-        """Clear all cached entries"""
+    def _evict_memory(self) -> List[Tuple[str, _Entry]]:
+        """Pop least recently used entries over either budget (caller holds the lock)"""
+        evicted = []
+        while self.cache and (len(self.cache) > self.max_size or self.memory_bytes > self.max_bytes):
+            key, entry = self.cache.popitem(last=False)  # Remove oldest (first) item
+            self.memory_bytes -= len(entry.data)
+            self.memory_raw_bytes -= entry.raw_size
+            evicted.append((key, entry))
+        return evicted
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + DISK_SUFFIX)
+    
+    def _scan_disk(self) -> None:
+        """Index files left by earlier runs (or other workers)"""
+        files = self._list_disk()
+        with self.lock:
+            self._index_disk(files)
+        if files:
+            print(f"✅ TTS disk cache: {len(files)} entries ({self.disk_bytes / 1024 / 1024:.1f} MB) in {self.disk_dir}")
+    
+    def _list_disk(self) -> List[Tuple[str, int]]:
+        """(key, size) of every disk entry, least recently used (oldest mtime) first"""
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if not entry.is_dir():
+                continue
+            for file in os.scandir(entry.path):
+                if file.name.endswith(DISK_SUFFIX):
+                    try:
+                        stat = file.stat()
+                    except OSError:
+                        continue  # removed by another worker meanwhile
+                    files.append((stat.st_mtime, file.name[:-len(DISK_SUFFIX)], stat.st_size))
+        return [(key, size) for _, key, size in sorted(files)]
+    
+    def _index_disk(self, files: List[Tuple[str, int]]) -> None:
+        """Replace the disk index with a directory listing (caller holds the lock)"""
+        self.disk_index = OrderedDict(files)
+        self.disk_bytes = sum(size for _, size in files)
+        self.disk_scanned_at = time.time()
+    
+    @contextmanager
+    def _disk_lock(self) -> Iterator[None]:
+        """Exclusive lock on the disk directory across workers"""
+        if not FCNTL_AVAILABLE:
+            yield
+            return
+        with open(os.path.join(self.disk_dir, DISK_LOCK_FILE), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _forget_disk(self, key: str) -> bool:
+        """Drop a key from the disk index (caller holds the lock)"""
+        size = self.disk_index.pop(key, None)
+        if size is None:
+            return False
+        self.disk_bytes -= size
+        return True
+    
+    def _read_disk(self, key: str) -> Optional[_Entry]:
+        """Map a disk entry; its data is a view into the page cache, not a copy"""
+        try:
+            with open(self._path(key), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                touched = os.fstat(f.fileno()).st_mtime
+            # The mtime keeps LRU order across restarts and workers; a hit only
+            # rewrites it when it is stale, so hits do not cost a metadata write
+            if time.time() - touched > DISK_TOUCH_INTERVAL:
+                os.utime(self._path(key))
+        except (OSError, ValueError):
+            return None  # removed by another process, or empty
+        
+        view = memoryview(mapped)
+        if len(view) < DISK_HEADER.size:
+            return None
+        magic, sample_rate, codec_id = DISK_HEADER.unpack_from(view)
+        if magic != DISK_MAGIC or codec_id not in CODEC_NAMES:
+            return None
+        return _Entry(view[DISK_HEADER.size:], sample_rate, CODEC_NAMES[codec_id])
+    
+    def _demote(self, evicted: List[Tuple[str, _Entry]]) -> None:
+        """Write entries evicted from memory to the disk tier"""
+        if not self.disk_dir or not evicted:
+            return
+        written = []
+        for key, entry in evicted:
+            size = DISK_HEADER.size + len(entry.data)
+            if size > self.disk_max_bytes:
+                continue
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(tmp_path, 'wb') as f:
+                    f.write(DISK_HEADER.pack(DISK_MAGIC, entry.sample_rate, CODEC_IDS[entry.codec]))
+                    f.write(entry.data)
+                # Atomic rename: concurrent readers (or workers) never see a partial file
+                os.replace(tmp_path, path)
+                written.append((key, size))
+            except OSError as e:
+                print(f"⚠️  Failed to write TTS disk cache entry: {str(e)}")
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+        
+        with self.lock:
+            for key, size in written:
+                self._forget_disk(key)
+                self.disk_index[key] = size
+                self.disk_bytes += size
+                self.demoted += 1
+        if written:
+            self._enforce_disk_budget()
+    
+    def _enforce_disk_budget(self) -> None:
+        """
+        Remove least recently used files over disk_max_bytes
+        Runs under the directory lock. Other workers' files are only seen by
+        rescanning, so the index is rebuilt from the directory whenever it is
+        over budget or older than DISK_RESCAN_INTERVAL
+        """
+        try:
+            with self._disk_lock():
+                with self.lock:
+                    rescan = (self.disk_bytes > self.disk_max_bytes or
+                              time.time() - self.disk_scanned_at > DISK_RESCAN_INTERVAL)
+                files = self._list_disk() if rescan else None
+                removed = []
+                with self.lock:
+                    if files is not None:
+                        self._index_disk(files)
+                        self.disk_rescans += 1
+                    while self.disk_index and self.disk_bytes > self.disk_max_bytes:
+                        key, size = self.disk_index.popitem(last=False)
+                        self.disk_bytes -= size
+                        self.disk_evictions += 1
+                        removed.append(key)
+                for key in removed:
+                    self._remove_file(key)
+        except OSError as e:
+            print(f"⚠️  Failed to enforce the TTS disk cache budget: {str(e)}")
+    
+    def _remove_file(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass  # already gone (or still mapped on Windows)
+    
+    def clear(self, disk: bool = False) -> None:
+        """
+        Clear memory tier and counters
+        
+        Args:
+            disk: Also delete the on-disk tier
+        """
         with self.lock:
             self.cache.clear()
+            self.memory_bytes = 0
+            self.memory_raw_bytes = 0
             self.hits = 0
+            self.disk_hits = 0
             self.misses = 0
+            self.demoted = 0
+            self.disk_evictions = 0
+            self.synthesized = 0
+            self.coalesced = 0
+            self.synthesis_failures = 0
+            self.synthesis_timeouts = 0
+            self.encodes = 0
+            self.encode_seconds = 0.0
+            self.decodes = 0
+            self.decode_seconds = 0.0
+            self.served_encoded = 0
+            removed = list(self.disk_index) if disk else []
+            if disk:
+                self.disk_index.clear()
+                self.disk_bytes = 0
+        for key in removed:
+            self._remove_file(key)
     
     def get_stats(self) -> Dict:
         """
@@ -112,24 +841,73 @@ class TTSCache:
             Dictionary with cache stats
         """
         with self.lock:
-            total = self.hits + self.misses
-            hit_rate = (self.hits / total * 100) if total > 0 else 0.0
+            total = self.hits + self.disk_hits + self.misses
+            hit_rate = ((self.hits + self.disk_hits) / total * 100) if total > 0 else 0.0
             
             return {
                 'size': len(self.cache),
                 'max_size': self.max_size,
+                'memory_bytes': self.memory_bytes,
+                'memory_raw_bytes': self.memory_raw_bytes,
+                'max_bytes': self.max_bytes,
+                'codec': self.codec or RAW,
+                'compression_ratio': round(self.memory_raw_bytes / self.memory_bytes, 2) if self.memory_bytes else 1.0,
+                'encodes': self.encodes,
+                'avg_encode_ms': round(self.encode_seconds / self.encodes * 1000, 3) if self.encodes else 0.0,
+                'decodes': self.decodes,
+                'avg_decode_ms': round(self.decode_seconds / self.decodes * 1000, 3) if self.decodes else 0.0,
+                'served_encoded': self.served_encoded,
+                'disk_enabled': self.disk_dir is not None,
+                'disk_size': len(self.disk_index),
+                'disk_bytes': self.disk_bytes,
+                'disk_max_bytes': self.disk_max_bytes,
+                'disk_rescans': self.disk_rescans,
                 'hits': self.hits,
+                'disk_hits': self.disk_hits,
                 'misses': self.misses,
-                'hit_rate': f"{hit_rate:.1f}%"
+                'hit_rate': f"{hit_rate:.1f}%",
+                'demoted_to_disk': self.demoted,
+                'disk_evictions': self.disk_evictions,
+                'synthesized': self.synthesized,
+                'coalesced': self.coalesced,
+                'synthesis_failures': self.synthesis_failures,
+                'synthesis_timeouts': self.synthesis_timeouts,
+                'in_flight': len(self.flights),
+                'preload': dict(self.preload),
+                'segmented_replies': self.segmented
             }
     
-    def preload_common_responses(self, tts_engine) -> None:
+    def preload_common_responses(
+        self,
+        tts_engine,
+        max_workers: int = 2,
+        background: bool = False,
+        snapshot_path: Optional[str] = None
+    ) -> Optional[threading.Thread]:
         """
         Pre-cache common responses for instant playback
+        Phrases are synthesized on a bounded worker pool, crisis support first;
+        phrases already cached (from a snapshot or the disk tier) are skipped
         
         Args:
-            tts_engine: IndicTTSEngine instance to generate audio
+            tts_engine: IndicTTSEngine instance to generate audio (thread-safe if max_workers > 1)
+            max_workers: Concurrent syntheses
+            background: Warm in a daemon thread and return immediately (serve traffic meanwhile)
+            snapshot_path: Save a snapshot here once warm (see load_snapshot)
+        
+        Returns:
+            The warming thread if background, otherwise None
         """
+        if background:
+            thread = threading.Thread(
+                target=self.preload_common_responses,
+                args=(tts_engine, max_workers, False, snapshot_path),
+                name='tts-preload',
+                daemon=True
+            )
+            thread.start()
+            return thread
+        
         print("Pre-loading common TTS responses into cache...")
         
         # Common responses in English
@@ -181,10 +959,10 @@ class TTSCache:
             "It's okay to not be okay. I'm here to listen."
         ]
         
-        # Combine all responses
+        # Combine all responses, most important first
         responses_to_cache = []
         
-        for text in common_english + crisis_responses:
+        for text in crisis_responses + common_english:
             responses_to_cache.append((text, 'en', 'female'))
         
         for text in common_hindi:
@@ -193,48 +971,92 @@ class TTSCache:
         for text in common_telugu:
             responses_to_cache.append((text, 'te', 'female'))
         
-        # Generate and cache
-        cached_count = 0
-        failed_count = 0
-        
-        for text, language, speaker in responses_to_cache:
+        def warm(text: str, language: str, speaker: str) -> bool:
             try:
-                # Generate audio
-                audio_bytes, sample_rate = tts_engine.synthesize(
-                    text=text,
-                    language=language,
-                    speaker=speaker
-                )
-                
-                # Cache it
-                self.set(text, language, audio_bytes, sample_rate, speaker)
-                cached_count += 1
-                
+                # Generate and cache (shares the synthesis with live requests for the same phrase)
+                self.get_or_synthesize(text, language, speaker, tts_engine)
+                return True
             except Exception as e:
                 print(f"  ⚠️  Failed to cache '{text[:30]}...' ({language}): {str(e)}")
-                failed_count += 1
+                return False
+        
+        start = time.time()
+        with self.lock:
+            self.preload = {'state': 'warming', 'total': len(responses_to_cache), 'cached': 0, 'failed': 0}
+        
+        # Submitted in priority order; the pool's FIFO queue keeps that order
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tts-preload') as executor:
+            futures = [executor.submit(warm, *response) for response in responses_to_cache]
+            for future in as_completed(futures):
+                with self.lock:
+                    self.preload['cached' if future.result() else 'failed'] += 1
         
-        print(f"✅ Pre-cached {cached_count} common responses ({failed_count} failed)")
+        with self.lock:
+            self.preload['state'] = 'done'
+            self.preload['seconds'] = elapsed = round(time.time() - start, 1)
+            cached_count = self.preload['cached']
+            failed_count = self.preload['failed']
+        
+        if snapshot_path and cached_count:
+            self.save_snapshot(snapshot_path)
+        
+        print(f"✅ Pre-cached {cached_count} common responses ({failed_count} failed) in {elapsed}s")
         print(f"   Cache stats: {self.get_stats()}")
 
 
 # Global cache instance
 _global_cache: Optional[TTSCache] = None
+_global_cache_lock = threading.Lock()
 
 
-def get_cache(max_size: int = 1000) -> TTSCache:
+def create_tts_cache_from_env(max_size: Optional[int] = None) -> TTSCache:
+    """
+    Build a TTSCache from environment variables
+    
+    TTS_CACHE_SIZE: in-memory entries (default 1000)
+    TTS_CACHE_MAX_BYTES: in-memory audio bytes (default 67108864)
+    TTS_CACHE_DIR: directory for the on-disk tier, can be shared by workers (unset = memory only)
+    TTS_CACHE_DISK_MAX_BYTES: on-disk audio bytes (default 1073741824)
+    TTS_SYNTHESIS_TIMEOUT: seconds to wait on a shared synthesis (default 30)
+    TTS_SEGMENT_WORKERS: concurrent segment syntheses for segmented replies (default 4)
+    TTS_CACHE_SNAPSHOT: snapshot file loaded at startup (see TTSCache.save_snapshot)
+    TTS_CACHE_CODEC: compress entries ('zstd', 'lz4', 'deflate', 'flac', 'auto' = best available; unset = raw)
+    TTS_CACHE_COMPRESS_MIN_BYTES: smallest entry compressed (default 16384)
+    """
+    codec = os.getenv('TTS_CACHE_CODEC') or None
+    if codec == 'auto':
+        codec = default_codec()
+    cache = TTSCache(
+        max_size=max_size if max_size is not None else int(os.getenv('TTS_CACHE_SIZE', '1000')),
+        max_bytes=int(os.getenv('TTS_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+        disk_dir=os.getenv('TTS_CACHE_DIR') or None,
+        disk_max_bytes=int(os.getenv('TTS_CACHE_DISK_MAX_BYTES', str(1024 * 1024 * 1024))),
+        synthesis_timeout=float(os.getenv('TTS_SYNTHESIS_TIMEOUT', '30')),
+        segment_workers=int(os.getenv('TTS_SEGMENT_WORKERS', '4')),
+        codec=codec,
+        compress_min_bytes=int(os.getenv('TTS_CACHE_COMPRESS_MIN_BYTES', str(16 * 1024)))
+    )
+    snapshot_path = os.getenv('TTS_CACHE_SNAPSHOT')
+    if snapshot_path:
+        cache.load_snapshot(snapshot_path)
+    return cache
+
+
+def get_cache(max_size: Optional[int] = None) -> TTSCache:
     """
     Get or create global TTS cache instance
     
     Args:
-        max_size: Maximum cache size (only used on first call)
+        max_size: Maximum cache size (only used on first call; default TTS_CACHE_SIZE)
         
     Returns:
         Global TTSCache instance
     """
     global _global_cache
     if _global_cache is None:
-        _global_cache = TTSCache(max_size=max_size)
+        with _global_cache_lock:
+            if _global_cache is None:
+                _global_cache = create_tts_cache_from_env(max_size)
     return _global_cache
 
 
@@ -251,4 +1073,3 @@ def get_cache_stats() -> Dict:
     if _global_cache is None:
         return {'status': 'cache_not_initialized'}
     return _global_cache.get_stats()
-
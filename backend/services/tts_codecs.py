@@ -0,0 +1,136 @@
+"""
+TTS Codecs - Lossless compression for cached TTS audio
+Speech PCM compresses well, so the TTS cache can hold more phrases per byte
+at the cost of a decode on each hit. zstd and LZ4 are used when installed
+(zstd compresses better, LZ4 decodes faster), FLAC via soundfile, and zlib
+(stdlib) otherwise. All codecs are lossless: decode returns the exact bytes
+that were encoded (FLAC returns the same PCM, re-wrapped if it was WAV)
+"""
+
+import io
+import zlib
+from typing import Dict, List, Tuple
+
+# Try to import zstandard (optional: best ratio at fast decode)
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Try to import LZ4 (optional: fastest decode)
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+# Try to import soundfile (optional: FLAC, servable to clients as audio/flac)
+try:
+    import numpy as np
+    import soundfile
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+RAW = 'raw'
+
+# Stable ids for the on-disk and snapshot formats (never renumber)
+CODEC_IDS: Dict[str, int] = {
+    RAW: 0,
+    'deflate': 1,     # zlib stream = HTTP Content-Encoding: deflate
+    'zstd': 2,        # HTTP Content-Encoding: zstd
+    'lz4': 3,
+    'flac': 4,        # raw 16-bit mono PCM as FLAC
+    'flac/wav': 5     # 16-bit WAV as FLAC (decodes back to WAV)
+}
+CODEC_NAMES = {codec_id: name for name, codec_id in CODEC_IDS.items()}
+
+# Preference order when no codec is configured
+DEFAULT_CODECS = ('zstd', 'lz4', 'deflate')
+
+if ZSTD_AVAILABLE:
+    _zstd_compressor = zstandard.ZstdCompressor(level=9)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+
+
+def available_codecs() -> List[str]:
+    """Codecs usable in this process (choose with TTS_CACHE_CODEC)"""
+    codecs = ['deflate']
+    if ZSTD_AVAILABLE:
+        codecs.append('zstd')
+    if LZ4_AVAILABLE:
+        codecs.append('lz4')
+    if SOUNDFILE_AVAILABLE:
+        codecs.append('flac')
+    return codecs
+
+
+def default_codec() -> str:
+    """Best available general-purpose codec"""
+    available = available_codecs()
+    return next(codec for codec in DEFAULT_CODECS if codec in available)
+
+
+def encode_audio(audio, codec: str, sample_rate: int) -> Tuple[bytes, str]:
+    """
+    Compress audio bytes
+    
+    Args:
+        audio: Audio bytes (raw 16-bit mono PCM or WAV for 'flac')
+        codec: 'deflate', 'zstd', 'lz4' or 'flac'
+        sample_rate: Audio sample rate (used by 'flac' for raw PCM)
+    
+    Returns:
+        Tuple of (encoded_bytes, stored_codec); stored_codec can differ from
+        codec ('flac/wav' for WAV input)
+    
+    Raises:
+        ValueError: Unknown codec, or raw PCM of odd length for 'flac' (not
+            whole 16-bit samples: store it raw)
+    """
+    if codec == 'deflate':
+        return zlib.compress(audio, 6), codec
+    if codec == 'zstd':
+        return _zstd_compressor.compress(audio), codec
+    if codec == 'lz4':
+        return lz4.frame.compress(audio), codec
+    if codec == 'flac':
+        buffer = io.BytesIO()
+        if bytes(audio[:4]) == b'RIFF':
+            samples, sample_rate = soundfile.read(io.BytesIO(audio), dtype='int16')
+            codec = 'flac/wav'
+        elif len(audio) % 2:
+            raise ValueError(f"FLAC needs whole 16-bit samples, got {len(audio)} bytes of PCM")
+        else:
+            samples = np.frombuffer(audio, dtype='<i2')
+        soundfile.write(buffer, samples, sample_rate, format='FLAC', subtype='PCM_16')
+        return buffer.getvalue(), codec
+    raise ValueError(f"Unknown TTS cache codec: {codec}")
+
+
+def decode_audio(data, codec: str) -> bytes:
+    """
+    Decompress audio stored with encode_audio
+    
+    Args:
+        data: Encoded bytes (bytes or memoryview)
+        codec: Stored codec returned by encode_audio
+    
+    Returns:
+        Original audio bytes
+    """
+    if codec == 'deflate':
+        return zlib.decompress(data)
+    if codec == 'zstd':
+        return _zstd_decompressor.decompress(data)
+    if codec == 'lz4':
+        return lz4.frame.decompress(data)
+    if codec in ('flac', 'flac/wav'):
+        samples, sample_rate = soundfile.read(io.BytesIO(data), dtype='int16')
+        if codec == 'flac':
+            return samples.astype('<i2').tobytes()
+        buffer = io.BytesIO()
+        soundfile.write(buffer, samples, sample_rate, format='WAV', subtype='PCM_16')
+        return buffer.getvalue()
+    raise ValueError(f"Unknown TTS cache codec: {codec}")
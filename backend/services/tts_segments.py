@@ -0,0 +1,153 @@
+"""
+TTS Segments - Sentence-level splitting and PCM stitching for the TTS cache
+Replies are split into sentences (long ones into clauses) so each piece is
+cached on its own: a cached "I hear you" also serves "I hear you. Tell me
+more about that." Segment audio (WAV or raw 16-bit PCM) is decoded to mono
+samples, resampled to one rate and joined with short crossfades
+"""
+
+import io
+import re
+import wave
+from typing import List, Optional, Tuple
+
+# Try to import NumPy (required for stitching)
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Try to import resampy (optional: band-limited resampling instead of linear)
+try:
+    import resampy
+    RESAMPY_AVAILABLE = True
+except ImportError:
+    RESAMPY_AVAILABLE = False
+
+# Sentence ends: Latin punctuation followed by a space, or a danda (।/॥, used
+# in Hindi and Telugu text) with or without one
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+|(?<=[।॥])\s*')
+CLAUSE_BREAK = re.compile(r'(?<=[,;:])\s+')
+
+# Sentences longer than this are split further at clause breaks
+MAX_SEGMENT_CHARS = 120
+
+# Dropped from segment ends so "I hear you." shares the entry of "I hear you"
+# ('?' and '!' are kept: they change the intonation)
+TRAILING_STOPS = '.।॥,;: '
+
+
+def split_segments(text: str, max_chars: int = MAX_SEGMENT_CHARS) -> List[str]:
+    """
+    Split a reply into independently cacheable segments
+    
+    Args:
+        text: Reply text
+        max_chars: Sentences longer than this are split at commas/semicolons/colons
+    
+    Returns:
+        Segments in speaking order
+    """
+    segments = []
+    for sentence in SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip()
+        pieces = CLAUSE_BREAK.split(sentence) if len(sentence) > max_chars else [sentence]
+        for piece in pieces:
+            piece = piece.rstrip(TRAILING_STOPS).strip()
+            if any(ch.isalnum() for ch in piece):
+                segments.append(piece)
+    return segments
+
+
+def decode_pcm(audio) -> Tuple['np.ndarray', bool]:
+    """
+    Mono float32 samples in [-1, 1] from WAV or raw 16-bit little-endian PCM
+    
+    Args:
+        audio: Audio bytes as returned by the TTS engine
+    
+    Returns:
+        Tuple of (samples, was_wav)
+    """
+    if not NUMPY_AVAILABLE:
+        raise ImportError("numpy not installed. Install with: pip install numpy")
+    if bytes(audio[:4]) == b'RIFF':
+        with wave.open(io.BytesIO(audio)) as wav:
+            width = wav.getsampwidth()
+            channels = wav.getnchannels()
+            frames = wav.readframes(wav.getnframes())
+        if width != 2:
+            raise ValueError(f"Only 16-bit PCM WAV can be stitched (got {width * 8}-bit)")
+        samples = np.frombuffer(frames, dtype='<i2').astype(np.float32)
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        return samples / 32768.0, True
+    samples = np.frombuffer(audio, dtype='<i2', count=len(audio) // 2)
+    return samples.astype(np.float32) / 32768.0, False
+
+
+def encode_pcm(samples: 'np.ndarray') -> bytes:
+    """Raw 16-bit little-endian PCM from float samples (the inverse of decode_pcm)"""
+    return np.clip(np.round(samples * 32768.0), -32768, 32767).astype('<i2').tobytes()
+
+
+def encode_wav(pcm: bytes, sample_rate: int) -> bytes:
+    """Mono 16-bit WAV container around raw PCM"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def resample(samples: 'np.ndarray', from_rate: int, to_rate: int) -> 'np.ndarray':
+    """Resample mono samples (resampy if installed, else linear interpolation)"""
+    if from_rate == to_rate or not len(samples):
+        return samples
+    if RESAMPY_AVAILABLE:
+        return resampy.resample(samples, from_rate, to_rate).astype(np.float32)
+    count = max(1, round(len(samples) * to_rate / from_rate))
+    positions = np.linspace(0, len(samples) - 1, count)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+class SegmentStitcher:
+    """
+    Joins segment audio incrementally with linear crossfades
+    push() returns the samples that are final so they can be played while
+    later segments synthesize; the last crossfade_ms are held back to be
+    blended with the next segment (flush() releases them)
+    """
+    
+    def __init__(self, sample_rate: int, crossfade_ms: float = 15.0):
+        """
+        Initialize Segment Stitcher
+        
+        Args:
+            sample_rate: Output sample rate (segments are resampled to it)
+            crossfade_ms: Overlap between consecutive segments
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy not installed. Install with: pip install numpy")
+        self.sample_rate = sample_rate
+        self.fade = max(0, int(sample_rate * crossfade_ms / 1000))
+        self.tail: Optional['np.ndarray'] = None
+    
+    def push(self, samples: 'np.ndarray', sample_rate: int) -> 'np.ndarray':
+        samples = resample(samples, sample_rate, self.sample_rate)
+        if self.tail is not None and len(self.tail):
+            overlap = min(len(self.tail), len(samples))
+            ramp = np.linspace(0.0, 1.0, overlap, dtype=np.float32)
+            blended = self.tail[len(self.tail) - overlap:] * (1.0 - ramp) + samples[:overlap] * ramp
+            samples = np.concatenate((self.tail[:len(self.tail) - overlap], blended, samples[overlap:]))
+        split = max(0, len(samples) - self.fade)
+        self.tail = samples[split:]
+        return samples[:split]
+    
+    def flush(self) -> 'np.ndarray':
+        tail = self.tail if self.tail is not None else np.zeros(0, dtype=np.float32)
+        self.tail = None
+        return tail
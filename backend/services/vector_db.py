@@ -2,16 +2,24 @@
 Pinecone Vector Database Service
 Fast semantic memory storage and retrieval for Yudi conversations
 Replaces BigQuery RAG: 500ms → 10ms (50x faster)
+Storage is pluggable (see vector_store.py): Pinecone by default, or a local
+NumPy index with VECTOR_STORE_BACKEND=local
 """
 
+import math
 import os
+import re
+import threading
 import time
-from typing import List, Dict, Optional, Any
+import zlib
+from collections import OrderedDict
+from typing import List, Dict, Optional, Any, Tuple, Callable, Iterator
 from datetime import datetime
 
 # Try to import Pinecone
 try:
     from pinecone import Pinecone, ServerlessSpec
+    from pinecone.exceptions import NotFoundException
     PINECONE_AVAILABLE = True
 except ImportError:
     PINECONE_AVAILABLE = False
@@ -25,6 +33,41 @@ except ImportError:
     GEMINI_EMBEDDINGS_AVAILABLE = False
     print("Warning: google-generativeai not installed. Install with: pip install google-generativeai")
 
+from .embedding_cache import EmbeddingCache, create_embedding_cache_from_env
+from .vector_store import PineconeVectorStore, VectorStore, create_local_store_from_env
+from .recency_index import RecencyIndex
+
+# Gemini batchEmbedContents accepts at most 100 texts per request
+EMBEDDING_BATCH_SIZE = 100
+# Vectors per Pinecone upsert request (keeps requests well under the 2MB limit)
+UPSERT_BATCH_SIZE = 100
+
+# Namespace layouts: 'flat' = one shared namespace filtered by user_id (legacy),
+# 'user' = one namespace per user, 'shard' = users hashed into a fixed set of namespaces
+NAMESPACE_LAYOUTS = ('flat', 'user', 'shard')
+USER_NAMESPACE_PREFIX = 'user-'
+SHARD_NAMESPACE_PREFIX = 'shard-'
+
+# IDs per list request (Pinecone caps list pages at 100) and per delete request
+LIST_PAGE_SIZE = 100
+DELETE_BATCH_SIZE = 1000
+
+# What follows "<user_id>_" in IDs generated by _new_vector_id
+VECTOR_ID_SUFFIX = re.compile(r'^\d+$')
+
+# Timeline refreshes list IDs from this far before the previous listing (writes that
+# landed late, e.g. retried write-behind memories) up to this far past now (bumped IDs)
+RECENCY_RELIST_OVERLAP_MS = 10 * 60 * 1000
+RECENCY_RELIST_AHEAD_MS = 60 * 1000
+
+# Issued ID timestamps remembered per user, and users remembered (LRU), to keep IDs unique
+MAX_ISSUED_IDS_PER_USER = 10000
+MAX_ID_USERS = 10000
+
+# Readiness polling for newly created indexes (seconds)
+INDEX_READY_TIMEOUT = float(os.getenv('PINECONE_INDEX_READY_TIMEOUT', '120'))
+INDEX_READY_POLL_INTERVAL = 0.5
+
 
 class PineconeMemory:
     """
@@ -32,29 +75,56 @@ class PineconeMemory:
     Provides fast semantic search for emotional context and conversation history
     """
     
-    def __init__(self, index_name: str = 'yudi-memories', dimension: int = 768):
+    def __init__(
+        self,
+        index_name: str = 'yudi-memories',
+        dimension: int = 768,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        store: Optional[VectorStore] = None,
+        namespace_layout: Optional[str] = None,
+        namespace_shards: Optional[int] = None
+    ):
         """
         Initialize Pinecone Memory
         
         Args:
             index_name: Name of the Pinecone index
             dimension: Embedding dimension (768 for Gemini embedding-001)
+            embedding_cache: Cache for embeddings (default: built from EMBEDDING_CACHE_* env vars)
+            store: Vector store backend (default: chosen by VECTOR_STORE_BACKEND,
+                'pinecone' or 'local')
+            namespace_layout: 'flat', 'user' or 'shard' (default: MEMORY_NAMESPACE_LAYOUT or 'flat')
+            namespace_shards: Shard count for the 'shard' layout (default: MEMORY_NAMESPACE_SHARDS or 64)
         """
-        if not PINECONE_AVAILABLE:
-            raise ImportError("pinecone not installed. Install with: pip install pinecone")
-        
-        # Get API key from environment
-        api_key = os.getenv('PINECONE_API_KEY')
-        if not api_key:
-            raise ValueError("PINECONE_API_KEY environment variable not set")
-        
-        # Initialize Pinecone client
-        self.pc = Pinecone(api_key=api_key)
         self.index_name = index_name
         self.dimension = dimension
+        self.pc = None
+        self.index_host = None
         
-        # Get or create index
-        self.index = self._get_or_create_index()
+        self.namespace_layout = (namespace_layout or os.getenv('MEMORY_NAMESPACE_LAYOUT', 'flat')).lower()
+        if self.namespace_layout not in NAMESPACE_LAYOUTS:
+            raise ValueError(f"namespace_layout must be one of {NAMESPACE_LAYOUTS}")
+        self.namespace_shards = namespace_shards or int(os.getenv('MEMORY_NAMESPACE_SHARDS', '64'))
+        
+        if store is not None:
+            self.store = store
+        elif os.getenv('VECTOR_STORE_BACKEND', 'pinecone').lower() == 'local':
+            self.store = create_local_store_from_env(dimension)
+            print(f"✅ Using local vector store (dimension {dimension})")
+        else:
+            if not PINECONE_AVAILABLE:
+                raise ImportError("pinecone not installed. Install with: pip install pinecone")
+            
+            # Get API key from environment
+            api_key = os.getenv('PINECONE_API_KEY')
+            if not api_key:
+                raise ValueError("PINECONE_API_KEY environment variable not set")
+            
+            # Initialize Pinecone client
+            self.pc = Pinecone(api_key=api_key)
+            
+            # Get or create index
+            self.store = PineconeVectorStore(self._get_or_create_index())
         
         # Initialize Gemini for embeddings
         self.embedding_model = None
@@ -67,6 +137,44 @@ class PineconeMemory:
                 print("Warning: GEMINI_API_KEY not set. Embeddings will not work.")
         else:
             print("Warning: google-generativeai not available. Embeddings will not work.")
+        
+        # Repeated texts skip the embedding round-trip
+        self.embedding_cache = embedding_cache or create_embedding_cache_from_env()
+        
+        # Issued ID timestamps per user (keeps vector IDs unique)
+        self._id_lock = threading.Lock()
+        self._issued_ids: OrderedDict[str, OrderedDict] = OrderedDict()
+        
+        # Per-user time index for chronological listing (built from ID listings)
+        self.recency_index = RecencyIndex(
+            max_users=int(os.getenv('MEMORY_RECENCY_MAX_USERS', '10000')),
+            ttl=float(os.getenv('MEMORY_RECENCY_TTL', '300'))
+        )
+    
+    def _namespace_for(self, user_id: str, layout: Optional[str] = None) -> str:
+        """
+        Namespace holding a user's memories
+        
+        Args:
+            user_id: User identifier
+            layout: Namespace layout (default: this instance's layout)
+            
+        Returns:
+            Namespace name ('' for the flat layout)
+        """
+        layout = layout or self.namespace_layout
+        if layout == 'user':
+            return f"{USER_NAMESPACE_PREFIX}{user_id}"
+        if layout == 'shard':
+            shard = zlib.crc32(user_id.encode('utf-8')) % self.namespace_shards
+            return f"{SHARD_NAMESPACE_PREFIX}{shard:03d}"
+        return ''
+    
+    def _user_filter(self, user_id: str) -> Dict[str, Any]:
+        """Metadata filter selecting a user (unneeded when the namespace is the user)"""
+        if self.namespace_layout == 'user':
+            return {}
+        return {'user_id': user_id}
     
     def _get_or_create_index(self):
         """
@@ -76,11 +184,11 @@ class PineconeMemory:
             Pinecone Index instance
         """
         try:
-            # Check if index exists
-            if self.index_name in self.pc.list_indexes().names():
+            # One describe call instead of listing every index in the project
+            try:
+                description = self.pc.describe_index(self.index_name)
                 print(f"✅ Using existing Pinecone index: {self.index_name}")
-                return self.pc.Index(self.index_name)
-            else:
+            except NotFoundException:
                 # Create new index
                 print(f"📦 Creating new Pinecone index: {self.index_name}")
                 self.pc.create_index(
@@ -90,15 +198,39 @@ class PineconeMemory:
                     spec=ServerlessSpec(
                         cloud='aws',
                         region='us-east-1'
-                    )
+                    ),
+                    timeout=-1
                 )
-                # Wait for index to be ready
-                time.sleep(2)
-                return self.pc.Index(self.index_name)
+                description = self._wait_for_index_ready()
+            self.index_host = description.host
+            return self.pc.Index(host=description.host)
         except Exception as e:
             print(f"⚠️  Error accessing Pinecone index: {str(e)}")
             raise
     
+    def _wait_for_index_ready(self, timeout: float = INDEX_READY_TIMEOUT):
+        """
+        Poll a newly created index until it reports ready
+        
+        Args:
+            timeout: Maximum seconds to wait
+            
+        Returns:
+            Index description of the ready index
+        """
+        deadline = time.monotonic() + timeout
+        interval = INDEX_READY_POLL_INTERVAL
+        while True:
+            description = self.pc.describe_index(self.index_name)
+            status = description.status
+            ready = status.get('ready') if isinstance(status, dict) else getattr(status, 'ready', False)
+            if ready and description.host:
+                return description
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Pinecone index {self.index_name} not ready after {timeout:.0f}s")
+            time.sleep(interval)
+            interval = min(interval * 2, 5.0)
+    
     def _get_embedding(self, text: str, task_type: str = "retrieval_document") -> List[float]:
         """
         Generate embedding for text using Gemini Embeddings API
@@ -113,6 +245,10 @@ class PineconeMemory:
         if not self.embedding_model:
             raise RuntimeError("Embedding model not configured. Set GEMINI_API_KEY.")
         
+        cached = self.embedding_cache.get(text, self.embedding_model, task_type)
+        if cached is not None:
+            return cached
+        
         try:
             # Use Gemini Embeddings API
             result = genai.embed_content(
@@ -122,12 +258,205 @@ class PineconeMemory:
             )
             # Handle both dict and object response formats
             if isinstance(result, dict):
-                return result.get('embedding', result.get('values', []))
+                embedding = result.get('embedding', result.get('values', []))
             else:
                 # If result is an object with embedding attribute
-                return getattr(result, 'embedding', getattr(result, 'values', []))
+                embedding = getattr(result, 'embedding', getattr(result, 'values', []))
         except Exception as e:
             raise RuntimeError(f"Failed to generate embedding: {str(e)}")
+        
+        if embedding:
+            self.embedding_cache.set(text, self.embedding_model, task_type, embedding)
+        return embedding
+    
+    def _get_embeddings(
+        self,
+        texts: List[str],
+        task_type: str = "retrieval_document"
+    ) -> Tuple[List[Optional[List[float]]], Dict[int, str]]:
+        """
+        Generate embeddings for many texts using batched Gemini Embeddings API calls
+        
+        Cached texts are served from the embedding cache; the rest are sent in
+        batches of EMBEDDING_BATCH_SIZE (duplicates are embedded once).
+        
+        Args:
+            texts: Texts to generate embeddings for
+            task_type: "retrieval_document" (for storing) or "retrieval_query" (for searching)
+            
+        Returns:
+            Tuple of (embeddings aligned with texts, None where failed;
+            {text index: error message} for failures)
+        """
+        if not self.embedding_model:
+            raise RuntimeError("Embedding model not configured. Set GEMINI_API_KEY.")
+        
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        errors: Dict[int, str] = {}
+        
+        # Group indexes by text so duplicates cost one embedding
+        pending: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            cached = self.embedding_cache.get(text, self.embedding_model, task_type)
+            if cached is not None:
+                embeddings[i] = cached
+            else:
+                pending.setdefault(text, []).append(i)
+        
+        pending_texts = list(pending.keys())
+        for start in range(0, len(pending_texts), EMBEDDING_BATCH_SIZE):
+            batch = pending_texts[start:start + EMBEDDING_BATCH_SIZE]
+            try:
+                result = genai.embed_content(
+                    model=self.embedding_model,
+                    content=batch,
+                    task_type=task_type
+                )
+                if isinstance(result, dict):
+                    vectors = result.get('embedding', [])
+                else:
+                    vectors = getattr(result, 'embedding', [])
+                if len(vectors) != len(batch):
+                    raise RuntimeError(f"expected {len(batch)} embeddings, got {len(vectors)}")
+            except Exception as e:
+                for text in batch:
+                    for i in pending[text]:
+                        errors[i] = f"Failed to generate embedding: {str(e)}"
+                continue
+            
+            for text, embedding in zip(batch, vectors):
+                self.embedding_cache.set(text, self.embedding_model, task_type, embedding)
+                for i in pending[text]:
+                    embeddings[i] = embedding
+        
+        return embeddings, errors
+    
+    def _new_vector_id(self, user_id: str, timestamp_ms: Optional[int] = None) -> str:
+        """
+        Generate a unique, time-sortable vector ID: "<user_id>_<epoch ms>"
+        
+        Milliseconds are bumped past every ID already issued to the user
+        (bulk imports, fast consecutive stores, out-of-order timestamps).
+        
+        Args:
+            user_id: User identifier
+            timestamp_ms: Memory time in epoch milliseconds (default: now)
+            
+        Returns:
+            Vector ID
+        """
+        if timestamp_ms is None:
+            timestamp_ms = int(time.time() * 1000)
+        with self._id_lock:
+            issued = self._issued(user_id)
+            while timestamp_ms in issued:
+                timestamp_ms += 1
+            self._mark_issued(issued, timestamp_ms)
+        return f"{user_id}_{timestamp_ms}"
+    
+    def _issued(self, user_id: str) -> OrderedDict:
+        """A user's issued ID timestamps, least recently used users evicted (caller holds _id_lock)"""
+        issued = self._issued_ids.get(user_id)
+        if issued is None:
+            issued = self._issued_ids[user_id] = OrderedDict()
+            while len(self._issued_ids) > MAX_ID_USERS:
+                self._issued_ids.popitem(last=False)
+        else:
+            self._issued_ids.move_to_end(user_id)
+        return issued
+    
+    @staticmethod
+    def _mark_issued(issued: OrderedDict, timestamp_ms: int) -> None:
+        issued[timestamp_ms] = None
+        if len(issued) > MAX_ISSUED_IDS_PER_USER:
+            issued.popitem(last=False)
+    
+    def _reserve_vector_id(self, user_id: str, vector_id: str) -> None:
+        """Mark a caller-supplied ID as taken so generated IDs never reuse it"""
+        timestamp_ms = self._timestamp_from_vector_id(user_id, vector_id)
+        if timestamp_ms is None:
+            return
+        with self._id_lock:
+            self._mark_issued(self._issued(user_id), timestamp_ms)
+    
+    def new_memory_id(self, user_id: str, timestamp: Optional[float] = None) -> str:
+        """
+        Reserve a memory ID ahead of storage (write-behind queue returns it immediately)
+        
+        Args:
+            user_id: User identifier
+            timestamp: Memory time in epoch seconds (default: now)
+        
+        Returns:
+            Vector ID to pass as 'memory_id' to store_conversations_bulk
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        return self._new_vector_id(user_id, int(timestamp * 1000))
+    
+    @staticmethod
+    def validate_memory(
+        user_id: Any,
+        user_message: Any,
+        yudi_response: Any,
+        emotion: Any = None,
+        metadata: Any = None
+    ) -> None:
+        """
+        Check a memory's fields before it is stored or queued for storage
+        
+        Raises:
+            ValueError: Naming the first invalid field (the memory can never be stored)
+        """
+        if not user_id or not isinstance(user_id, str):
+            raise ValueError('user_id is required')
+        if (
+            not isinstance(user_message, str) or not isinstance(yudi_response, str)
+            or not user_message.strip() or not yudi_response.strip()
+        ):
+            raise ValueError('user_message and yudi_response are required')
+        if emotion is not None and not isinstance(emotion, str):
+            raise ValueError('emotion must be a string')
+        if metadata is None:
+            return
+        if not isinstance(metadata, dict):
+            raise ValueError('metadata must be an object')
+        for key, value in metadata.items():
+            # Pinecone metadata values: string, number, boolean or list of strings
+            if isinstance(value, (str, int, float, bool)):
+                continue
+            if isinstance(value, list) and all(isinstance(v, str) for v in value):
+                continue
+            raise ValueError(f'metadata.{key} must be a string, number, boolean or list of strings')
+    
+    def _build_metadata(
+        self,
+        user_id: str,
+        user_message: str,
+        yudi_response: str,
+        emotion: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        timestamp: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Build the Pinecone metadata stored with a memory"""
+        if timestamp is None:
+            timestamp = time.time()
+        
+        vector_metadata = {
+            'user_id': user_id,
+            'user_message': user_message,
+            'yudi_response': yudi_response,
+            'timestamp': int(timestamp),
+            'datetime': datetime.utcfromtimestamp(timestamp).isoformat()
+        }
+        
+        if emotion:
+            vector_metadata['emotion'] = emotion
+        
+        if metadata:
+            vector_metadata.update(metadata)
+        
+        return vector_metadata
     
     def store_conversation(
         self,
@@ -149,7 +478,12 @@ class PineconeMemory:
             
         Returns:
             Vector ID (unique identifier for this memory)
+        
+        Raises:
+            ValueError: If a field is invalid (see validate_memory)
         """
+        self.validate_memory(user_id, user_message, yudi_response, emotion, metadata)
+        
         # Create combined text for embedding (includes user message and response)
         combined_text = f"{user_message} {yudi_response}"
         
@@ -157,35 +491,132 @@ class PineconeMemory:
         embedding = self._get_embedding(combined_text)
         
         # Generate unique vector ID
-        vector_id = f"{user_id}_{int(time.time() * 1000)}"
+        now = time.time()
+        vector_id = self._new_vector_id(user_id, int(now * 1000))
         
         # Prepare metadata
-        vector_metadata = {
-            'user_id': user_id,
-            'user_message': user_message,
-            'yudi_response': yudi_response,
-            'timestamp': int(time.time()),
-            'datetime': datetime.utcnow().isoformat()
-        }
-        
-        if emotion:
-            vector_metadata['emotion'] = emotion
-        
-        if metadata:
-            vector_metadata.update(metadata)
+        vector_metadata = self._build_metadata(
+            user_id, user_message, yudi_response, emotion, metadata, timestamp=now
+        )
         
         # Store in Pinecone
         try:
-            self.index.upsert(vectors=[{
+            self.store.upsert(vectors=[{
                 'id': vector_id,
                 'values': embedding,
                 'metadata': vector_metadata
-            }])
+            }], namespace=self._namespace_for(user_id))
+            self.recency_index.add(user_id, vector_id, int(now * 1000))
             print(f"✅ Stored memory: {vector_id} for user {user_id}")
             return vector_id
         except Exception as e:
             raise RuntimeError(f"Failed to store in Pinecone: {str(e)}")
     
+    def store_conversations_bulk(self, conversations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Store many conversations with batched embeddings and chunked upserts
+        
+        Each item takes the store_conversation fields (user_id, user_message,
+        yudi_response, emotion, metadata) plus optional 'timestamp' (epoch seconds,
+        kept for imported history) and 'memory_id' (re-indexing overwrites in place;
+        must be a "<user_id>_<epoch ms>" ID such as new_memory_id returns).
+        
+        Args:
+            conversations: List of conversation dictionaries
+            
+        Returns:
+            {
+                'succeeded': [{'index': int, 'memory_id': str}, ...],
+                'failed': [{'index': int, 'error': str, 'retryable': bool}, ...]
+            }
+            (retryable is False for invalid items, which fail on every attempt)
+        """
+        succeeded: List[Dict[str, Any]] = []
+        failed: List[Dict[str, Any]] = []
+        
+        # Validate and prepare items
+        prepared = []  # (index, vector_id, combined_text, metadata)
+        batch_ids = set()
+        for i, item in enumerate(conversations):
+            if not isinstance(item, dict):
+                failed.append({'index': i, 'error': 'item must be an object', 'retryable': False})
+                continue
+            user_id = item.get('user_id')
+            metadata = item.get('metadata')
+            try:
+                self.validate_memory(
+                    user_id, item.get('user_message'), item.get('yudi_response'), item.get('emotion'), metadata
+                )
+            except ValueError as e:
+                failed.append({'index': i, 'error': str(e), 'retryable': False})
+                continue
+            user_message = item['user_message'].strip()
+            yudi_response = item['yudi_response'].strip()
+            
+            timestamp = item.get('timestamp')
+            try:
+                timestamp = float(timestamp) if timestamp is not None else time.time()
+            except (TypeError, ValueError):
+                failed.append({'index': i, 'error': 'timestamp must be epoch seconds', 'retryable': False})
+                continue
+            
+            vector_id = item.get('memory_id')
+            if vector_id:
+                if not isinstance(vector_id, str) or self._timestamp_from_vector_id(user_id, vector_id) is None:
+                    failed.append({
+                        'index': i,
+                        'error': f'memory_id must look like "{user_id}_<epoch ms>"',
+                        'retryable': False
+                    })
+                    continue
+                if vector_id in batch_ids:
+                    failed.append({'index': i, 'error': 'duplicate memory_id in batch', 'retryable': False})
+                    continue
+                self._reserve_vector_id(user_id, vector_id)
+            else:
+                vector_id = self._new_vector_id(user_id, int(timestamp * 1000))
+            batch_ids.add(vector_id)
+            vector_metadata = self._build_metadata(
+                user_id, user_message, yudi_response,
+                item.get('emotion'), metadata, timestamp=timestamp
+            )
+            prepared.append((i, vector_id, f"{user_message} {yudi_response}", vector_metadata))
+        
+        if not prepared:
+            return {'succeeded': succeeded, 'failed': failed}
+        
+        # Batched embeddings
+        embeddings, embed_errors = self._get_embeddings([p[2] for p in prepared])
+        
+        vectors_by_namespace: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}  # namespace -> (index, vector)
+        for pos, ((i, vector_id, _, vector_metadata), embedding) in enumerate(zip(prepared, embeddings)):
+            if pos in embed_errors or not embedding:
+                failed.append({'index': i, 'error': embed_errors.get(pos, 'Empty embedding'), 'retryable': True})
+                continue
+            namespace = self._namespace_for(vector_metadata['user_id'])
+            vectors_by_namespace.setdefault(namespace, []).append(
+                (i, {'id': vector_id, 'values': embedding, 'metadata': vector_metadata})
+            )
+        
+        # Chunked upserts (one namespace per request)
+        for namespace, vectors in vectors_by_namespace.items():
+            for start in range(0, len(vectors), UPSERT_BATCH_SIZE):
+                chunk = vectors[start:start + UPSERT_BATCH_SIZE]
+                try:
+                    self.store.upsert(vectors=[v for _, v in chunk], namespace=namespace)
+                    succeeded.extend({'index': i, 'memory_id': v['id']} for i, v in chunk)
+                    for _, v in chunk:
+                        self._record_recency(v['metadata']['user_id'], v['id'])
+                except Exception as e:
+                    failed.extend(
+                        {'index': i, 'error': f"Failed to store in Pinecone: {str(e)}", 'retryable': True}
+                        for i, _ in chunk
+                    )
+        
+        failed.sort(key=lambda f: f['index'])
+        print(f"✅ Bulk stored {len(succeeded)} memories ({len(failed)} failed)")
+        return {'succeeded': succeeded, 'failed': failed}
+    
     def retrieve_memories(
         self,
         user_id: str,
@@ -211,22 +642,22 @@ class PineconeMemory:
         query_embedding = self._get_embedding(query_text, task_type="retrieval_query")
         
         # Prepare filter
-        filter_dict = {'user_id': user_id}
+        filter_dict = self._user_filter(user_id)
         if emotion_filter:
             filter_dict['emotion'] = emotion_filter
         
         try:
             # Query Pinecone
-            results = self.index.query(
+            matches = self.store.query(
                 vector=query_embedding,
                 top_k=top_k,
-                include_metadata=True,
-                filter=filter_dict
+                filter=filter_dict or None,
+                namespace=self._namespace_for(user_id)
             )
             
             # Format results
             memories = []
-            for match in results.matches:
+            for match in matches:
                 if match.score >= min_score:
                     memory = {
                         'id': match.id,
@@ -245,65 +676,247 @@ class PineconeMemory:
         except Exception as e:
             raise RuntimeError(f"Failed to query Pinecone: {str(e)}")
     
+    def _timestamp_from_vector_id(self, user_id: str, vector_id: str) -> Optional[int]:
+        """Epoch ms encoded in a "<user_id>_<ms>" vector ID (None for other ID formats)"""
+        if not vector_id.startswith(f"{user_id}_"):
+            return None
+        suffix = vector_id[len(user_id) + 1:]
+        return int(suffix) if VECTOR_ID_SUFFIX.match(suffix) else None
+    
+    def _record_recency(self, user_id: str, vector_id: str) -> None:
+        timestamp_ms = self._timestamp_from_vector_id(user_id, vector_id)
+        if timestamp_ms is not None:
+            self.recency_index.add(user_id, vector_id, timestamp_ms)
+    
+    def _load_timeline(self, user_id: str) -> None:
+        """
+        Build a user's time index from an ID listing, or refresh it
+        
+        The first load lists all of the user's IDs. Later refreshes only list
+        IDs whose "<epoch ms>" suffix shares the digits of the window since the
+        previous listing, so their cost follows new writes, not total history.
+        """
+        listed_ms = int(time.time() * 1000)
+        since_ms = self.recency_index.listed_until(user_id)
+        id_prefix = ''
+        if since_ms is not None:
+            since_ms -= RECENCY_RELIST_OVERLAP_MS
+            id_prefix = _common_prefix(str(since_ms), str(listed_ms + RECENCY_RELIST_AHEAD_MS))
+        
+        entries = []
+        for ids in self.iter_user_vector_ids(user_id, id_prefix=id_prefix):
+            for vector_id in ids:
+                timestamp_ms = self._timestamp_from_vector_id(user_id, vector_id)
+                if timestamp_ms is not None and (since_ms is None or timestamp_ms > since_ms):
+                    entries.append((timestamp_ms, vector_id))
+        
+        if since_ms is None:
+            self.recency_index.load(user_id, entries, listed_ms)
+        else:
+            self.recency_index.merge(user_id, entries, listed_ms)
+    
+    def list_user_memories(
+        self,
+        user_id: str,
+        before: Optional[float] = None,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        List a user's memories newest first with cursor pagination
+        
+        Args:
+            user_id: User identifier
+            before: Cursor - only memories older than this (epoch ms as returned in
+                next_before; epoch seconds are accepted too)
+            limit: Maximum memories to return
+            
+        Returns:
+            {'memories': [...], 'next_before': cursor for the next page or None}
+            
+        Raises:
+            ValueError: If before is not a number
+        """
+        before_ms = None
+        if before is not None:
+            try:
+                before = float(before)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid cursor 'before': {before!r} (expected epoch ms)")
+            if not math.isfinite(before):
+                raise ValueError(f"Invalid cursor 'before': {before!r} (expected epoch ms)")
+            # Values this small are epoch seconds (memory 'timestamp' field)
+            before_ms = int(before * 1000) if before < 1e11 else int(before)
+        
+        try:
+            if not self.recency_index.is_fresh(user_id):
+                self._load_timeline(user_id)
+            
+            entries, has_more = self.recency_index.page(user_id, before_ms=before_ms, limit=limit)
+            vectors = self.store.fetch([vector_id for _, vector_id in entries], namespace=self._namespace_for(user_id))
+        except Exception as e:
+            raise RuntimeError(f"Failed to list user memories: {str(e)}")
+        
+        missing = [vector_id for _, vector_id in entries if vector_id not in vectors]
+        if missing:
+            # Deleted by another worker since the index was loaded
+            self.recency_index.remove(user_id, missing)
+        
+        memories = []
+        for _, vector_id in entries:
+            vector = vectors.get(vector_id)
+            if vector is None:
+                continue
+            metadata = vector['metadata']
+            memories.append({
+                'id': vector_id,
+                'user_message': metadata.get('user_message', ''),
+                'yudi_response': metadata.get('yudi_response', ''),
+                'emotion': metadata.get('emotion'),
+                'timestamp': metadata.get('timestamp'),
+                'datetime': metadata.get('datetime')
+            })
+        
+        next_before = entries[-1][0] if entries and has_more else None
+        return {'memories': memories, 'next_before': next_before}
+    
     def get_user_memories(
         self,
         user_id: str,
         limit: int = 100
     ) -> List[Dict[str, Any]]:
         """
-        Get all memories for a user (no semantic search, just by user_id)
+        Get a user's most recent memories (no semantic search, just by user_id)
         
         Args:
             user_id: User identifier
             limit: Maximum number of memories to return
             
         Returns:
-            List of memories
+            List of memories, newest first
         """
         try:
-            # Query with user_id filter only
-            results = self.index.query(
-                vector=[0.0] * self.dimension,  # Dummy vector for metadata-only query
-                top_k=limit,
-                include_metadata=True,
-                filter={'user_id': user_id}
-            )
-            
-            memories = []
-            for match in results.matches:
-                memory = {
-                    'id': match.id,
-                    'user_message': match.metadata.get('user_message', ''),
-                    'yudi_response': match.metadata.get('yudi_response', ''),
-                    'emotion': match.metadata.get('emotion'),
-                    'timestamp': match.metadata.get('timestamp'),
-                    'datetime': match.metadata.get('datetime')
-                }
-                memories.append(memory)
-            
-            return memories
-        
+            return self.list_user_memories(user_id, limit=limit)['memories']
         except Exception as e:
             raise RuntimeError(f"Failed to get user memories: {str(e)}")
     
-    def delete_memory(self, vector_id: str) -> bool:
+    def delete_memory(self, vector_id: str, user_id: Optional[str] = None) -> bool:
         """
         Delete a specific memory by vector ID
         
         Args:
             vector_id: Vector ID to delete
+            user_id: Owner of the memory (default: parsed from "<user_id>_<ms>" IDs)
             
         Returns:
             True if successful
         """
+        if user_id is None:
+            user_id = vector_id.rsplit('_', 1)[0]
         try:
-            self.index.delete(ids=[vector_id])
+            self.store.delete(ids=[vector_id], namespace=self._namespace_for(user_id))
+            self.recency_index.remove(user_id, [vector_id])
             print(f"✅ Deleted memory: {vector_id}")
             return True
         except Exception as e:
             print(f"❌ Failed to delete memory: {str(e)}")
             return False
     
+    def _owns_vector_id(self, user_id: str, vector_id: str) -> bool:
+        """
+        Whether a listed ID belongs to user_id (prefix listing for "abc_" also
+        returns IDs of a user named "abc_def")
+        """
+        return bool(VECTOR_ID_SUFFIX.match(vector_id[len(user_id) + 1:]))
+    
+    def iter_user_vector_ids(
+        self,
+        user_id: str,
+        page_size: int = LIST_PAGE_SIZE,
+        id_prefix: str = ''
+    ) -> Iterator[List[str]]:
+        """
+        Page through a user's vector IDs without a similarity query
+        
+        Args:
+            user_id: User identifier
+            page_size: IDs per list request
+            id_prefix: Only IDs whose part after "<user_id>_" starts with this
+            
+        Yields:
+            Lists of vector IDs
+        """
+        namespace = self._namespace_for(user_id)
+        prefix = None if self.namespace_layout == 'user' and not id_prefix else f"{user_id}_{id_prefix}"
+        token = None
+        while True:
+            ids, token = self.store.list_ids(
+                prefix=prefix, namespace=namespace, limit=page_size, pagination_token=token
+            )
+            if prefix is not None:
+                ids = [vector_id for vector_id in ids if self._owns_vector_id(user_id, vector_id)]
+            if ids:
+                yield ids
+            if not token:
+                return
+    
+    def delete_user_memories_paged(
+        self,
+        user_id: str,
+        chunk_size: int = DELETE_BATCH_SIZE,
+        progress_callback: Optional[Callable[[int], None]] = None
+    ) -> int:
+        """
+        Delete every memory of a user by listing IDs and deleting in bounded chunks
+        
+        Safe to re-run after a failure: already deleted IDs are no longer listed.
+        
+        Args:
+            user_id: User identifier
+            chunk_size: Maximum IDs per delete request
+            progress_callback: Called with the running deleted count after each chunk
+            
+        Returns:
+            Number of memories deleted
+            
+        Raises:
+            RuntimeError: If listing or deleting fails (deleted count so far is reported
+                through progress_callback)
+        """
+        namespace = self._namespace_for(user_id)
+        self.recency_index.drop_user(user_id)
+        
+        # One namespace per user: drop the whole namespace in one call
+        if self.namespace_layout == 'user':
+            try:
+                count = self.store.describe_stats().get('namespaces', {}).get(namespace, 0)
+                self.store.delete_namespace(namespace)
+            except Exception as e:
+                raise RuntimeError(f"Failed to delete namespace {namespace}: {str(e)}")
+            if progress_callback:
+                progress_callback(count)
+            return count
+        
+        deleted = 0
+        pending: List[str] = []
+        try:
+            for ids in self.iter_user_vector_ids(user_id):
+                pending.extend(ids)
+                while len(pending) >= chunk_size:
+                    self.store.delete(ids=pending[:chunk_size], namespace=namespace)
+                    deleted += len(pending[:chunk_size])
+                    pending = pending[chunk_size:]
+                    if progress_callback:
+                        progress_callback(deleted)
+            if pending:
+                self.store.delete(ids=pending, namespace=namespace)
+                deleted += len(pending)
+                if progress_callback:
+                    progress_callback(deleted)
+        except Exception as e:
+            raise RuntimeError(f"Failed to delete memories for user {user_id} after {deleted}: {str(e)}")
+        
+        return deleted
+    
     def delete_user_memories(self, user_id: str) -> int:
         """
         Delete all memories for a user
@@ -315,22 +928,97 @@ class PineconeMemory:
             Number of memories deleted
         """
         try:
-            # Get all memories for user
-            memories = self.get_user_memories(user_id, limit=10000)
-            
-            if not memories:
-                return 0
-            
-            # Delete all vector IDs
-            vector_ids = [m['id'] for m in memories]
-            self.index.delete(ids=vector_ids)
-            print(f"✅ Deleted {len(vector_ids)} memories for user {user_id}")
-            return len(vector_ids)
+            deleted = self.delete_user_memories_paged(user_id)
+            print(f"✅ Deleted {deleted} memories for user {user_id}")
+            return deleted
         
         except Exception as e:
             print(f"❌ Failed to delete user memories: {str(e)}")
             return 0
     
+    def count_user_memories(self, user_id: str) -> Optional[int]:
+        """
+        Number of memories stored for a user (needs the 'user' namespace layout)
+        
+        Args:
+            user_id: User identifier
+            
+        Returns:
+            Vector count from namespace stats, or None for shared-namespace layouts
+        """
+        if self.namespace_layout != 'user':
+            return None
+        namespaces = self.store.describe_stats().get('namespaces', {})
+        return namespaces.get(self._namespace_for(user_id), 0)
+    
+    def migrate_namespaces(self, source_layout: str = 'flat', page_size: int = 100) -> Dict[str, int]:
+        """
+        Move vectors written under another namespace layout into this instance's layout
+        
+        Pages through every source namespace, fetches vectors, upserts them into
+        each owner's target namespace and deletes the originals. Safe to re-run:
+        vectors already in place are skipped and moved vectors are gone from the source.
+        
+        Args:
+            source_layout: Layout the existing vectors were written with
+            page_size: IDs listed, fetched and moved per round-trip
+            
+        Returns:
+            {'moved': int, 'skipped': int, 'failed': int}
+        """
+        if source_layout not in NAMESPACE_LAYOUTS:
+            raise ValueError(f"source_layout must be one of {NAMESPACE_LAYOUTS}")
+        
+        counts = {'moved': 0, 'skipped': 0, 'failed': 0}
+        if source_layout == self.namespace_layout:
+            return counts
+        
+        if source_layout == 'flat':
+            source_namespaces = ['']
+        else:
+            prefix = USER_NAMESPACE_PREFIX if source_layout == 'user' else SHARD_NAMESPACE_PREFIX
+            source_namespaces = [
+                name for name in self.store.describe_stats().get('namespaces', {})
+                if name.startswith(prefix)
+            ]
+        
+        for source_namespace in source_namespaces:
+            token = None
+            while True:
+                ids, token = self.store.list_ids(namespace=source_namespace, limit=page_size, pagination_token=token)
+                if not ids:
+                    break
+                
+                vectors = self.store.fetch(ids, namespace=source_namespace)
+                by_target: Dict[str, List[Dict[str, Any]]] = {}
+                for vector_id, vector in vectors.items():
+                    user_id = vector['metadata'].get('user_id')
+                    if not user_id:
+                        counts['skipped'] += 1
+                        continue
+                    target_namespace = self._namespace_for(str(user_id))
+                    if target_namespace == source_namespace:
+                        counts['skipped'] += 1
+                        continue
+                    by_target.setdefault(target_namespace, []).append({
+                        'id': vector_id, 'values': vector['values'], 'metadata': vector['metadata']
+                    })
+                
+                for target_namespace, moved in by_target.items():
+                    try:
+                        self.store.upsert(vectors=moved, namespace=target_namespace)
+                        self.store.delete(ids=[v['id'] for v in moved], namespace=source_namespace)
+                        counts['moved'] += len(moved)
+                    except Exception as e:
+                        print(f"❌ Failed to move {len(moved)} vectors to '{target_namespace}': {str(e)}")
+                        counts['failed'] += len(moved)
+                
+                if not token:
+                    break
+        
+        print(f"✅ Namespace migration {source_layout} → {self.namespace_layout}: {counts}")
+        return counts
+    
     def get_stats(self) -> Dict[str, Any]:
         """
         Get statistics about the Pinecone index
@@ -339,15 +1027,38 @@ class PineconeMemory:
             Dictionary with index statistics
         """
         try:
-            stats = self.index.describe_index_stats()
-            return {
+            stats = self.store.describe_stats()
+            namespaces = stats.get('namespaces', {})
+            result = {
                 'index_name': self.index_name,
                 'dimension': self.dimension,
-                'total_vectors': stats.total_vector_count if hasattr(stats, 'total_vector_count') else 0,
-                'namespaces': stats.namespaces if hasattr(stats, 'namespaces') else {}
+                'backend': stats.get('backend', 'pinecone'),
+                'namespace_layout': self.namespace_layout,
+                'total_vectors': stats.get('total_vector_count', 0),
+                'namespaces': namespaces,
+                'embedding_cache': self.embedding_cache.get_stats(),
+                'recency_index': self.recency_index.get_stats()
             }
+            if self.namespace_layout == 'user':
+                # Per-user counts straight from namespace stats
+                result['users'] = {
+                    name[len(USER_NAMESPACE_PREFIX):]: count
+                    for name, count in namespaces.items()
+                    if name.startswith(USER_NAMESPACE_PREFIX)
+                }
+            return result
         except Exception as e:
-            return {'error': str(e)}
+            return {'error': str(e), 'embedding_cache': self.embedding_cache.get_stats()}
+
+
+def _common_prefix(low: str, high: str) -> str:
+    """Longest common prefix of two equal-length digit strings ('' otherwise)"""
+    if len(low) != len(high):
+        return ''
+    for i, (a, b) in enumerate(zip(low, high)):
+        if a != b:
+            return low[:i]
+    return low
 
 
 # Global instance
@@ -0,0 +1,215 @@
+"""
+Vector Store Interface - Storage backends behind PineconeMemory
+PineconeVectorStore wraps a Pinecone index; LocalVectorStore (local_vector_store.py)
+keeps vectors in-process for single-node deployments and load tests
+"""
+
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+
+class VectorMatch(NamedTuple):
+    """One query result (same fields as a Pinecone match)"""
+    id: str
+    score: float
+    metadata: Dict[str, Any]
+
+
+class VectorStore:
+    """
+    Minimal vector store interface used by PineconeMemory
+    All methods take a namespace ('' = default namespace)
+    """
+    
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = '') -> None:
+        """
+        Insert or overwrite vectors
+        
+        Args:
+            vectors: List of {'id': str, 'values': List[float], 'metadata': dict}
+            namespace: Target namespace
+        """
+        raise NotImplementedError
+    
+    def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        filter: Optional[Dict[str, Any]] = None,
+        namespace: str = ''
+    ) -> List[VectorMatch]:
+        """
+        Cosine top-k search
+        
+        Args:
+            vector: Query vector
+            top_k: Number of results to return
+            filter: Metadata equality filter (Pinecone filter syntax)
+            namespace: Namespace to search
+        
+        Returns:
+            Matches ordered by descending score (metadata included)
+        """
+        raise NotImplementedError
+    
+    def fetch(self, ids: List[str], namespace: str = '') -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch vectors by ID
+        
+        Args:
+            ids: Vector IDs
+            namespace: Namespace to read from
+        
+        Returns:
+            {id: {'values': List[float], 'metadata': dict}} for IDs that exist
+        """
+        raise NotImplementedError
+    
+    def delete(self, ids: List[str], namespace: str = '') -> None:
+        """
+        Delete vectors by ID (missing IDs are ignored)
+        
+        Args:
+            ids: Vector IDs
+            namespace: Namespace to delete from
+        """
+        raise NotImplementedError
+    
+    def delete_namespace(self, namespace: str) -> None:
+        """
+        Delete every vector in a namespace
+        
+        Args:
+            namespace: Namespace to clear
+        """
+        raise NotImplementedError
+    
+    def list_ids(
+        self,
+        prefix: Optional[str] = None,
+        namespace: str = '',
+        limit: int = 100,
+        pagination_token: Optional[str] = None
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        List vector IDs page by page
+        
+        Args:
+            prefix: Only IDs starting with this prefix
+            namespace: Namespace to list
+            limit: Maximum IDs per page
+            pagination_token: Token returned by the previous page
+        
+        Returns:
+            Tuple of (IDs, next pagination token or None when exhausted)
+        """
+        raise NotImplementedError
+    
+    def describe_stats(self) -> Dict[str, Any]:
+        """
+        Get store statistics
+        
+        Returns:
+            {'total_vector_count': int, 'namespaces': {namespace: vector count}, ...}
+        """
+        raise NotImplementedError
+
+
+class PineconeVectorStore(VectorStore):
+    """VectorStore backed by a Pinecone index"""
+    
+    def __init__(self, index):
+        """
+        Initialize Pinecone Vector Store
+        
+        Args:
+            index: Pinecone Index instance
+        """
+        self.index = index
+    
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = '') -> None:
+        self.index.upsert(vectors=vectors, namespace=namespace)
+    
+    def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        filter: Optional[Dict[str, Any]] = None,
+        namespace: str = ''
+    ) -> List[VectorMatch]:
+        results = self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_metadata=True,
+            filter=filter,
+            namespace=namespace
+        )
+        return [VectorMatch(m.id, m.score, m.metadata or {}) for m in results.matches]
+    
+    def fetch(self, ids: List[str], namespace: str = '') -> Dict[str, Dict[str, Any]]:
+        if not ids:
+            return {}
+        results = self.index.fetch(ids=ids, namespace=namespace)
+        return {
+            vector_id: {'values': list(v.values), 'metadata': v.metadata or {}}
+            for vector_id, v in results.vectors.items()
+        }
+    
+    def delete(self, ids: List[str], namespace: str = '') -> None:
+        if ids:
+            self.index.delete(ids=ids, namespace=namespace)
+    
+    def delete_namespace(self, namespace: str) -> None:
+        try:
+            self.index.delete(delete_all=True, namespace=namespace)
+        except Exception as e:
+            # Deleting a namespace that was never written returns 404
+            if 'not found' not in str(e).lower() and '404' not in str(e):
+                raise
+    
+    def list_ids(
+        self,
+        prefix: Optional[str] = None,
+        namespace: str = '',
+        limit: int = 100,
+        pagination_token: Optional[str] = None
+    ) -> Tuple[List[str], Optional[str]]:
+        # list_paginated is only supported by serverless indexes
+        results = self.index.list_paginated(
+            prefix=prefix,
+            limit=limit,
+            pagination_token=pagination_token,
+            namespace=namespace
+        )
+        ids = [v.id for v in (results.vectors or [])]
+        pagination = getattr(results, 'pagination', None)
+        return ids, (getattr(pagination, 'next', None) if pagination else None)
+    
+    def describe_stats(self) -> Dict[str, Any]:
+        stats = self.index.describe_index_stats()
+        namespaces = getattr(stats, 'namespaces', None) or {}
+        return {
+            'total_vector_count': getattr(stats, 'total_vector_count', 0) or 0,
+            'namespaces': {
+                name: getattr(summary, 'vector_count', 0) or 0
+                for name, summary in namespaces.items()
+            }
+        }
+
+
+def create_local_store_from_env(dimension: int) -> VectorStore:
+    """
+    Build a LocalVectorStore from environment variables
+    
+    VECTOR_STORE_PATH: directory for the memory-mapped files (unset = in-memory only)
+    VECTOR_STORE_IVF_LISTS: IVF partitions for large corpora (default 0 = brute force)
+    VECTOR_STORE_IVF_NPROBE: partitions scanned per query (default 8)
+    """
+    from .local_vector_store import LocalVectorStore
+    
+    return LocalVectorStore(
+        dimension=dimension,
+        path=os.getenv('VECTOR_STORE_PATH') or None,
+        ivf_lists=int(os.getenv('VECTOR_STORE_IVF_LISTS', '0')),
+        nprobe=int(os.getenv('VECTOR_STORE_IVF_NPROBE', '8'))
+    )
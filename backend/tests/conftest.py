@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests import the backend the way main.py does (services.*)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,120 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from services.deletion_jobs import DeletionJobManager
+
+
+class StubMemory:
+    """delete_user_memories_paged over an in-memory set of memory IDs"""
+    
+    def __init__(self, memories, chunk_size=2, fail_after_chunks=None):
+        self.memories = set(memories)
+        self.chunk_size = chunk_size
+        self.fail_after_chunks = fail_after_chunks
+        self.release = threading.Event()
+        self.release.set()
+    
+    def delete_user_memories_paged(self, user_id, progress_callback=None):
+        self.release.wait(5)
+        deleted = 0
+        chunks = 0
+        while True:
+            ids = sorted(m for m in self.memories if m.startswith(f"{user_id}_"))[:self.chunk_size]
+            if not ids:
+                return deleted
+            if self.fail_after_chunks is not None and chunks >= self.fail_after_chunks:
+                self.fail_after_chunks = None  # fail once
+                raise RuntimeError("delete failed")
+            self.memories.difference_update(ids)
+            deleted += len(ids)
+            chunks += 1
+            if progress_callback:
+                progress_callback(deleted)
+
+
+def wait_for(manager, job_id, statuses=('completed', 'failed'), timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} still {manager.get(job_id)['status']}")
+
+
+def test_job_deletes_all_memories_and_reports_progress():
+    memory = StubMemory([f"u1_{i}" for i in range(5)] + ['u2_0'])
+    manager = DeletionJobManager(memory)
+    job = manager.start('u1')
+    
+    job = wait_for(manager, job['job_id'])
+    assert job['status'] == 'completed' and job['deleted'] == 5
+    assert job['finished_at'] is not None
+    assert memory.memories == {'u2_0'}
+    manager.shutdown(wait=True)
+
+
+def test_one_active_job_per_user():
+    memory = StubMemory([f"u1_{i}" for i in range(3)])
+    memory.release.clear()
+    manager = DeletionJobManager(memory)
+    
+    first = manager.start('u1')
+    assert manager.start('u1')['job_id'] == first['job_id']
+    memory.release.set()
+    wait_for(manager, first['job_id'])
+    assert manager.start('u1')['job_id'] != first['job_id']
+    manager.shutdown(wait=True)
+
+
+def test_failed_job_resumes_and_keeps_counting():
+    memory = StubMemory([f"u1_{i}" for i in range(5)], fail_after_chunks=1)
+    manager = DeletionJobManager(memory)
+    job = manager.start('u1')
+    
+    job = wait_for(manager, job['job_id'])
+    assert job['status'] == 'failed' and job['deleted'] == 2 and job['error'] == 'delete failed'
+    
+    manager.resume(job['job_id'])
+    job = wait_for(manager, job['job_id'])
+    assert job['status'] == 'completed' and job['deleted'] == 5 and job['attempts'] == 2
+    manager.shutdown(wait=True)
+
+
+def test_jobs_are_shared_and_resumed_through_the_state_file(tmp_path):
+    state_path = str(tmp_path / 'jobs.json')
+    memory = StubMemory([f"u1_{i}" for i in range(3)])
+    memory.release.clear()
+    first = DeletionJobManager(memory, state_path=state_path)
+    job = first.start('u1')
+    
+    # Another worker sees the job and does not start a second one
+    other = DeletionJobManager(memory, state_path=state_path)
+    assert other.get(job['job_id'])['status'] in ('pending', 'running')
+    assert other.start('u1')['job_id'] == job['job_id']
+    
+    # A live worker's job is left alone
+    assert other.resume_incomplete() == 0
+    
+    # Once its worker has exited, the next worker takes the job over
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    with open(state_path) as f:
+        state = json.load(f)
+    state[job['job_id']]['owner_pid'] = exited.pid
+    with open(state_path, 'w') as f:
+        json.dump(state, f)
+    
+    restarted = DeletionJobManager(memory, state_path=state_path)
+    assert restarted.resume_incomplete() == 1
+    assert restarted.resume_incomplete() == 0
+    assert restarted.get(job['job_id'])['owner_pid'] == os.getpid()
+    memory.release.set()
+    job = wait_for(restarted, job['job_id'])
+    assert job['status'] == 'completed' and memory.memories == set()
+    for manager in (first, other, restarted):
+        manager.shutdown(wait=True)
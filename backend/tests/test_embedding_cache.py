@@ -0,0 +1,61 @@
+import sqlite3
+import time
+
+from services.embedding_cache import EmbeddingCache
+
+
+def test_memory_hit_and_normalized_key():
+    cache = EmbeddingCache(max_size=10)
+    cache.set("I'm  Sad", 'model', 'doc', [0.5, 0.25])
+    assert cache.get("i'm sad", 'model', 'doc') == [0.5, 0.25]
+    assert cache.get("i'm sad", 'model', 'query') is None
+    assert cache.get_stats()['hits'] == 1
+
+
+def test_lru_evicts_oldest():
+    cache = EmbeddingCache(max_size=2)
+    for text in ('a', 'b', 'c'):
+        cache.set(text, 'model', 'doc', [1.0])
+    assert cache.get('a', 'model', 'doc') is None
+    assert cache.get('c', 'model', 'doc') == [1.0]
+
+
+def test_disk_writes_are_batched_and_survive_restart(tmp_path):
+    path = str(tmp_path / 'embeddings.db')
+    cache = EmbeddingCache(max_size=2, disk_path=path, commit_every=3, commit_interval=60)
+    cache.set('a', 'model', 'doc', [1.0])
+    cache.set('b', 'model', 'doc', [2.0])
+    assert cache.get_stats()['disk_commits'] == 0
+    # Pending rows are served before they are committed
+    cache.set('c', 'model', 'doc', [3.0])
+    assert cache.get_stats()['disk_commits'] == 1
+    cache.set('d', 'model', 'doc', [4.0])
+    cache.flush()
+    
+    restarted = EmbeddingCache(disk_path=path)
+    assert restarted.get('a', 'model', 'doc') == [1.0]
+    assert restarted.get('d', 'model', 'doc') == [4.0]
+    assert restarted.get_stats()['disk_hits'] == 2
+
+
+def test_pending_rows_are_readable_after_memory_eviction(tmp_path):
+    cache = EmbeddingCache(max_size=1, disk_path=str(tmp_path / 'e.db'), commit_every=100, commit_interval=60)
+    cache.set('a', 'model', 'doc', [1.0])
+    cache.set('b', 'model', 'doc', [2.0])
+    assert cache.get('a', 'model', 'doc') == [1.0]
+
+
+def test_disk_tier_pruned_by_rows_and_age(tmp_path):
+    path = str(tmp_path / 'embeddings.db')
+    cache = EmbeddingCache(disk_path=path, disk_max_rows=10, commit_every=1)
+    for i in range(25):
+        cache.set(f"text {i}", 'model', 'doc', [float(i)])
+    rows = sqlite3.connect(path).execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+    assert rows <= 10
+    assert cache.get_stats()['disk_pruned'] >= 15
+    
+    db = sqlite3.connect(path)
+    db.execute('UPDATE embeddings SET created_at = ?', (time.time() - 100,))
+    db.commit()
+    EmbeddingCache(disk_path=path, disk_max_age=50)
+    assert sqlite3.connect(path).execute('SELECT COUNT(*) FROM embeddings').fetchone()[0] == 0
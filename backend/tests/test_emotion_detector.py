@@ -0,0 +1,57 @@
+import pytest
+
+from services import emotion_detector
+from services.emotion_detector import (
+    count_emotions, detect_emotion, detect_emotion_with_confidence, detect_emotions_batch, get_matcher
+)
+
+
+@pytest.mark.parametrize('text, language, emotion', [
+    ("I feel so lonely and alone tonight", 'en', 'lonely'),
+    ("I'm anxious, worried and stressed", 'en', 'anxious'),
+    ("मैं बहुत अकेला हूँ।", 'hi', 'lonely'),
+    ("నాకు చాలా కోపంగా ఉంది", 'te', 'angry'),
+    ("आज मैं खुश हूँ, feeling great", 'hi', 'happy'),
+    ("nothing to see here", 'en', 'neutral'),
+    ("", 'en', 'neutral'),
+])
+def test_detect_emotion(text, language, emotion):
+    assert detect_emotion(text, language) == emotion
+
+
+def test_keywords_match_whole_words_only():
+    # 'mad' inside 'made', 'ok' inside 'book'
+    assert count_emotions("I made a book", 'en') == {}
+    # Indic vowel signs continue a word: 'दुख' is not matched inside 'दुखी' twice
+    assert count_emotions("मैं दुखी हूँ", 'hi') == {'sad': 1}
+
+
+def test_longest_keyword_wins_where_keywords_overlap():
+    assert count_emotions("सब ठीक है", 'hi') == {'neutral': 1}
+
+
+def test_confidence_reflects_the_share_of_the_top_emotion():
+    result = detect_emotion_with_confidence("sad and upset but a bit happy", 'en')
+    assert result['emotion'] == 'sad'
+    assert result['scores'] == {'sad': 2, 'happy': 1}
+    assert result['confidence'] == pytest.approx(0.9)
+    assert detect_emotion_with_confidence("hello", 'en') == {'emotion': 'neutral', 'confidence': 0.3, 'scores': {}}
+
+
+def test_unknown_languages_share_the_english_matcher(monkeypatch):
+    monkeypatch.setattr(emotion_detector, '_matchers', {})
+    for language in ('en', 'xx', 'fr-FR', None, ['hi']):
+        assert get_matcher(language) is get_matcher('en')
+    get_matcher('hi')
+    assert set(emotion_detector._matchers) == {'en', 'hi'}
+    assert detect_emotion("so lonely", 'zz') == 'lonely'
+
+
+def test_batch_keeps_input_order_with_per_text_languages():
+    texts = ["so lonely", "मैं उदास हूँ", "ఆనందం"]
+    assert detect_emotions_batch(texts, ['en', 'hi', 'te']) == ['lonely', 'sad', 'happy']
+    assert detect_emotions_batch(texts, ['en', 'hi', 'te'], processes=2, chunk_size=1) == ['lonely', 'sad', 'happy']
+    with pytest.raises(ValueError):
+        detect_emotions_batch(texts, ['en'])
+    with pytest.raises(ValueError):
+        detect_emotions_batch(texts, 5)
@@ -0,0 +1,56 @@
+import pytest
+
+from services import emotion_scorer
+from services.emotion_detector import detect_emotion_with_confidence
+from services.emotion_scorer import EmotionScorer, get_scorer, score_emotions_batch
+
+
+TEXTS = [
+    "I feel so lonely and alone tonight",
+    "sad and upset but a bit happy",
+    "मैं बहुत अकेला हूँ",
+    "hello there",
+    "",
+]
+
+
+def test_matches_the_keyword_detector_without_negation():
+    results = score_emotions_batch(TEXTS, ['en', 'en', 'hi', 'en', 'en'])
+    for text, language, result in zip(TEXTS, ['en', 'en', 'hi', 'en', 'en'], results):
+        expected = detect_emotion_with_confidence(text, language)
+        assert result['emotion'] == expected['emotion']
+        assert result['confidence'] == pytest.approx(expected['confidence'])
+        assert result['scores'] == pytest.approx(expected['scores'])
+
+
+@pytest.mark.parametrize('text, language', [
+    ("I am not happy", 'en'),
+    ("not very happy today", 'en'),
+    ("मैं खुश नहीं हूँ", 'hi'),
+    ("నేను సంతోషంగా లేను", 'te'),
+])
+def test_negated_keywords_do_not_count(text, language):
+    assert get_scorer(language).detect([text])[0]['emotion'] == 'neutral'
+
+
+def test_negation_stays_within_one_message():
+    # "not" ends the first message; "happy" starts the next one
+    results = score_emotions_batch(["I am not", "happy"], 'en')
+    assert [r['emotion'] for r in results] == ['neutral', 'happy']
+
+
+def test_custom_weights_change_the_winner():
+    scorer = EmotionScorer('en', weights={'happy': {'great': 3.0}})
+    assert scorer.detect(["sad and upset but great"])[0]['emotion'] == 'happy'
+    with pytest.raises(ValueError):
+        EmotionScorer('en', weights={'happy': {'not-a-keyword': 1.0}})
+
+
+def test_unknown_languages_share_the_english_scorer(monkeypatch):
+    monkeypatch.setattr(emotion_scorer, '_scorers', {})
+    for language in ('en', 'xx', None, ['hi']):
+        assert get_scorer(language) is get_scorer('en')
+    score_emotions_batch(["so lonely", "ఆనందం"], ['zz', 'te'])
+    assert set(emotion_scorer._scorers) == {'en', 'te'}
+    with pytest.raises(ValueError):
+        score_emotions_batch(["so lonely"], 5)
@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.gemini_client import CircuitBreaker, CircuitOpenError, GeminiClient
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    breaker.record_success()  # a success resets the count
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    
+    assert breaker.state == 'open' and breaker.times_opened == 1
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_breaker_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.state == 'half_open'
+    
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # the trial is still in flight
+    breaker.record_failure()
+    assert breaker.state == 'open' and breaker.times_opened == 2
+    
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    breaker.before_call()
+
+
+class FakeGemini(BaseHTTPRequestHandler):
+    """Answers with the next queued status (200 once the queue is empty)"""
+    
+    statuses = []
+    requests = 0
+    
+    def do_POST(self):
+        type(self).requests += 1
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        status = type(self).statuses.pop(0) if type(self).statuses else 200
+        body = json.dumps({'ok': status == 200}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    FakeGemini.statuses = []
+    FakeGemini.requests = 0
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), FakeGemini)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_client(base_url, **kwargs):
+    return GeminiClient(api_key='test', base_url=base_url, backoff_factor=0, **kwargs)
+
+
+def test_transient_statuses_are_retried(server):
+    FakeGemini.statuses = [503, 429]
+    client = make_client(server, max_retries=3)
+    response = client.post('models/m:generateContent', {'contents': []})
+    
+    assert response.status_code == 200 and FakeGemini.requests == 3
+    assert client.breaker.state == 'closed'
+    client.close()
+
+
+def test_creates_are_not_retried_after_a_500(server):
+    FakeGemini.statuses = [500]
+    client = make_client(server, max_retries=3)
+    response = client.post('cachedContents', {}, idempotent=False)
+    
+    assert response.status_code == 500 and FakeGemini.requests == 1
+    client.close()
+
+
+def test_failures_open_the_breaker_and_calls_fail_fast(server):
+    FakeGemini.statuses = [500] * 10
+    client = make_client(server, max_retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    for _ in range(2):
+        assert client.post('models/m:generateContent', {}).status_code == 500
+    with pytest.raises(CircuitOpenError):
+        client.post('models/m:generateContent', {})
+    
+    assert FakeGemini.requests == 2
+    stats = client.get_stats()
+    assert stats['failures'] == 2 and stats['rejected_by_breaker'] == 1
+    assert stats['breaker_state'] == 'open'
+    client.close()
+
+
+def test_connection_errors_count_as_failures():
+    client = make_client('http://127.0.0.1:9', max_retries=0, breaker=CircuitBreaker(failure_threshold=1))
+    with pytest.raises(Exception):
+        client.post('models/m:generateContent', {})
+    assert client.breaker.state == 'open'
+    client.close()
@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+from services.history_cache import HEADER_TOKENS, HistoryCache, history_parts, render_conversation
+
+
+def count_tokens(text):
+    return len(text.split())
+
+
+def conversation(i):
+    return {
+        'id': f"u1_{1000 + i}",
+        'user_message': f"message {i} " + "word " * (i % 7),
+        'yudi_response': f"reply {i}",
+        'timestamp': 1700000000 + i * 60
+    }
+
+
+def history(newest, count):
+    """count turns ending at turn newest, newest first"""
+    return [conversation(i) for i in range(newest, max(newest - count, -1), -1)]
+
+
+def uncached(conversations, max_tokens):
+    return HistoryCache(count_tokens).get_blocks(None, conversations, max_tokens)
+
+
+def test_new_turns_render_only_the_new_blocks():
+    cache = HistoryCache(count_tokens)
+    first = cache.get_blocks('u1', history(9, 10), max_tokens=10000)
+    assert first == [render_conversation(c) for c in history(9, 10)]
+    
+    rendered = cache.get_stats()['turns_rendered']
+    blocks = cache.get_blocks('u1', history(11, 10), max_tokens=10000)
+    assert blocks == uncached(history(11, 10), 10000)
+    assert cache.get_stats()['turns_rendered'] == rendered + 2
+    assert cache.get_stats()['hits'] == 1
+
+
+def test_history_is_trimmed_to_the_token_budget():
+    cache = HistoryCache(count_tokens)
+    budget = 60
+    blocks = cache.get_blocks('u1', history(29, 30), max_tokens=budget)
+    assert sum(count_tokens(b) + HEADER_TOKENS for b in blocks) <= budget
+    assert blocks == uncached(history(29, 30), budget)
+    assert blocks[0] == render_conversation(conversation(29))
+
+
+def test_cached_history_matches_an_uncached_render():
+    rng = random.Random(0)
+    cache = HistoryCache(count_tokens)
+    newest = 5
+    for _ in range(200):
+        newest += rng.choice([0, 0, 1, 1, 2])
+        limit = rng.choice([5, 10, 20])
+        budget = rng.choice([40, 150, 10000])
+        conversations = history(newest, limit)
+        assert cache.get_blocks('u1', conversations, budget) == uncached(conversations, budget)
+
+
+def test_a_list_that_does_not_continue_the_cache_is_rebuilt():
+    cache = HistoryCache(count_tokens)
+    cache.get_blocks('u1', history(9, 10), max_tokens=10000)
+    # Turn 5 was deleted
+    conversations = [c for c in history(10, 10) if c['id'] != 'u1_1005']
+    assert cache.get_blocks('u1', conversations, max_tokens=10000) == uncached(conversations, 10000)
+    assert cache.get_stats()['misses'] == 2
+
+
+def test_invalidate_and_lru_eviction():
+    cache = HistoryCache(count_tokens, max_users=2)
+    for user_id in ('u1', 'u2', 'u3'):
+        cache.get_blocks(user_id, history(3, 4), max_tokens=10000)
+    stats = cache.get_stats()
+    assert stats['users'] == 2 and stats['evictions'] == 1
+    
+    cache.invalidate('u3')
+    cache.invalidate('u2')
+    assert cache.get_stats()['users'] == 0 and cache.get_stats()['cached_chars'] == 0
+
+
+def test_turns_without_ids_are_rendered_uncached():
+    cache = HistoryCache(count_tokens)
+    conversations = [dict(c, id=None) for c in history(3, 4)]
+    assert cache.get_blocks('u1', conversations, max_tokens=10000) == uncached(conversations, 10000)
+    assert cache.get_stats()['users'] == 0
+
+
+@pytest.mark.parametrize('count', [0, 1, 5])
+def test_history_parts_number_the_blocks_newest_first(count):
+    blocks = [render_conversation(c) for c in history(count - 1, count)]
+    text = ''.join(history_parts(blocks))
+    assert text.count('Conversation #') == count
+    if count > 1:
+        assert text.index(f"Conversation #1 ") < text.index(f"message {count - 1}") < text.index('message 0')
@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+from services.local_vector_store import LocalVectorStore
+
+
+DIM = 8
+
+
+def unit(i, dim=DIM):
+    vector = [0.0] * dim
+    vector[i % dim] = 1.0
+    return vector
+
+
+def clustered_vectors(n, clusters=4, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, DIM))
+    return [
+        {'id': f"v{i:04d}", 'values': (centers[i % clusters] + 0.05 * rng.normal(size=DIM)).tolist(),
+         'metadata': {'user_id': f"u{i % 3}", 'cluster': i % clusters}}
+        for i in range(n)
+    ]
+
+
+def test_query_ranks_by_cosine_and_filters_by_user():
+    store = LocalVectorStore(dimension=DIM)
+    store.upsert([
+        {'id': 'a', 'values': unit(0), 'metadata': {'user_id': 'u1', 'emotion': 'happy'}},
+        {'id': 'b', 'values': [1.0, 1.0] + [0.0] * (DIM - 2), 'metadata': {'user_id': 'u1', 'emotion': 'sad'}},
+        {'id': 'c', 'values': unit(0), 'metadata': {'user_id': 'u2', 'emotion': 'happy'}},
+    ])
+    
+    matches = store.query(unit(0), top_k=5, filter={'user_id': 'u1'})
+    assert [m.id for m in matches] == ['a', 'b']
+    assert matches[0].score == pytest.approx(1.0)
+    assert matches[1].score == pytest.approx(2 ** -0.5)
+    
+    matches = store.query(unit(0), top_k=5, filter={'user_id': {'$eq': 'u1'}, 'emotion': 'sad'})
+    assert [m.id for m in matches] == ['b']
+
+
+def test_upsert_overwrites_and_delete_removes():
+    store = LocalVectorStore(dimension=DIM)
+    store.upsert([{'id': 'a', 'values': unit(0), 'metadata': {'user_id': 'u1'}}])
+    store.upsert([{'id': 'a', 'values': unit(1), 'metadata': {'user_id': 'u2'}}])
+    
+    assert store.query(unit(0), top_k=1, filter={'user_id': 'u1'}) == []
+    assert store.fetch(['a'])['a']['metadata'] == {'user_id': 'u2'}
+    assert store.list_ids() == (['a'], None)
+    
+    store.delete(['a'])
+    assert store.fetch(['a']) == {}
+    assert store.query(unit(1), top_k=1) == []
+    assert store.list_ids() == ([], None)
+
+
+def test_upsert_rejects_wrong_dimension():
+    store = LocalVectorStore(dimension=DIM)
+    with pytest.raises(ValueError):
+        store.upsert([{'id': 'a', 'values': [1.0, 0.0]}])
+
+
+def test_list_ids_pages_in_sorted_order_with_prefix():
+    store = LocalVectorStore(dimension=DIM)
+    ids = [f"u1_{i:03d}" for i in range(25)] + [f"u2_{i:03d}" for i in range(5)] + ['u10_000']
+    order = np.random.default_rng(0).permutation(len(ids))
+    store.upsert([{'id': ids[i], 'values': unit(i), 'metadata': {}} for i in order.tolist()])
+    store.upsert([{'id': 'u1_999', 'values': unit(0), 'metadata': {}}], namespace='other')
+    store.delete(['u1_007'])
+    
+    pages, token = [], None
+    while True:
+        page, token = store.list_ids(prefix='u1_', limit=10, pagination_token=token)
+        pages.append(page)
+        if token is None:
+            break
+    
+    expected = sorted(i for i in ids if i.startswith('u1_') and i != 'u1_007')
+    assert [len(page) for page in pages] == [10, 10, 4]
+    assert sum(pages, []) == expected
+    assert store.list_ids(prefix='u2_', limit=5) == ([f"u2_{i:03d}" for i in range(5)], None)
+    assert store.list_ids(prefix='u1_', namespace='other') == (['u1_999'], None)
+
+
+def test_persistent_store_reloads(tmp_path):
+    store = LocalVectorStore(dimension=DIM, path=str(tmp_path), initial_capacity=2)
+    store.upsert([{'id': f"m{i}", 'values': unit(i), 'metadata': {'user_id': 'u1', 'i': i}} for i in range(5)])
+    store.delete(['m2'])
+    store.close()
+    
+    reloaded = LocalVectorStore(dimension=DIM, path=str(tmp_path), initial_capacity=2)
+    assert reloaded.list_ids() == (['m0', 'm1', 'm3', 'm4'], None)
+    matches = reloaded.query(unit(3), top_k=1, filter={'user_id': 'u1'})
+    assert matches[0].id == 'm3' and matches[0].metadata == {'user_id': 'u1', 'i': 3}
+    reloaded.close()
+
+
+def test_ivf_query_finds_vectors_in_probed_lists():
+    vectors = clustered_vectors(400)
+    store = LocalVectorStore(dimension=DIM, ivf_lists=4, nprobe=1, ivf_min_rows=10**9)
+    store.upsert(vectors)
+    store.build_ivf()
+    assert store.describe_stats()['ivf_lists'] == 4
+    
+    # Rows written after training are assigned to a list too
+    late = clustered_vectors(401)[-1]
+    late['id'] = 'late'
+    store.upsert([late])
+    
+    store.ivf_min_rows = 1
+    for vector in vectors[:8] + [late]:
+        matches = store.query(vector['values'], top_k=1)
+        assert matches[0].id == vector['id']
+        assert matches[0].score == pytest.approx(1.0)
+    
+    # A probe only scans the query's own cluster
+    matches = store.query(vectors[0]['values'], top_k=1000)
+    assert {m.metadata['cluster'] for m in matches if m.id != 'late'} == {0}
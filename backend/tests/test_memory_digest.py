@@ -0,0 +1,92 @@
+import pytest
+
+from services import gemini_chat
+from services.gemini_client import CircuitBreaker
+from services.local_vector_store import LocalVectorStore
+from services.memory_digest import MemoryDigestManager
+from services.vector_db import PineconeMemory
+
+
+START_MS = 1700000000000
+
+
+@pytest.fixture
+def memory():
+    memory = PineconeMemory(dimension=4, store=LocalVectorStore(dimension=4), namespace_layout='flat')
+    memory._get_embedding = lambda text, task_type='retrieval_document': [1.0, 0.0, 0.0, 0.0]
+    return memory
+
+
+def store_turns(memory, user_id, count):
+    memory.store.upsert([
+        {
+            'id': f"{user_id}_{START_MS + i * 60000}",
+            'values': [1.0, 0.0, 0.0, 0.0],
+            'metadata': {'user_id': user_id, 'user_message': f"message {i}", 'yudi_response': f"reply {i}"}
+        }
+        for i in range(count)
+    ])
+
+
+class Summarizer:
+    def __init__(self):
+        self.calls = []
+    
+    def __call__(self, content, level):
+        self.calls.append(level)
+        return f"summary {len(self.calls)} (level {level})"
+
+
+def test_compaction_is_split_into_bounded_runs(memory):
+    store_turns(memory, 'u1', 100)
+    summarize = Summarizer()
+    manager = MemoryDigestManager(
+        memory, summarize, chunk_turns=10, fanout=3, recent_turns=10, max_levels=3, max_summaries=4
+    )
+    
+    assert manager.compact('u1') == 4
+    assert manager.queue.get_nowait() == 'u1'  # the rest of the backlog is rescheduled
+    manager.scheduled.clear()
+    
+    runs = 1
+    while manager.compact('u1'):
+        runs += 1
+        assert len(summarize.calls) <= 4 * runs
+    # 9 full chunks outside the raw window, 3 roll-ups of 3, 1 roll-up of those
+    assert summarize.calls.count(0) == 9 and summarize.calls.count(1) == 3 and summarize.calls.count(2) == 1
+    assert manager.covered_until('u1') == START_MS + 89 * 60000
+    assert [d['level'] for d in manager.get_digests('u1')] == [2]
+    assert manager.get_stats()['continued'] == runs - 1  # the last run finished the backlog
+
+
+def test_prompt_context_covers_every_turn(memory):
+    store_turns(memory, 'u1', 45)
+    manager = MemoryDigestManager(memory, Summarizer(), chunk_turns=10, fanout=5, recent_turns=10)
+    manager.compact('u1')
+    
+    context = manager.get_prompt_context('u1')
+    assert sum(d['turns'] for d in context['digests']) == 30
+    assert [m['user_message'] for m in context['recent']] == [f"message {i}" for i in range(44, 29, -1)]
+
+
+def test_deleted_users_lose_their_digests(memory):
+    store_turns(memory, 'u1', 30)
+    manager = MemoryDigestManager(memory, Summarizer(), chunk_turns=10, recent_turns=10)
+    manager.compact('u1')
+    assert manager.get_digests('u1')
+    
+    assert manager.delete_user_digests('u1') == 2
+    assert manager.get_digests('u1') == []
+
+
+def test_digests_wait_while_the_chat_breaker_is_open(monkeypatch):
+    chat_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    chat_breaker.record_failure()
+    monkeypatch.setattr(gemini_chat, 'get_gemini_client', lambda: type('Client', (), {'breaker': chat_breaker})())
+    
+    def background_client():
+        raise AssertionError("digest call made while the chat breaker is open")
+    
+    monkeypatch.setattr(gemini_chat, 'get_background_gemini_client', background_client)
+    with pytest.raises(Exception, match='deferred'):
+        gemini_chat.generate_digest("User: hi", 0, gemini_api_key='test')
@@ -0,0 +1,132 @@
+import threading
+
+import pytest
+
+from services.memory_queue import MemoryWriteQueue
+from services.vector_db import PineconeMemory
+
+
+class StubMemory:
+    """store_conversations_bulk that fails chosen calls"""
+    
+    validate_memory = staticmethod(PineconeMemory.validate_memory)
+    
+    def __init__(self, failures=0, error=RuntimeError):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+        self.stored = []
+        self.lock = threading.Lock()
+        self.next_id = 0
+    
+    def new_memory_id(self, user_id, timestamp=None):
+        with self.lock:
+            self.next_id += 1
+            return f"{user_id}_{self.next_id}"
+    
+    def store_conversations_bulk(self, conversations):
+        with self.lock:
+            self.calls += 1
+            if self.calls <= self.failures:
+                raise self.error("store failed")
+            failed = []
+            for i, item in enumerate(conversations):
+                if item['user_message'] == 'bad':
+                    failed.append({'index': i, 'error': 'invalid', 'retryable': False})
+                else:
+                    self.stored.append(item['memory_id'])
+            return {'succeeded': [], 'failed': failed}
+
+
+def make_queue(memory, **kwargs):
+    queue = MemoryWriteQueue(memory, workers=1, linger_ms=1, base_backoff=0.001, max_backoff=0.01, **kwargs)
+    queue.start()
+    return queue
+
+
+def test_queued_memories_are_stored_in_batches():
+    memory = StubMemory()
+    queue = make_queue(memory)
+    ids = [queue.enqueue('u1', f"hi {i}", 'hello') for i in range(10)]
+    assert queue.flush(timeout=5)
+    assert sorted(memory.stored) == sorted(ids)
+    assert queue.get_stats()['stored'] == 10
+    queue.shutdown()
+
+
+def test_transient_failures_are_retried():
+    memory = StubMemory(failures=2)
+    queue = make_queue(memory)
+    memory_id = queue.enqueue('u1', 'hi', 'hello')
+    assert queue.flush(timeout=5)
+    assert memory.stored == [memory_id]
+    assert queue.get_stats()['retried'] == 2
+    queue.shutdown()
+
+
+@pytest.mark.parametrize('metadata', ['not a dict', {'nested': {'a': 1}}])
+def test_invalid_memories_are_rejected_before_queueing(metadata):
+    queue = make_queue(StubMemory())
+    with pytest.raises(ValueError):
+        queue.enqueue('u1', 'hi', 'hello', metadata=metadata)
+    with pytest.raises(ValueError):
+        queue.enqueue('u1', '', 'hello')
+    assert queue.get_stats()['enqueued'] == 0
+    queue.shutdown()
+
+
+def test_non_retryable_failures_are_dropped_without_retry():
+    memory = StubMemory()
+    queue = make_queue(memory, max_retries=5)
+    queue.enqueue('u1', 'bad', 'hello')
+    good = queue.enqueue('u1', 'good', 'hello')
+    assert queue.flush(timeout=5)
+    assert memory.stored == [good]
+    stats = queue.get_stats()
+    assert stats['dropped'] == 1 and stats['retried'] == 0
+    queue.shutdown()
+
+
+def test_value_errors_isolate_the_batch_and_do_not_retry():
+    memory = StubMemory(failures=1, error=ValueError)
+    queue = MemoryWriteQueue(memory, workers=1, max_retries=5)
+    items = [
+        {'memory_id': f"u1_{i}", 'user_id': 'u1', 'user_message': 'hi', 'yudi_response': 'hello', '_attempts': 0}
+        for i in range(3)
+    ]
+    queue._pending = 3
+    queue._store_batch(items)
+    # The whole-batch ValueError is re-tried item by item instead of with backoff
+    assert sorted(memory.stored) == ['u1_0', 'u1_1', 'u1_2']
+    assert queue.get_stats()['retried'] == 0
+
+
+def test_cancel_user_drops_queued_memories_and_waits_for_in_flight_batches():
+    memory = StubMemory()
+    storing, release = threading.Event(), threading.Event()
+    store = memory.store_conversations_bulk
+    
+    def slow_store(conversations):
+        storing.set()
+        release.wait(5)
+        return store(conversations)
+    
+    memory.store_conversations_bulk = slow_store
+    queue = MemoryWriteQueue(memory, workers=1, linger_ms=1)
+    in_flight = queue.enqueue('u1', 'first', 'hello')
+    queue.start()
+    assert storing.wait(5)  # the worker is storing the first memory
+    queued = [queue.enqueue('u1', f"hi {i}", 'hello') for i in range(3)]
+    other = queue.enqueue('u2', 'hi', 'hello')
+    
+    threading.Timer(0.1, release.set).start()
+    assert queue.cancel_user('u1') == 3
+    # cancel_user returns only once the in-flight batch holding u1's memory is stored
+    assert in_flight in memory.stored
+    later = queue.enqueue('u1', 'after delete', 'hello')
+    
+    assert queue.flush(timeout=5)
+    assert not set(queued) & set(memory.stored)
+    assert other in memory.stored and later in memory.stored
+    assert queue.get_stats()['cancelled'] == 3
+    queue.shutdown()
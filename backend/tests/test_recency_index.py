@@ -0,0 +1,103 @@
+import time
+
+import pytest
+
+from services.local_vector_store import LocalVectorStore
+from services.recency_index import RecencyIndex
+from services.vector_db import PineconeMemory
+
+
+def test_page_is_newest_first_with_a_cursor():
+    index = RecencyIndex()
+    index.load('u1', [(t, f"u1_{t}") for t in (30, 10, 20, 40)], listed_ms=50)
+    
+    page, has_more = index.page('u1', limit=2)
+    assert page == [(40, 'u1_40'), (30, 'u1_30')] and has_more
+    page, has_more = index.page('u1', before_ms=30, limit=2)
+    assert page == [(20, 'u1_20'), (10, 'u1_10')] and not has_more
+    assert index.page('u2') == ([], False)
+
+
+def test_add_merge_and_remove_keep_the_timeline_sorted():
+    index = RecencyIndex()
+    index.add('u1', 'u1_5', 5)  # ignored until the timeline is loaded
+    index.load('u1', [(10, 'u1_10')], listed_ms=10)
+    index.add('u1', 'u1_30', 30)
+    index.merge('u1', [(20, 'u1_20'), (30, 'u1_30')], listed_ms=40)
+    index.remove('u1', ['u1_10'])
+    
+    assert index.page('u1', limit=10) == ([(30, 'u1_30'), (20, 'u1_20')], False)
+    assert index.listed_until('u1') == 40
+    assert index.listed_until('u2') is None
+
+
+def test_stale_timelines_refresh_and_lru_evicts():
+    index = RecencyIndex(max_users=2, ttl=0.05)
+    index.load('u1', [], listed_ms=0)
+    index.load('u2', [], listed_ms=0)
+    assert index.is_fresh('u1')
+    time.sleep(0.06)
+    assert not index.is_fresh('u1')
+    index.merge('u1', [], listed_ms=1)
+    assert index.is_fresh('u1')
+    
+    index.load('u3', [], listed_ms=0)
+    assert index.listed_until('u1') is not None and index.listed_until('u2') is None
+
+
+class ListingStore(LocalVectorStore):
+    """LocalVectorStore recording the prefixes it was listed with"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.listed = []
+    
+    def list_ids(self, prefix=None, namespace='', limit=100, pagination_token=None):
+        ids, token = super().list_ids(prefix, namespace, limit, pagination_token)
+        self.listed.append((prefix, len(ids)))
+        return ids, token
+
+
+def store_ids(memory, ids):
+    memory.store.upsert([
+        {'id': vector_id, 'values': [1.0, 0.0, 0.0, 0.0], 'metadata': {'user_id': 'u1', 'user_message': vector_id}}
+        for vector_id in ids
+    ])
+
+
+@pytest.fixture
+def memory():
+    return PineconeMemory(dimension=4, store=ListingStore(dimension=4), namespace_layout='flat')
+
+
+def test_refresh_lists_only_recent_ids(memory):
+    now_ms = int(time.time() * 1000)
+    old = [f"u1_{now_ms - day * 86400000}" for day in range(1, 301)]
+    store_ids(memory, old)
+    
+    page = memory.list_user_memories('u1', limit=5)
+    assert [m['id'] for m in page['memories']] == old[:5]
+    assert sum(count for _, count in memory.store.listed) == 300
+    
+    # Another worker writes a memory; the stale timeline is refreshed incrementally
+    memory.store.listed.clear()
+    recent = f"u1_{now_ms + 1}"
+    store_ids(memory, [recent])
+    memory.recency_index.ttl = 0
+    page = memory.list_user_memories('u1', limit=5)
+    assert [m['id'] for m in page['memories']] == [recent] + old[:4]
+    assert sum(count for _, count in memory.store.listed) == 1
+    assert all(prefix.startswith('u1_' + str(now_ms)[:5]) for prefix, _ in memory.store.listed)
+    
+    # Deletes by another worker drop out of the timeline when a page misses them
+    memory.store.delete([recent])
+    page = memory.list_user_memories('u1', limit=5)
+    assert [m['id'] for m in page['memories']] == old[:4]
+    page = memory.list_user_memories('u1', limit=5)
+    assert [m['id'] for m in page['memories']] == old[:5]
+
+
+@pytest.mark.parametrize('before', ['abc', 'nan', 'inf'])
+def test_invalid_cursor_is_a_value_error(memory, before):
+    with pytest.raises(ValueError):
+        memory.list_user_memories('u1', before=before)
@@ -0,0 +1,135 @@
+import threading
+import time
+
+import numpy as np
+
+from services.tts_cache import SynthesisTimeoutError, TTSCache
+from services.tts_segments import decode_pcm, encode_wav
+
+
+class FakeEngine:
+    """TTS engine returning a tone per text (optionally slow or failing)"""
+    
+    def __init__(self, sample_rate=16000, delay=0.0, fail=False, wav=False):
+        self.sample_rate = sample_rate
+        self.delay = delay
+        self.fail = fail
+        self.wav = wav
+        self.calls = []
+        self.lock = threading.Lock()
+    
+    def synthesize(self, text, language, speaker):
+        with self.lock:
+            self.calls.append(text)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("engine down")
+        pcm = (np.sin(np.arange(self.sample_rate // 10) * 0.1) * 8000).astype('<i2').tobytes()
+        return (encode_wav(pcm, self.sample_rate) if self.wav else pcm), self.sample_rate
+
+
+def run_concurrently(fn, count):
+    results, errors = [], []
+    
+    def call():
+        try:
+            results.append(fn())
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_single_flight_shares_one_synthesis():
+    cache = TTSCache()
+    engine = FakeEngine(delay=0.2)
+    results, errors = run_concurrently(lambda: cache.get_or_synthesize("hi", "en", "female", engine), 8)
+    assert not errors
+    assert len(engine.calls) == 1
+    assert len(results) == 8 and all(bytes(r[0]) == bytes(results[0][0]) for r in results)
+    assert cache.get_stats()['coalesced'] == 7
+
+
+def test_single_flight_raises_to_waiters_and_does_not_cache_failure():
+    cache = TTSCache()
+    engine = FakeEngine(delay=0.2, fail=True)
+    results, errors = run_concurrently(lambda: cache.get_or_synthesize("x", "en", "female", engine), 5)
+    assert not results
+    assert len(errors) == 5 and all(isinstance(e, RuntimeError) for e in errors)
+    assert len(engine.calls) == 1
+    
+    engine.fail = False
+    assert cache.get_or_synthesize("x", "en", "female", engine)[1] == 16000
+    assert len(engine.calls) == 2
+
+
+def test_waiters_time_out_without_cancelling_the_synthesis():
+    cache = TTSCache(synthesis_timeout=0.05)
+    engine = FakeEngine(delay=0.3)
+    leader = threading.Thread(target=cache.get_or_synthesize, args=("slow", "en", "female", engine))
+    leader.start()
+    time.sleep(0.05)
+    results, errors = run_concurrently(lambda: cache.get_or_synthesize("slow", "en", "female", engine), 3)
+    leader.join()
+    
+    assert not results and all(isinstance(e, SynthesisTimeoutError) for e in errors)
+    assert cache.get_stats()['synthesis_timeouts'] == 3
+    assert cache.get("slow", "en") is not None and len(engine.calls) == 1
+
+
+def test_stitched_reply_length_and_sample_rate():
+    cache = TTSCache()
+    cache.set("I hear you", "en", (np.ones(2205) * 1000).astype('<i2').tobytes(), 22050)
+    engine = FakeEngine(sample_rate=16000)
+    audio, rate = cache.get_or_synthesize_segmented(
+        "I hear you. Tell me more about that.", "en", "female", engine, crossfade_ms=15
+    )
+    assert engine.calls == ["Tell me more about that"]
+    # First segment decides the rate; the second is resampled to it
+    assert rate == 22050
+    fade = int(22050 * 15 / 1000)
+    assert len(decode_pcm(audio)[0]) == 2205 + round(1600 * 22050 / 16000) - fade
+
+
+def test_stitched_reply_keeps_wav_container():
+    cache = TTSCache()
+    audio, rate = cache.get_or_synthesize_segmented(
+        "Fresh one. Another one.", "en", "female", FakeEngine(sample_rate=24000, wav=True)
+    )
+    assert bytes(audio[:4]) == b'RIFF' and rate == 24000
+    assert len(decode_pcm(audio)[0]) == 2 * 2400 - int(24000 * 15 / 1000)
+
+
+def test_first_missing_segment_of_each_reply_runs_first():
+    cache = TTSCache(segment_workers=1)
+    gate = threading.Event()
+    
+    class GatedEngine(FakeEngine):
+        def synthesize(self, text, language, speaker):
+            gate.wait(5)
+            return super().synthesize(text, language, speaker)
+    
+    engine = GatedEngine()
+    replies = [
+        threading.Thread(target=lambda text=text: list(cache.iter_segments(text, "en", "female", engine)))
+        for text in ("One. Two. Three.", "Four. Five.")
+    ]
+    replies[0].start()
+    # "One" holds the only worker; wait for "Two" and "Three" to queue behind it
+    deadline = time.time() + 5
+    while len(cache.segment_jobs) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    replies[1].start()
+    while len(cache.segment_jobs) < 4 and time.time() < deadline:
+        time.sleep(0.01)
+    gate.set()
+    for reply in replies:
+        reply.join()
+    
+    # The second reply's first segment overtakes the first reply's later ones
+    assert engine.calls == ["One", "Four", "Two", "Three", "Five"]
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from services.tts_cache import TTSCache
+from services.tts_codecs import RAW, SOUNDFILE_AVAILABLE, available_codecs, decode_audio, encode_audio
+from services.tts_segments import encode_wav
+
+
+def speech(samples, seed=0):
+    """Speech-like 16-bit PCM (a tone with pauses: compressible beyond ~1 s)"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(samples) / 22050
+    envelope = (np.sin(t * 3) > 0) * 1.0
+    return ((np.sin(2 * np.pi * 180 * t) * 0.3 + rng.normal(0, 0.01, samples)) * envelope * 32767).astype('<i2').tobytes()
+
+
+@pytest.mark.parametrize('codec', available_codecs())
+@pytest.mark.parametrize('audio', [speech(44100), encode_wav(speech(44100, seed=1), 22050)], ids=['pcm', 'wav'])
+def test_codecs_are_lossless(codec, audio):
+    data, stored = encode_audio(audio, codec, 22050)
+    assert len(data) < len(audio)
+    assert decode_audio(memoryview(data), stored) == audio
+
+
+def test_unknown_codecs_are_rejected():
+    with pytest.raises(ValueError):
+        encode_audio(b'\0\0', 'mp3', 16000)
+    with pytest.raises(ValueError):
+        decode_audio(b'\0\0', 'mp3')
+
+
+@pytest.mark.skipif(not SOUNDFILE_AVAILABLE, reason="soundfile not installed")
+def test_flac_stores_odd_length_pcm_raw():
+    audio = speech(44100) + b'\x01'
+    with pytest.raises(ValueError):
+        encode_audio(audio, 'flac', 22050)
+    
+    cache = TTSCache(codec='flac')
+    cache.set("odd", "en", audio, 22050)
+    assert cache.get("odd", "en")[0] == audio
+    assert cache.get_stats()['memory_bytes'] == len(audio)
+
+
+@pytest.mark.parametrize('codec', ['deflate', None])
+def test_entries_round_trip_through_disk_and_snapshot(tmp_path, codec):
+    cache = TTSCache(max_size=2, disk_dir=str(tmp_path / 'disk'), codec=codec)
+    clips = {f"clip {i}": speech(44100, seed=i) for i in range(4)}
+    clips["wav clip"] = encode_wav(speech(44100, seed=9), 22050)
+    for text, audio in clips.items():
+        cache.set(text, "en", audio, 22050)
+    for text, audio in clips.items():
+        assert bytes(cache.get(text, "en")[0]) == audio
+    if codec:
+        assert cache.get_stats()['memory_bytes'] < cache.get_stats()['memory_raw_bytes']
+    
+    snapshot = str(tmp_path / 'snapshot.bin')
+    assert cache.save_snapshot(snapshot) > 0
+    loaded = TTSCache()
+    assert loaded.load_snapshot(snapshot) > 0
+    for text in list(clips)[-2:]:  # the entries still in memory
+        assert bytes(loaded.get(text, "en")[0]) == clips[text]
+
+
+def test_encoded_entries_are_served_without_decoding():
+    cache = TTSCache(codec='deflate')
+    audio = speech(44100)
+    cache.set("hi", "en", audio, 22050)
+    
+    data, rate, codec = cache.get_encoded("hi", "en", accept=['deflate'])
+    assert codec == 'deflate' and decode_audio(data, codec) == audio
+    assert cache.get_encoded("hi", "en", accept=[]) == (audio, 22050, RAW)
+    stats = cache.get_stats()
+    assert stats['served_encoded'] == 1 and stats['decodes'] == 1
+    
+    cache.set("short", "en", b'\0' * 100, 22050)  # under compress_min_bytes
+    assert cache.get_encoded("short", "en", accept=['deflate'])[2] == RAW
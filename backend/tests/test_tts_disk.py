@@ -0,0 +1,78 @@
+import os
+import time
+
+from services import tts_cache
+from services.tts_cache import TTSCache
+
+
+def clips(count, size=4000):
+    return {f"phrase {i}": os.urandom(size) for i in range(count)}
+
+
+def test_evicted_entries_demote_to_disk_and_survive_restart(tmp_path):
+    cache = TTSCache(max_size=2, disk_dir=str(tmp_path))
+    audio = clips(5)
+    for text, data in audio.items():
+        cache.set(text, "en", data, 22050)
+    assert cache.get_stats()['disk_size'] == 3
+    
+    restarted = TTSCache(max_size=2, disk_dir=str(tmp_path))
+    assert restarted.get_stats()['disk_size'] == 3
+    for i in range(3):
+        data, rate = restarted.get(f"phrase {i}", "en")
+        assert bytes(data) == audio[f"phrase {i}"] and rate == 22050
+    assert restarted.get_stats()['disk_hits'] == 3
+
+
+def test_entries_larger_than_memory_go_straight_to_disk(tmp_path):
+    cache = TTSCache(max_bytes=1000, disk_dir=str(tmp_path))
+    data = os.urandom(5000)
+    cache.set("long reply", "en", data, 16000)
+    assert cache.get_stats()['size'] == 0
+    assert bytes(cache.get("long reply", "en")[0]) == data
+
+
+def test_workers_sharing_a_directory_see_each_others_entries(tmp_path):
+    first = TTSCache(max_size=1, disk_dir=str(tmp_path))
+    second = TTSCache(max_size=1, disk_dir=str(tmp_path))
+    audio = clips(2)
+    for text, data in audio.items():
+        first.set(text, "en", data, 16000)
+    
+    # Written after second indexed the directory: found by looking on the miss
+    assert bytes(second.get("phrase 0", "en")[0]) == audio["phrase 0"]
+    assert second.get_stats()['disk_hits'] == 1 and second.get_stats()['disk_size'] == 1
+
+
+def test_disk_budget_counts_files_of_other_workers(tmp_path, monkeypatch):
+    size = tts_cache.DISK_HEADER.size + 4000
+    budget = 3 * size
+    first = TTSCache(max_size=1, disk_dir=str(tmp_path), disk_max_bytes=budget)
+    second = TTSCache(max_size=1, disk_dir=str(tmp_path), disk_max_bytes=budget)
+    for i in range(3):
+        first.set(f"first {i}", "en", os.urandom(4000), 16000)
+    
+    # Rescan on every demote: second only learns of first's files by listing the directory
+    monkeypatch.setattr(tts_cache, 'DISK_RESCAN_INTERVAL', 0.0)
+    for i in range(3):
+        second.set(f"second {i}", "en", os.urandom(4000), 16000)
+    
+    files = [name for _, _, names in os.walk(tmp_path) for name in names if name.endswith('.tts')]
+    assert len(files) * size <= budget
+    assert second.get_stats()['disk_rescans'] > 0
+
+
+def test_disk_hits_refresh_the_mtime_only_when_stale(tmp_path):
+    cache = TTSCache(max_size=1, disk_dir=str(tmp_path))
+    cache.set("old", "en", os.urandom(4000), 16000)
+    cache.set("new", "en", os.urandom(4000), 16000)
+    path = cache._path(cache._make_key("old", "en"))
+    
+    written = os.stat(path).st_mtime
+    cache.get("old", "en")
+    assert os.stat(path).st_mtime == written
+    
+    stale = time.time() - tts_cache.DISK_TOUCH_INTERVAL - 10
+    os.utime(path, (stale, stale))
+    cache.get("old", "en")
+    assert os.stat(path).st_mtime > stale + 5
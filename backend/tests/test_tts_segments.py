@@ -0,0 +1,59 @@
+import numpy as np
+
+from services.tts_segments import SegmentStitcher, decode_pcm, encode_pcm, encode_wav, split_segments
+
+
+def test_split_segments_latin_punctuation():
+    assert split_segments("I hear you. Tell me more about that! How are you feeling?") == [
+        "I hear you", "Tell me more about that!", "How are you feeling?"
+    ]
+
+
+def test_split_segments_danda():
+    assert split_segments("नमस्ते, मैं यूदी हूं। आप कैसा महसूस कर रहे हैं?") == [
+        "नमस्ते, मैं यूदी हूं", "आप कैसा महसूस कर रहे हैं?"
+    ]
+    # Danda without a following space, and the double danda
+    assert split_segments("నేను విన్నాను।మీరు ఎలా ఉన్నారు॥") == ["నేను విన్నాను", "మీరు ఎలా ఉన్నారు"]
+
+
+def test_split_segments_long_sentence_at_clauses():
+    segments = split_segments("Well, " + "this is a long clause, " * 8 + "end.")
+    assert segments[0] == "Well"
+    assert segments[-1] == "end"
+    assert all(len(segment) <= 120 for segment in segments)
+
+
+def test_split_segments_drops_punctuation_only_pieces():
+    assert split_segments("... !") == []
+
+
+def test_pcm_and_wav_decode_to_same_samples():
+    pcm = (np.sin(np.arange(1000) * 0.05) * 8000).astype('<i2').tobytes()
+    raw, was_wav = decode_pcm(pcm)
+    wav, is_wav = decode_pcm(encode_wav(pcm, 16000))
+    assert not was_wav and is_wav
+    assert np.array_equal(raw, wav)
+    assert encode_pcm(raw) == pcm
+
+
+def test_encode_pcm_is_bit_exact_over_the_full_range():
+    pcm = np.arange(-32768, 32768, dtype='<i2').tobytes()
+    assert encode_pcm(decode_pcm(pcm)[0]) == pcm
+    # Out-of-range samples (e.g. after a crossfade) saturate
+    assert np.frombuffer(encode_pcm(np.array([-1.5, 1.0, 1.5])), '<i2').tolist() == [-32768, 32767, 32767]
+
+
+def test_stitcher_length_with_crossfades():
+    stitcher = SegmentStitcher(16000, crossfade_ms=10)
+    pieces = [np.ones(1600, dtype=np.float32), np.ones(800, dtype=np.float32), np.ones(1600, dtype=np.float32)]
+    out = [stitcher.push(samples, 16000) for samples in pieces]
+    out.append(stitcher.flush())
+    # Each join overlaps 10 ms (160 samples)
+    assert sum(len(chunk) for chunk in out) == 1600 + 800 + 1600 - 2 * 160
+
+
+def test_stitcher_resamples_to_output_rate():
+    stitcher = SegmentStitcher(16000, crossfade_ms=0)
+    out = stitcher.push(np.zeros(2400, dtype=np.float32), 24000)
+    assert len(out) + len(stitcher.flush()) == 1600
@@ -0,0 +1,63 @@
+import os
+
+from services.tts_cache import TTSCache
+
+
+class Engine:
+    def __init__(self):
+        self.calls = 0
+    
+    def synthesize(self, text, language, speaker):
+        self.calls += 1
+        return text.encode('utf-8') * 100, 16000
+
+
+def test_snapshot_restores_entries_in_lru_order(tmp_path):
+    cache = TTSCache(max_size=3)
+    audio = {f"phrase {i}": os.urandom(2000) for i in range(3)}
+    for text, data in audio.items():
+        cache.set(text, "en", data, 22050)
+    cache.get("phrase 0", "en")  # most recently used
+    
+    path = str(tmp_path / 'snapshot.bin')
+    assert cache.save_snapshot(path) == 3
+    loaded = TTSCache(max_size=3)
+    assert loaded.load_snapshot(path) == 3
+    for text, data in audio.items():
+        assert loaded.get(text, "en") == (data, 22050)
+    
+    # Over the size limit the least recently used entry goes first
+    smaller = TTSCache(max_size=2)
+    smaller.load_snapshot(path)
+    assert smaller.get("phrase 1", "en") is None
+    assert smaller.get("phrase 0", "en") is not None
+
+
+def test_missing_or_corrupt_snapshots_load_nothing(tmp_path):
+    cache = TTSCache()
+    assert cache.load_snapshot(str(tmp_path / 'missing.bin')) == 0
+    
+    cache.set("hi", "en", os.urandom(2000), 16000)
+    path = str(tmp_path / 'snapshot.bin')
+    cache.save_snapshot(path)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 10)
+    assert TTSCache().load_snapshot(path) == 0
+    
+    with open(path, 'wb') as f:
+        f.write(b'not a snapshot')
+    assert TTSCache().load_snapshot(path) == 0
+
+
+def test_preload_saves_a_snapshot_that_skips_synthesis_next_time(tmp_path):
+    path = str(tmp_path / 'snapshot.bin')
+    engine = Engine()
+    TTSCache().preload_common_responses(engine, max_workers=2, snapshot_path=path)
+    assert engine.calls > 0
+    
+    restarted = TTSCache()
+    assert restarted.load_snapshot(path) == engine.calls
+    again = Engine()
+    restarted.preload_common_responses(again, snapshot_path=None)
+    assert again.calls == 0
+    assert restarted.get_stats()['preload']['cached'] == engine.calls